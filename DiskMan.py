@@ -7,43 +7,312 @@ A tool to visualize and manage disk space usage.
 import os
 import sys
 import time
-from colorama import Fore, Style
+import shlex
+import atexit
+import argparse
+try:
+    import humanize
+    from colorama import Fore, Style
+except ImportError as e:
+    sys.exit(f"DiskMan needs the '{e.name}' package; install it with: "
+             f"{os.path.basename(sys.executable)} -m pip install colorama humanize")
 
 # Import modules from lib directory
-from lib.utils import open_file_explorer, set_terminal_size, clear_screen
-from lib.file_operations import list_directory, delete_item, get_item_details
-from lib.ui import display_directory, show_navigation_options, show_welcome_message, show_delete_confirmation
+from lib.utils import open_file_explorer, set_terminal_size, clear_screen, poll_input, parse_selection
+from lib.file_operations import (list_directory, delete_item, delete_items, get_item_details, get_scan_summary,
+                                 set_scan_workers, stream_directory, is_directory_cached,
+                                 find_largest_items, find_duplicate_files, set_scan_filter,
+                                 set_profiling, save_profile, take_snapshot, snapshot_root,
+                                 compare_snapshots, prefetch_directories, set_aggregating,
+                                 get_breakdown, get_stale_sizes, set_watching, watch_directory)
+from lib.profiler import ScanProfile
+from lib import screen
+from lib.ages import AGE_DAYS
+from lib.ui import (display_directory, display_duplicates, display_diff, display_breakdown,
+                    show_navigation_options,
+                    show_welcome_message, show_delete_confirmation, show_batch_delete_confirmation)
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    # Scan options are accepted before or after the subcommand
+    scanning = argparse.ArgumentParser(add_help=False, argument_default=argparse.SUPPRESS)
+    scanning.add_argument('-x', '--one-file-system', action='store_true',
+                          help="don't descend into directories on other filesystems (mounts)")
+    scanning.add_argument('--exclude', action='append', metavar='GLOB',
+                          help="skip entries matching GLOB (a name like '.git', or a path like "
+                               "'/proc' when it contains a separator); may be repeated")
+    scanning.add_argument('--max-depth', type=int, metavar='N',
+                          help="keep listings only N levels below the scanned folder; deeper "
+                               "sizes are still counted and folders are listed when opened")
+    scanning.add_argument('--profile', action='store_true',
+                          help="show where scan and redraw time goes: stat/listdir calls, time "
+                               "per top-level folder, slowest folders and skipped errors")
+    scanning.add_argument('--profile-json', metavar='FILE',
+                          help="write the profiles as JSON to FILE on exit (implies --profile)")
+
+    parser = argparse.ArgumentParser(description="DiskMan - Disk Manager by SamSeen", parents=[scanning])
+    parser.add_argument('--workers', type=int, default=1, metavar='N',
+                        help="number of threads used to scan directories (default: 1)")
+    parser.add_argument('--processes', type=int, default=1, metavar='N',
+                        help="scan with N worker processes instead of threads, for trees "
+                             "with tens of millions of small files (default: off)")
+    parser.add_argument('--stream', action='store_true',
+                        help="show entries immediately and fill in sizes as they are measured")
+    parser.add_argument('--aggregate', action='store_true',
+                        help="break every scan down by extension, owner and file type as it "
+                             "runs, so 'b' needs no extra scan; cached sizes and the scan index "
+                             "aren't reused, so there are no warm starts")
+    parser.add_argument('--watch', action='store_true',
+                        help="keep the sizes of the folder on screen up to date as files change "
+                             "(inotify on Linux, polling elsewhere)")
+    parser.add_argument('--resize', action='store_true',
+                        help="resize the terminal window to 120x42 on start")
+
+    # Non-interactive subcommands for scripts and cron jobs
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    scan_parser = commands.add_parser('scan', help="scan a directory and print sizes without prompts",
+                                      parents=[scanning])
+    scan_parser.add_argument('path', help="directory to scan")
+    scan_parser.add_argument('--depth', type=int, default=1, metavar='N',
+                             help="report directories down to N levels below PATH (default: 1)")
+    scan_parser.add_argument('--top', type=int, default=0, metavar='K',
+                             help="include the K largest entries of each reported directory")
+    scan_parser.add_argument('--json', action='store_true',
+                             help="stream one JSON object per line (NDJSON)")
+    snapshot_parser = commands.add_parser('snapshot', help="save the sizes below a directory to a file",
+                                          parents=[scanning])
+    snapshot_parser.add_argument('path', help="directory to record")
+    snapshot_parser.add_argument('output', help="snapshot file to write")
+    diff_parser = commands.add_parser('diff', help="show what changed between two snapshots")
+    diff_parser.add_argument('old', help="earlier snapshot")
+    diff_parser.add_argument('new', help="later snapshot")
+    diff_parser.add_argument('--path', default='', metavar='DIR',
+                             help="compare this folder, relative to the snapshot root (default: the root)")
+    diff_parser.add_argument('--all', action='store_true',
+                             help="stream every changed file and folder below DIR instead of "
+                                  "its own entries sorted by growth")
+    diff_parser.add_argument('--json', action='store_true',
+                             help="write one JSON object per line (NDJSON)")
+    return parser.parse_args(argv)
+
+def read_choice(prompt, scan, watcher=None):
+    """Read a command, returning None early if a running scan or the watcher has news to show.
+
+    Args:
+        prompt (str): Prompt to display
+        scan (StreamingScan): Running scan, or None
+        watcher (Watcher): Watcher of the directory on screen, or None
+
+    Returns:
+        str: The entered command, or None when the listing should be redrawn
+    """
+    scanning = scan is not None and not scan.done
+    if not (scanning or watcher is not None) or not sys.stdin.isatty():
+        return input(prompt)
+
+    print(prompt, end="", flush=True)
+    version = scan.version if scanning else None
+    changes = watcher.version if watcher is not None else None
+    deadline = time.time() + 1.0  # Refresh the progress line about once a second
+    while True:
+        line = poll_input(0.1)
+        if line is not None:
+            return line
+        if scanning and (scan.version != version or scan.done or time.time() >= deadline):
+            return None
+        if watcher is not None and watcher.version != changes:
+            return None
+
+def outermost_entries(entries):
+    """Drop selected items that lie inside another selected folder.
+
+    Args:
+        entries (list): ``(path, size, is_dir)`` tuples
+
+    Returns:
+        list: The entries not contained in any other, in their original order
+    """
+    paths = set(path for path, _, _ in entries)
+    kept = []
+    for entry in entries:
+        parent = os.path.dirname(entry[0])
+        while parent not in paths and os.path.dirname(parent) != parent:
+            parent = os.path.dirname(parent)
+        if parent not in paths:
+            kept.append(entry)
+    return kept
+
+def unmark(marked, path):
+    """Return the marks without ``path`` and anything below it."""
+    return {other: value for other, value in marked.items()
+            if other != path and not other.startswith(path.rstrip(os.sep) + os.sep)}
 
 def main():
     """Main function for DiskMan."""
-    # Set terminal size to 120x40
-    if not set_terminal_size(120, 42):
+    args = parse_args()
+    prune = set_scan_filter(getattr(args, 'one_file_system', False), getattr(args, 'exclude', None) or (),
+                            getattr(args, 'max_depth', None))
+    profile_json = getattr(args, 'profile_json', None)
+    profiling = getattr(args, 'profile', False) or profile_json is not None
+    if args.command is not None:
+        from lib.batch import run_scan, run_snapshot, run_diff
+    if args.command == 'scan':
+        # Batch mode: no prompts and no terminal setup
+        profile = ScanProfile(os.path.abspath(args.path)) if profiling else None
+        status = run_scan(args.path, args.depth, args.top, args.json, prune=prune, profile=profile)
+        if profile_json is not None and profile.elapsed is not None:
+            save_profile(profile_json, [profile])
+        return status
+    if args.command == 'snapshot':
+        return run_snapshot(args.path, args.output, prune)
+    if args.command == 'diff':
+        return run_diff(args.old, args.new, args.path, args.json, everything=args.all)
+    set_scan_workers(args.workers, args.processes)
+    set_profiling(profiling)
+    set_aggregating(args.aggregate)
+    set_watching(args.watch)
+    if profile_json is not None:
+        atexit.register(save_profile, profile_json)
+
+    # Resizing forks helper programs and waits for the window, so only on request
+    if args.resize and not set_terminal_size(120, 42):
         # If automatic resizing failed, print a message asking the user to resize manually
         print(f"{Fore.YELLOW}For the best experience, please resize your terminal window to at least 120x40 characters.{Style.RESET_ALL}")
         print(f"{Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
         input()
         clear_screen()
 
-    # Add a small delay to give the terminal time to resize
-    time.sleep(0.5)
-
     # Show welcome message and get starting directory
     current_dir = show_welcome_message()
 
+    # Only needed once browsing starts, so loaded after the first prompt
+    from lib.aggregate import AGGREGATORS
+    from lib.listing import SORT_KEYS
+
     # Initialize page number
     current_page = 0
     items_per_page = 20
 
+    # Set when the current directory must be rescanned instead of served from cache
+    refresh = False
+
+    # Background scan of the current directory when streaming
+    scan = None
+
+    # Tree-wide view of the current directory instead of its listing: None,
+    # 'files'/'dirs' (largest anywhere below), 'dups' (duplicate files) or
+    # 'diff' (changes between two snapshots) or 'breakdown' (size by
+    # extension, owner or type), and its results, kept until something is
+    # deleted
+    view = None
+    view_items = None
+    view_total = 0
+    dup_groups = None
+    dup_stats = None
+    breakdown_name = 'ext'  # Aggregator shown by the 'breakdown' view
+
+    # Snapshot files compared by the 'diff' view, the directory they record,
+    # and whether the later one is a snapshot of now that 'r' takes again
+    diff_files = None
+    diff_root = None
+    diff_live = False
+    diff_changes = None
+    diff_summary = None
+
+    # Items marked for deletion in any listing: full path -> (size, is_dir)
+    marked = {}
+
+    # Stale column of the listing: age threshold in days (None hides it) and
+    # 'mtime' or 'atime'; the listing is ordered by one of SORT_KEYS
+    age_days = None
+    age_clock = 'mtime'
+    sort_key = 'size'
+
+    # Background scans of the largest directories on screen
+    prefetch = None
+
     while True:
-        # Check if directory exists
-        if not os.path.isdir(current_dir):
+        # Check if directory exists (a snapshot diff may show removed folders)
+        if view != 'diff' and not os.path.isdir(current_dir):
             print(f"{Fore.RED}Directory not found: {Fore.YELLOW}{current_dir}{Style.RESET_ALL}")
             print(f"{Fore.CYAN}Falling back to home directory...{Style.RESET_ALL}")
             current_dir = os.path.expanduser("~")  # Fallback to home directory
             current_page = 0  # Reset page when changing directory
+            view = None
+
+        # Guesses about where to go next are moot once the user has moved;
+        # a prefetch of the directory just opened is kept and waited for
+        if prefetch is not None:
+            prefetch.cancel(keep=current_dir)
+            prefetch = None
+
+        # A scan of a directory we've left is no longer needed
+        if scan is not None and (scan.directory != os.path.abspath(current_dir) or refresh
+                                 or view is not None):
+            scan.cancel()
+            scan = None
 
         # List directory contents
-        items = list_directory(current_dir)
+        if view == 'diff':
+            if refresh and diff_live:
+                diff_files = (diff_files[0], take_snapshot(diff_root) or diff_files[1])
+                view_items = None
+            refresh = False
+            if view_items is None:
+                diff_changes, diff_summary = compare_snapshots(diff_files[0], diff_files[1], current_dir)
+                if diff_changes is None:
+                    view = None
+                    current_dir = diff_root
+                    input(f"{Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
+                    continue
+                view_items = [(change.name, change.new_size or 0, change.is_dir, change.name.startswith('.'))
+                              for change in diff_changes]
+            items = view_items
+        elif view == 'dups':
+            if refresh or dup_groups is None:
+                if refresh:
+                    list_directory(current_dir, refresh=True)
+                    refresh = False
+                dup_groups, dup_stats = find_duplicate_files(current_dir)
+                if dup_groups is None:
+                    view = None
+                    input(f"{Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
+                    continue
+            items = [(path, group.size, False, os.path.basename(path).startswith('.'))
+                     for group in dup_groups for path in group.paths]
+        elif view == 'breakdown':
+            if refresh or view_items is None:
+                view_items = get_breakdown(current_dir, refresh=refresh)
+                refresh = False
+                if view_items is None:
+                    view = None
+                    input(f"{Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
+                    continue
+            # Groups, not files: only paging and switching apply to them
+            items = view_items.get(breakdown_name).rows()
+        elif view is not None:
+            if refresh:
+                list_directory(current_dir, refresh=True)
+                refresh = False
+                view_items = None
+            if view_items is None:
+                view_items, view_total = find_largest_items(current_dir, directories=view == 'dirs')
+            items = view_items
+        else:
+            if args.stream and scan is None and (refresh or not is_directory_cached(current_dir)):
+                scan = stream_directory(current_dir, refresh=refresh)
+                refresh = False
+            if scan is not None and not scan.done:
+                items = scan.items()
+            elif scan is not None and scan.error is not None:
+                print(f"{Fore.RED}Error accessing directory: {scan.error}{Style.RESET_ALL}")
+                scan = None
+                items = []
+            else:
+                scan = None
+                items = list_directory(current_dir, refresh=refresh, sort_key=sort_key,
+                                       age=(age_days, age_clock) if age_days is not None else None)
+                refresh = False
 
         # Calculate total pages
         total_items = len(items)
@@ -52,18 +321,149 @@ def main():
         # Ensure current_page is valid
         current_page = max(0, min(current_page, total_pages - 1)) if total_pages > 0 else 0
 
-        # Display current page
-        display_directory(current_dir, items, current_page, items_per_page)
+        # Stale bytes of the entries on the page, from the age bins of the scan
+        ages = None
+        if view is None and scan is None and age_days is not None:
+            start = current_page * items_per_page
+            found = get_stale_sizes(items, start, start + items_per_page, age_days, age_clock)
+            if found is not None:
+                ages = {'days': age_days, 'clock': age_clock, 'stale': found[0], 'histogram': found[1]}
+
+        # Prepare the directories most likely to be opened next while the page is read
+        if view is None and scan is None:
+            start = current_page * items_per_page
+            prefetch = prefetch_directories(current_dir, items[start:start + items_per_page])
 
-        # Show navigation options
-        show_navigation_options(current_page, total_pages)
+        # Follow the listing on screen for changes; other views are left alone
+        if view is None and scan is None:
+            start = current_page * items_per_page
+            watcher = watch_directory(current_dir, items[start:start + items_per_page])
+        else:
+            watch_directory(None, ())
+            watcher = None
+
+        # Draw the page and the navigation options as one frame, cut to the
+        # window so that it can be redrawn line by line
+        with screen.frame(clip=True):
+            if view == 'diff':
+                display_diff(current_dir, diff_changes, current_page, items_per_page, diff_summary)
+            elif view == 'dups':
+                display_duplicates(current_dir, dup_groups, current_page, items_per_page, dup_stats, marked)
+            elif view == 'breakdown':
+                display_breakdown(current_dir, view_items.get(breakdown_name), current_page, items_per_page,
+                                  [name for name in AGGREGATORS if name != breakdown_name])
+            elif view is not None:
+                display_directory(current_dir, items, current_page, items_per_page,
+                                  title=f"Largest {'folders' if view == 'dirs' else 'files'} below",
+                                  total_size=view_total, marked=marked)
+            else:
+                display_directory(current_dir, items, current_page, items_per_page, get_scan_summary(),
+                                  scan.progress if scan is not None else None, marked=marked, ages=ages,
+                                  sort_key=sort_key if scan is None else 'size')
+            show_navigation_options(current_page, total_pages)
 
-        # Get user input
-        choice = input(f"\n{Fore.CYAN}Enter your choice: {Fore.YELLOW}").strip().lower()
+        # Get user input; while streaming, redraw whenever new sizes arrive
+        choice = read_choice(f"\n{Fore.CYAN}Enter your choice: {Fore.YELLOW}", scan, watcher)
+        if choice is None:
+            continue
+        command = choice.strip()  # File names keep their case
+        choice = command.lower()
         print(f"{Style.RESET_ALL}", end="")  # Reset color after input
 
         if choice == 'q':
             break
+        elif choice == 'r':
+            # Rescan the current directory
+            refresh = True
+        elif choice == 't' or choice == 't d':
+            # Largest files (or folders) anywhere below the current directory
+            view = 'dirs' if choice == 't d' else 'files'
+            view_items = None
+            current_page = 0
+        elif choice == 'dup':
+            # Files with identical content anywhere below the current directory
+            view = 'dups'
+            dup_groups = None
+            current_page = 0
+        elif choice == 'b' or (choice.startswith('b ') and choice[2:].strip() in AGGREGATORS):
+            # Size below the current directory by extension, owner or type
+            if view != 'breakdown':
+                view = 'breakdown'
+                view_items = None
+            breakdown_name = choice[2:].strip() or breakdown_name
+            current_page = 0
+        elif choice == 'a' or choice.startswith('a '):
+            # Stale column: 'a', 'a 365', 'a 30 atime', 'a off'
+            words = choice.split()[1:]
+            if words == ['off']:
+                age_days = None
+                if sort_key == 'stale':
+                    sort_key = 'size'
+            elif all(word in ('mtime', 'atime') or word in map(str, AGE_DAYS) for word in words):
+                days = [int(word) for word in words if word.isdigit()]
+                age_days = days[-1] if days else (age_days or 90)
+                age_clock = 'atime' if 'atime' in words else 'mtime' if 'mtime' in words else age_clock
+                sort_key = 'stale'
+                view = None
+                current_page = 0
+            else:
+                print(f"\n{Fore.RED}Usage: a [{'|'.join(map(str, AGE_DAYS))}] [mtime|atime], or 'a off'{Style.RESET_ALL}")
+                input(f"{Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
+        elif choice.startswith('s ') and choice[2:].strip() in SORT_KEYS:
+            # Order of the regular listing; stale bytes need the stale column
+            sort_key = choice[2:].strip()
+            if sort_key == 'stale' and age_days is None:
+                age_days = 90
+            current_page = 0
+        elif view == 'breakdown' and (choice.isdigit() or choice[:2] in ('o ', 'd ', 'm ', 'u ')):
+            print(f"\n{Fore.RED}Items can't be opened, deleted or marked in a breakdown; use '..' to go back.{Style.RESET_ALL}")
+            input(f"{Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
+        elif view == 'diff' and (choice == 'd' or choice[:2] in ('o ', 'd ', 'm ', 'u ')):
+            # Rows come from snapshots: removed entries, or a tree that has changed since
+            print(f"\n{Fore.RED}Items can't be opened, deleted or marked in a snapshot diff; '..' at the top of the comparison goes back to the listing.{Style.RESET_ALL}")
+            input(f"{Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
+        elif choice.startswith('snap '):
+            # Record the sizes below the current directory for a later 'diff'
+            target = os.path.abspath(os.path.expanduser(command[5:].strip()))
+            if take_snapshot(current_dir, target):
+                print(f"\n{Fore.GREEN}Snapshot of {Fore.YELLOW}{current_dir}{Fore.GREEN} saved to {Fore.YELLOW}{target}{Style.RESET_ALL}")
+            input(f"{Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
+        elif choice.startswith('diff '):
+            # What changed between a snapshot and now (or a second snapshot)
+            try:
+                files = [os.path.abspath(os.path.expanduser(name)) for name in shlex.split(command[5:])]
+            except ValueError:
+                files = []
+            if len(files) not in (1, 2):
+                print(f"\n{Fore.RED}Usage: diff old-snapshot [new-snapshot]{Style.RESET_ALL}")
+                input(f"{Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
+                continue
+            live = len(files) == 1
+            root = snapshot_root(files[-1])
+            if root is not None and live:
+                files.append(take_snapshot(root))  # The tree as it is now
+            if root is None or files[-1] is None:
+                input(f"{Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
+                continue
+            view = 'diff'
+            view_items = None
+            diff_files = tuple(files)
+            diff_root = root
+            diff_live = live
+            current_dir = root
+            current_page = 0
+        elif view == 'diff' and choice in ('.', '..', '...'):
+            # Up within the compared tree, then back to the regular listing
+            if os.path.abspath(current_dir) != diff_root:
+                current_dir = os.path.dirname(current_dir)
+                view_items = None
+            else:
+                view = None
+            current_page = 0
+        elif view is not None and choice in ('.', '..', '...'):
+            # Back to the regular listing of the same directory
+            view = None
+            current_page = 0
         elif choice == '.' or choice == '..' or choice == '...':
             # Go up one level
             parent_dir = os.path.dirname(current_dir)
@@ -76,6 +476,7 @@ def main():
             if os.path.isdir(target_dir):
                 current_dir = os.path.abspath(target_dir)
                 current_page = 0  # Reset page when changing directory
+                view = None
             else:
                 print(f"\n{Fore.RED}Directory not found: {Fore.YELLOW}{target_dir}{Style.RESET_ALL}")
                 input(f"{Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
@@ -109,9 +510,21 @@ def main():
                 if item_details:
                     # Show delete confirmation screen
                     if show_delete_confirmation(item_details):
-                        # User confirmed deletion
-                        if delete_item(item_path):
-                            print(f"\n{Fore.GREEN}Successfully deleted {Fore.WHITE}{'directory' if is_dir else 'file'}{Fore.GREEN}: {Fore.YELLOW}{name}{Style.RESET_ALL}")
+                        # User confirmed deletion; a running scan would miss it
+                        if scan is not None:
+                            scan.cancel()
+                            scan = None
+                        if prefetch is not None:
+                            prefetch.cancel()
+                            prefetch = None
+                        view_items = None  # Rank again without the deleted item
+                        result = delete_item(item_path)
+                        if result.complete:
+                            marked = unmark(marked, item_path)
+                            if dup_groups is not None:
+                                dup_groups = [group.without(name) for group in dup_groups]
+                                dup_groups = [group for group in dup_groups if len(group.paths) > 1]
+                            print(f"\n{Fore.GREEN}Successfully deleted {Fore.WHITE}{'directory' if is_dir else 'file'}{Fore.GREEN}: {Fore.YELLOW}{name}{Fore.GREEN} ({humanize.naturalsize(result.freed)} freed){Style.RESET_ALL}")
                         else:
                             print(f"\n{Fore.RED}Failed to delete {Fore.WHITE}{'directory' if is_dir else 'file'}{Fore.RED}: {Fore.YELLOW}{name}{Style.RESET_ALL}")
 
@@ -122,6 +535,52 @@ def main():
             else:
                 print(f"\n{Fore.RED}Invalid selection.{Style.RESET_ALL}")
                 input(f"{Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
+        elif choice == 'd' or choice.startswith('d '):
+            # Delete several items at once: a selection such as 'd 1-5,8' or everything marked
+            if choice == 'd':
+                entries = [(path, size, is_dir) for path, (size, is_dir) in marked.items()]
+            else:
+                indices = parse_selection(choice[2:], total_items) or ()
+                entries = [(os.path.join(current_dir, items[index][0]), items[index][1], items[index][2])
+                           for index in indices]
+            entries = outermost_entries(entries)
+            if not entries:
+                print(f"\n{Fore.RED}{'Nothing is marked.' if choice == 'd' else 'Invalid selection.'}{Style.RESET_ALL}")
+                input(f"{Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
+            elif show_batch_delete_confirmation(entries):
+                # User confirmed deletion; a running scan would miss it
+                if scan is not None:
+                    scan.cancel()
+                    scan = None
+                if prefetch is not None:
+                    prefetch.cancel()
+                    prefetch = None
+                view_items = None  # Rank again without the deleted items
+                result, deleted = delete_items([path for path, _, _ in entries])
+                for path in deleted:
+                    marked = unmark(marked, path)
+                    if dup_groups is not None:
+                        dup_groups = [group.without(os.path.relpath(path, current_dir)) for group in dup_groups]
+                if dup_groups is not None:
+                    dup_groups = [group for group in dup_groups if len(group.paths) > 1]
+                color = Fore.GREEN if result.complete else Fore.RED
+                print(f"\n{color}Deleted {Fore.WHITE}{len(deleted)}{color} of {Fore.WHITE}{len(entries)}{color} items ({humanize.naturalsize(result.freed)} freed){Style.RESET_ALL}")
+                input(f"{Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
+        elif choice.startswith('m ') or choice.startswith('u ') or choice == 'u':
+            # Mark items for a later 'd', or unmark them
+            indices = parse_selection(choice[2:], total_items) if choice != 'u' else ()
+            if indices is None:
+                print(f"\n{Fore.RED}Invalid selection.{Style.RESET_ALL}")
+                input(f"{Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
+            elif choice == 'u':
+                marked = {}
+            for index in indices or ():
+                name, size, is_dir, _ = items[index]
+                path = os.path.join(current_dir, name)
+                if choice.startswith('m '):
+                    marked[path] = (size, is_dir)
+                else:
+                    marked.pop(path, None)
         elif choice.isdigit():
             # Navigate to selected item
             index = int(choice) - 1
@@ -130,6 +589,10 @@ def main():
                 if is_dir:
                     current_dir = os.path.join(current_dir, name)
                     current_page = 0  # Reset page when changing directory
+                    if view == 'diff':
+                        view_items = None  # Drill into the same comparison
+                    else:
+                        view = None
                 else:
                     print(f"\n{Fore.GREEN}Selected file: {Fore.YELLOW}{name}{Style.RESET_ALL}")
                     input(f"{Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
@@ -142,7 +605,7 @@ def main():
 
 if __name__ == "__main__":
     try:
-        main()
+        sys.exit(main())
     except KeyboardInterrupt:
         print(f"\n{Fore.YELLOW}Program terminated by user.{Style.RESET_ALL}")
         sys.exit(0)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for DiskMan's entry points.
+
+Each entry point is timed on every synthetic tree shape (see ``treegen.py``)
+in a fresh child process, so that peak RSS belongs to that measurement
+alone:
+
+    cold  first call in a new process (empty session cache, no index)
+    warm  the same call repeated in that process
+
+"Cold" refers to DiskMan's own caches; the OS page cache is only dropped
+with ``--drop-caches`` (Linux, needs root). Results are printed as a table
+and written as JSON; ``--compare`` prints the change against an earlier run.
+
+Usage:
+    python benchmarks/run.py [--scale X] [--shapes wide,deep] [--entries list_directory]
+                             [--output results.json] [--compare old.json]
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+import contextlib
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+from treegen import SHAPES, generate  # noqa: E402
+
+ENTRIES = ('get_size', 'list_directory', 'get_item_details', 'delete_item', 'display_directory')
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _peak_rss_kb():
+    """Peak resident set size of this process in KiB, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak  # bytes on macOS
+
+
+def _drop_caches():
+    """Ask the kernel to drop the page, dentry and inode caches."""
+    os.sync()
+    with open('/proc/sys/vm/drop_caches', 'w') as f:
+        f.write('3\n')
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Silence stdout at the file descriptor level (spinners, screen clears)."""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(saved)
+        os.close(devnull)
+
+
+def _timed(call):
+    started = time.perf_counter()
+    call()
+    return time.perf_counter() - started
+
+
+def run_child(entry, shape, tree, scale, seed, drop_caches):
+    """Measure one entry point on one tree; runs inside the child process.
+
+    Returns:
+        dict: ``cold``/``warm`` seconds, ``entries`` processed and ``peak_rss_kb``
+    """
+    from lib import file_operations, utils, ui
+    from lib.cache import SizeCache
+    file_operations.size_cache = SizeCache()  # No on-disk index: every run starts cold
+
+    if drop_caches:
+        _drop_caches()
+
+    with open(os.path.join(tree, '..', 'counts.json')) as f:
+        counts = json.load(f)
+    entries = counts['files'] + counts['dirs'] + counts['links']
+
+    with _quiet():
+        if entry == 'get_size':
+            cold = _timed(lambda: utils.get_size(tree))
+            warm = _timed(lambda: utils.get_size(tree))
+        elif entry == 'list_directory':
+            cold = _timed(lambda: file_operations.list_directory(tree))
+            warm = _timed(lambda: file_operations.list_directory(tree))
+        elif entry == 'get_item_details':
+            cold = _timed(lambda: file_operations.get_item_details(tree))
+            warm = _timed(lambda: file_operations.get_item_details(tree))
+        elif entry == 'delete_item':
+            # Two private copies: one deleted with nothing cached, one after a listing
+            copies = tempfile.mkdtemp(prefix='diskman-bench-delete-')
+            try:
+                victims = [os.path.join(copies, name, shape) for name in ('cold', 'warm')]
+                for victim in victims:
+                    generate(shape, victim, scale, seed)
+                cold = _timed(lambda: file_operations.delete_item(victims[0]))
+                file_operations.list_directory(os.path.dirname(victims[1]))
+                warm = _timed(lambda: file_operations.delete_item(victims[1]))
+            finally:
+                shutil.rmtree(copies, ignore_errors=True)
+        elif entry == 'display_directory':
+            items = file_operations.list_directory(tree)
+            entries = len(items[:20])
+            cold = _timed(lambda: ui.display_directory(tree, items))
+            warm = _timed(lambda: ui.display_directory(tree, items))
+        else:
+            raise ValueError(entry)
+
+    return {'cold': cold, 'warm': warm, 'entries': entries, 'peak_rss_kb': _peak_rss_kb()}
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _rate(entries, seconds):
+    return entries / seconds if seconds > 0 else None
+
+
+def print_table(results, baseline=None):
+    """Print results, with the change in warm/cold time against a baseline."""
+    old = {}
+    for row in (baseline or {}).get('results', ()):
+        old[(row['shape'], row['entry'])] = row
+    print(f"{'shape':<9} {'entry point':<18} {'entries':>8} {'cold s':>9} {'warm s':>9} "
+          f"{'cold ent/s':>11} {'warm ent/s':>11} {'peak RSS':>9}" + ("  vs baseline" if baseline else ""))
+    for row in results:
+        rss = f"{row['peak_rss_kb'] / 1024:.0f} MiB" if row['peak_rss_kb'] else "-"
+        line = (f"{row['shape']:<9} {row['entry']:<18} {row['entries']:>8} {row['cold']:>9.4f} "
+                f"{row['warm']:>9.4f} {row['cold_rate'] or 0:>11,.0f} {row['warm_rate'] or 0:>11,.0f} {rss:>9}")
+        before = old.get((row['shape'], row['entry']))
+        if before:
+            line += "  cold {:+.0%} warm {:+.0%}".format(row['cold'] / before['cold'] - 1,
+                                                         row['warm'] / before['warm'] - 1)
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DiskMan's entry points on synthetic trees")
+    parser.add_argument('--scale', type=float, default=1.0, help="size multiplier for every tree")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--shapes', default=','.join(SHAPES), help="comma-separated tree shapes")
+    parser.add_argument('--entries', default=','.join(ENTRIES), help="comma-separated entry points")
+    parser.add_argument('--output', help="JSON file to write (default: benchmark-<commit>.json)")
+    parser.add_argument('--compare', metavar='JSON', help="earlier results to compare against")
+    parser.add_argument('--drop-caches', action='store_true',
+                        help="drop the OS page cache before every cold run (Linux, root)")
+    parser.add_argument('--child', nargs=3, metavar=('ENTRY', 'SHAPE', 'TREE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        entry, shape, tree = args.child
+        print(json.dumps(run_child(entry, shape, tree, args.scale, args.seed, args.drop_caches)))
+        return 0
+
+    shapes = [s for s in args.shapes.split(',') if s]
+    entries = [e for e in args.entries.split(',') if e]
+    for name in shapes:
+        if name not in SHAPES:
+            parser.error(f"unknown shape: {name}")
+    for name in entries:
+        if name not in ENTRIES:
+            parser.error(f"unknown entry point: {name}")
+
+    workdir = tempfile.mkdtemp(prefix='diskman-bench-')
+    env = dict(os.environ, XDG_CACHE_HOME=os.path.join(workdir, 'cache'))
+    results = []
+    try:
+        for shape in shapes:
+            tree = os.path.join(workdir, shape, 'tree')
+            counts = generate(shape, tree, args.scale, args.seed)
+            with open(os.path.join(workdir, shape, 'counts.json'), 'w') as f:
+                json.dump(counts, f)
+            for entry in entries:
+                command = [sys.executable, os.path.abspath(__file__), '--scale', str(args.scale),
+                           '--seed', str(args.seed), '--child', entry, shape, tree]
+                if args.drop_caches:
+                    command.append('--drop-caches')
+                output = subprocess.check_output(command, env=env)
+                row = json.loads(output.decode().strip().splitlines()[-1])
+                row.update(shape=shape, entry=entry,
+                           cold_rate=_rate(row['entries'], row['cold']),
+                           warm_rate=_rate(row['entries'], row['warm']))
+                results.append(row)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+
+    commit = _git_commit()
+    report = {
+        'meta': {
+            'commit': commit,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'scale': args.scale,
+            'seed': args.seed,
+            'drop_caches': args.drop_caches,
+        },
+        'results': results,
+    }
+    output = args.output or f"benchmark-{commit or 'unknown'}.json"
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
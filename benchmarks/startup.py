@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Time from launching DiskMan to its first prompt.
+
+DiskMan is started repeatedly in a fresh interpreter with a pipe for stdin,
+and timed until it waits for the starting directory. The process is then
+killed, so nothing is scanned. The target is well under 100 ms.
+
+Usage:
+    python benchmarks/startup.py [--runs N] [--target MS] [-- DISKMAN-ARGS...]
+"""
+import os
+import sys
+import time
+import select
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROMPT = b'> '  # The welcome screen's directory prompt
+
+
+def time_to_prompt(args=(), env=None, timeout=10.0):
+    """Start DiskMan once and return the seconds until its first prompt."""
+    started = time.perf_counter()
+    child = subprocess.Popen([sys.executable, os.path.join(ROOT, 'DiskMan.py')] + list(args),
+                             stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                             stderr=subprocess.DEVNULL, env=env)
+    output = b''
+    try:
+        while not output.endswith(PROMPT):
+            remaining = started + timeout - time.perf_counter()
+            ready, _, _ = select.select([child.stdout], [], [], max(0.0, remaining))
+            if not ready:
+                raise RuntimeError(f"no prompt within {timeout:.0f}s")
+            chunk = os.read(child.stdout.fileno(), 65536)
+            if not chunk:
+                raise RuntimeError(f"DiskMan exited before prompting: {output[-200:]!r}")
+            output += chunk
+        return time.perf_counter() - started
+    finally:
+        child.kill()
+        child.wait()
+        child.stdin.close()
+        child.stdout.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--target', type=float, default=100.0, metavar='MS',
+                        help="exit with status 1 if the median is slower (default: 100)")
+    parser.add_argument('diskman_args', nargs='*', help="options passed to DiskMan")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='diskman-startup-') as cache:
+        env = dict(os.environ, XDG_CACHE_HOME=cache)
+        time_to_prompt(args.diskman_args, env)  # Warm the OS cache and byte-compile
+        times = sorted(time_to_prompt(args.diskman_args, env) for _ in range(args.runs))
+
+    median = times[len(times) // 2] * 1000
+    print(f"time to first prompt over {args.runs} runs: best {times[0] * 1000:.1f} ms, "
+          f"median {median:.1f} ms, worst {times[-1] * 1000:.1f} ms (target {args.target:.0f} ms)")
+    print(f"interpreter alone: {_interpreter_ms():.1f} ms")
+    return 0 if median <= args.target else 1
+
+
+def _interpreter_ms():
+    """Median start-up time of a bare interpreter, for reference."""
+    times = []
+    for _ in range(5):
+        started = time.perf_counter()
+        subprocess.check_call([sys.executable, '-c', 'pass'])
+        times.append(time.perf_counter() - started)
+    return sorted(times)[2] * 1000
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Memory cost per entry of DiskMan's scan tree.
+
+Compares a directory listing kept as ``(name, size, is_dir, is_hidden)``
+tuples with the column-oriented ``FileList`` used by the scanner, on a
+synthetic listing, and optionally measures a real scan.
+
+Usage:
+    python benchmarks/tree_memory.py [--files N] [--unique-names N] [PATH]
+"""
+import os
+import sys
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.filelist import FileList, FileListBuilder  # noqa: E402
+from lib.scanner import scan_tree  # noqa: E402
+
+
+def _measure(build):
+    """Return the bytes still allocated by ``build()`` and its result."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, result
+
+
+def _synthetic_names(files, unique_names):
+    """Deterministic names where a few are repeated many times, as in real trees."""
+    return ['file_%06d.dat' % (i % unique_names) for i in range(files)]
+
+
+def bench_listing(files, unique_names):
+    """Print bytes per file for tuples and for a FileList."""
+    # Names are created outside the measurement: both layouts reference the
+    # same strings, and the name bytes are the same whatever the layout
+    names = _synthetic_names(files, unique_names)
+
+    def as_tuples():
+        return [(name, 4096 + i, False, False) for i, name in enumerate(names)]
+
+    def as_filelist():
+        builder = FileListBuilder()
+        for i, name in enumerate(names):
+            builder.add(name, 4096 + i, False, False)
+        return builder.build()
+
+    tuple_bytes, _ = _measure(as_tuples)
+    compact_bytes, listing = _measure(as_filelist)
+    assert isinstance(listing, FileList) and len(listing) == files
+    print(f"listing of {files:,} files ({unique_names:,} distinct names), excluding name strings:")
+    print(f"  tuples    {tuple_bytes / files:8.1f} bytes/file")
+    print(f"  FileList  {compact_bytes / files:8.1f} bytes/file")
+
+    names_bytes, _ = _measure(lambda: _synthetic_names(files, unique_names))
+    print(f"  names     {names_bytes / files:8.1f} bytes/file when every name is a separate str")
+
+
+def bench_scan(path):
+    """Print bytes per entry of a real scan tree, name strings included."""
+    size, root = _measure(lambda: scan_tree(path))
+    entries = root.file_count + root.dir_count + 1
+    print(f"scan of {path}: {entries:,} entries ({root.dir_count + 1:,} directories)")
+    print(f"  tree      {size / entries:8.1f} bytes/entry, {size / 2 ** 20:.1f} MiB total")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('path', nargs='?', help="directory to scan as well")
+    parser.add_argument('--files', type=int, default=1000000)
+    parser.add_argument('--unique-names', type=int, default=50000)
+    args = parser.parse_args()
+
+    bench_listing(args.files, args.unique_names)
+    if args.path:
+        bench_scan(args.path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic directory trees for DiskMan benchmarks.
+
+Every shape is generated from a fixed seed, so the same scale always gives
+the same names, sizes and layout:
+
+    wide      one folder with a huge flat listing plus many small sub-folders
+    deep      a single long chain of nested folders
+    tiny      many folders full of files of a few bytes
+    sparse    a few huge sparse files (no blocks allocated on most filesystems)
+    symlinks  files and folders reached through many symbolic links, plus a loop
+
+Usage:
+    python benchmarks/treegen.py SHAPE DEST [--scale X] [--seed N]
+"""
+import os
+import random
+import argparse
+
+SHAPES = ('wide', 'deep', 'tiny', 'sparse', 'symlinks')
+
+
+def _write(path, size, rng):
+    """Create a file of ``size`` bytes with reproducible content."""
+    with open(path, 'wb') as f:
+        f.write(rng.getrandbits(8 * size).to_bytes(size, 'little') if size else b'')
+
+
+def _wide(root, scale, rng):
+    for i in range(int(20000 * scale)):
+        _write(os.path.join(root, 'file_%06d.dat' % i), rng.randint(0, 2048), rng)
+    for d in range(int(200 * scale)):
+        sub = os.path.join(root, 'dir_%04d' % d)
+        os.mkdir(sub)
+        for i in range(50):
+            _write(os.path.join(sub, 'item_%03d.txt' % i), rng.randint(0, 512), rng)
+
+
+def _deep(root, scale, rng):
+    path = root
+    for level in range(int(400 * scale)):
+        path = os.path.join(path, 'd%d' % (level % 10))
+        os.mkdir(path)
+        for i in range(5):
+            _write(os.path.join(path, 'f%d' % i), rng.randint(0, 4096), rng)
+
+
+def _tiny(root, scale, rng):
+    for d in range(int(100 * scale)):
+        sub = os.path.join(root, 'pkg_%03d' % d)
+        os.mkdir(sub)
+        for i in range(300):
+            _write(os.path.join(sub, 'index_%03d.js' % i), rng.randint(1, 64), rng)
+
+
+def _sparse(root, scale, rng):
+    for i in range(max(1, int(8 * scale))):
+        with open(os.path.join(root, 'disk_%02d.img' % i), 'wb') as f:
+            f.truncate(rng.randint(1, 4) * 1024 ** 3)
+
+
+def _symlinks(root, scale, rng):
+    targets = []
+    for d in range(int(50 * scale)):
+        sub = os.path.join(root, 'real_%03d' % d)
+        os.mkdir(sub)
+        targets.append(sub)
+        for i in range(20):
+            name = os.path.join(sub, 'data_%02d.bin' % i)
+            _write(name, rng.randint(0, 1024), rng)
+            os.symlink(name, os.path.join(sub, 'link_%02d' % i))
+        for i in range(5):
+            os.symlink(rng.choice(targets), os.path.join(sub, 'dirlink_%d' % i))
+    os.symlink(root, os.path.join(root, 'loop'))
+
+
+def generate(shape, dest, scale=1.0, seed=1):
+    """Create one synthetic tree.
+
+    Args:
+        shape (str): One of ``SHAPES``
+        dest (str): Directory to create; must not exist yet
+        scale (float): Multiplier applied to every count
+        seed (int): Seed of the random sizes and contents
+
+    Returns:
+        dict: ``files``, ``dirs`` and ``links`` counts of the generated tree
+    """
+    os.makedirs(dest)
+    generator = globals()['_' + shape]
+    generator(dest, scale, random.Random('%s-%d' % (shape, seed)))
+
+    counts = {'files': 0, 'dirs': 0, 'links': 0}
+    for path, dirs, files in os.walk(dest):
+        for name in dirs + files:
+            if os.path.islink(os.path.join(path, name)):
+                counts['links'] += 1
+            elif name in dirs:
+                counts['dirs'] += 1
+            else:
+                counts['files'] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic benchmark tree")
+    parser.add_argument('shape', choices=SHAPES)
+    parser.add_argument('dest')
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    print(generate(args.shape, args.dest, args.scale, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Cold-data age histograms for DiskMan.
+
+While scanning, every file is placed in an age bin by its ``st_mtime`` and
+by its ``st_atime``, from the stat result the scanner already holds: fresh,
+or not modified (accessed) for 30, 90 or 365 days. The bins of a file are
+packed into the spare bits of its ``FileList`` flags byte, so they cost no
+memory per file. Each ``DirNode`` carries ``ages``, the bytes of its whole
+subtree in every stale bin, rolled up to every ancestor like ``size``:
+
+    ages[0:3]   bytes last modified 30-90, 90-365, 365+ days ago
+    ages[3:6]   bytes last accessed 30-90, 90-365, 365+ days ago
+
+``ages`` is None while nothing below a directory is stale. Bins are fixed
+when a directory is listed; directories restored from the index keep the
+bins they had when they were indexed, until refreshed ('r').
+
+Access times are only as good as the filesystem's: with ``noatime`` they
+never move and with ``relatime`` they are updated at most once a day.
+"""
+import time
+from array import array
+
+AGE_DAYS = (30, 90, 365)    # Stale thresholds, in days
+CLOCKS = ('mtime', 'atime')  # Timestamps files are binned by
+AGE_SLOTS = len(AGE_DAYS) * len(CLOCKS)
+DAY = 86400
+
+
+def age_cutoffs(now=None):
+    """Return the timestamps older than 30, 90 and 365 days, as of ``now``."""
+    if now is None:
+        now = time.time()
+    return tuple(now - days * DAY for days in AGE_DAYS)
+
+
+def file_ages(size, packed):
+    """Return the ``ages`` of a single file, or None if it is fresh.
+
+    Args:
+        size (int): Size of the file
+        packed (int): Its bins as kept in its listing, the mtime bin
+            (0 = fresh to 3 = 365+ days) plus the atime bin shifted left by 2
+    """
+    if not packed:
+        return None
+    ages = array('q', bytes(8 * AGE_SLOTS))
+    for clock in range(len(CLOCKS)):
+        age = packed >> (2 * clock) & 3
+        if age:
+            ages[clock * len(AGE_DAYS) + age - 1] = size
+    return ages
+
+
+def add_ages(ages, other, sign=1):
+    """Add (or with ``sign=-1`` subtract) ``other`` to ``ages``.
+
+    Either may be None. ``ages`` is updated in place when it exists, so it
+    must belong to the caller's node.
+
+    Returns:
+        array: The updated ages, or None if both were None
+    """
+    if other is None:
+        return ages
+    if ages is None:
+        ages = array('q', bytes(8 * AGE_SLOTS))
+    for i, value in enumerate(other):
+        ages[i] += sign * value
+    return ages
+
+
+def ages_difference(new, old):
+    """Return ``new - old`` for two ``ages``, either of which may be None."""
+    return add_ages(add_ages(None, new), old, -1)
+
+
+def stale_bytes(ages, days, clock='mtime'):
+    """Bytes not modified (or accessed) for at least ``days`` days.
+
+    Args:
+        ages (array): Ages of a directory or file, or None
+        days (int): One of ``AGE_DAYS``
+        clock (str): One of ``CLOCKS``
+
+    Returns:
+        int: The stale bytes
+    """
+    if ages is None:
+        return 0
+    start = CLOCKS.index(clock) * len(AGE_DAYS)
+    return sum(ages[start + AGE_DAYS.index(days):start + len(AGE_DAYS)])
+
+
+def file_stale(size, packed, days, clock='mtime'):
+    """Return ``size`` if a file with these bins is stale, else 0."""
+    age = packed >> (2 * CLOCKS.index(clock)) & 3
+    return size if age > AGE_DAYS.index(days) else 0
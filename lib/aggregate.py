@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Single-pass aggregators for DiskMan.
+
+An aggregator sees every file the scanner measures, during the same walk,
+and sums bytes and file counts under a key of its own: the extension, the
+owner, the kind of file. It is handed the ``os.stat_result`` the scanner
+already holds, so it makes no syscalls of its own.
+
+New aggregators subclass ``Aggregator``, implement ``key`` (and ``label``
+if keys need translating for display) and are added with ``register``.
+"""
+import os
+
+# Kinds of files by extension, for the 'type' breakdown
+FILE_TYPES = {
+    'Images': ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tif', '.tiff', '.webp', '.heic', '.svg',
+               '.ico', '.raw', '.cr2', '.nef', '.psd'),
+    'Video': ('.mp4', '.mkv', '.mov', '.avi', '.wmv', '.flv', '.webm', '.m4v', '.mpg', '.mpeg'),
+    'Audio': ('.mp3', '.wav', '.flac', '.aac', '.ogg', '.m4a', '.wma', '.opus'),
+    'Documents': ('.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.odt', '.ods',
+                  '.txt', '.rtf', '.md', '.csv', '.epub'),
+    'Archives': ('.zip', '.tar', '.gz', '.tgz', '.bz2', '.xz', '.zst', '.7z', '.rar', '.iso',
+                 '.dmg', '.img', '.vmdk', '.qcow2', '.deb', '.rpm', '.pkg', '.msi'),
+    'Code': ('.py', '.js', '.ts', '.c', '.h', '.cpp', '.hpp', '.java', '.go', '.rs', '.rb',
+             '.php', '.sh', '.html', '.css', '.json', '.xml', '.yml', '.yaml', '.sql'),
+    'Binaries': ('.exe', '.dll', '.so', '.dylib', '.a', '.o', '.class', '.jar', '.pyc', '.wasm'),
+    'Logs': ('.log',),
+}
+_TYPE_OF = {ext: kind for kind, exts in FILE_TYPES.items() for ext in exts}
+OTHER = 'Other'
+NO_EXTENSION = '(none)'
+
+
+class Aggregator(object):
+    """Bytes and file counts of every file scanned, grouped by ``key``."""
+
+    name = None   # Used on the command line and in the 'b' command
+    title = None  # Heading of the breakdown view
+
+    __slots__ = ('bytes', 'counts')
+
+    def __init__(self):
+        self.bytes = {}   # key -> bytes
+        self.counts = {}  # key -> files
+
+    def key(self, name, st):
+        """Return the group of a file from its name and stat result."""
+        raise NotImplementedError
+
+    def label(self, key):
+        """Return the text shown for a group."""
+        return str(key)
+
+    def add(self, name, st):
+        """Count one file."""
+        key = self.key(name, st)
+        self.bytes[key] = self.bytes.get(key, 0) + st.st_size
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def merge(self, other):
+        """Add the groups of another aggregator of the same kind."""
+        for key, size in other.bytes.items():
+            self.bytes[key] = self.bytes.get(key, 0) + size
+            self.counts[key] = self.counts.get(key, 0) + other.counts[key]
+
+    def rows(self):
+        """Return ``(label, bytes, files)`` for every group, largest first."""
+        rows = [(self.label(key), size, self.counts[key]) for key, size in self.bytes.items()]
+        rows.sort(key=lambda row: row[1], reverse=True)
+        return rows
+
+
+class ExtensionAggregator(Aggregator):
+    """Space per file extension (lowercased)."""
+
+    name = 'ext'
+    title = 'Size by extension'
+    __slots__ = ()
+
+    def key(self, name, st):
+        return os.path.splitext(name)[1].lower()
+
+    def label(self, key):
+        return key or NO_EXTENSION
+
+
+class OwnerAggregator(Aggregator):
+    """Space per owning user."""
+
+    name = 'uid'
+    title = 'Size by owner'
+    __slots__ = ()
+
+    def key(self, name, st):
+        return st.st_uid
+
+    def label(self, key):
+        try:
+            import pwd
+            return f"{pwd.getpwuid(key).pw_name} ({key})"
+        except (ImportError, KeyError):  # Windows, or a user that no longer exists
+            return str(key)
+
+
+class TypeAggregator(Aggregator):
+    """Space per kind of file (images, video, archives, ...)."""
+
+    name = 'type'
+    title = 'Size by file type'
+    __slots__ = ()
+
+    def key(self, name, st):
+        return _TYPE_OF.get(os.path.splitext(name)[1].lower(), OTHER)
+
+
+AGGREGATORS = {}  # name -> Aggregator subclass, in registration order
+
+
+def register(cls):
+    """Make an ``Aggregator`` subclass available to every scan; usable as a decorator."""
+    AGGREGATORS[cls.name] = cls
+    return cls
+
+
+for _cls in (ExtensionAggregator, OwnerAggregator, TypeAggregator):
+    register(_cls)
+
+
+class Aggregates(object):
+    """One instance of each registered aggregator, fed together by a scan."""
+
+    __slots__ = ('aggregators',)
+
+    def __init__(self, names=None):
+        names = list(AGGREGATORS) if names is None else names
+        self.aggregators = [AGGREGATORS[name]() for name in names]
+
+    def fork(self):
+        """Return empty aggregators of the same kinds, for one worker of a scan."""
+        return Aggregates([aggregator.name for aggregator in self.aggregators])
+
+    def add(self, name, st):
+        """Count one file in every aggregator."""
+        for aggregator in self.aggregators:
+            aggregator.add(name, st)
+
+    def merge(self, other):
+        """Add the groups of another (per-worker) ``Aggregates``."""
+        for mine, theirs in zip(self.aggregators, other.aggregators):
+            mine.merge(theirs)
+
+    def get(self, name):
+        """Return the aggregator called ``name``, or None."""
+        for aggregator in self.aggregators:
+            if aggregator.name == name:
+                return aggregator
+        return None
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Non-interactive batch commands for DiskMan.
+
+These run without prompts, screen clears or terminal resizing so they can be
+used from cron jobs and scripts. Results are streamed while the scan runs.
+
+Exit status:
+    0   scan completed
+    1   scan completed, but some directories couldn't be read
+    2   bad arguments or unreadable starting directory
+    130 interrupted (Ctrl-C)
+"""
+import os
+import sys
+import json
+import time
+import heapq
+from .scanner import iter_directories, ScanStats
+from .snapshot import save_snapshot, diff_snapshots, diff_directory, SnapshotError
+
+EXIT_OK = 0
+EXIT_PARTIAL = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+
+def _largest_entries(node, top):
+    """Return the ``top`` largest immediate entries of a scanned directory."""
+    largest = heapq.nlargest(top, node.iter_items(), key=lambda item: item[1])
+    return [{'name': name, 'size': size, 'type': 'dir' if is_dir else 'file'}
+            for name, size, is_dir, _ in largest]
+
+
+def _write_profile(profile):
+    """Summarise a scan profile on stderr."""
+    sys.stderr.write(f"DiskMan: profile: {profile['dirs_listed']} directories in {profile['elapsed']:.3f}s, "
+                     f"{profile['listdir_calls']} listdir and {profile['stat_calls']} stat calls, "
+                     f"{profile['skipped_entries']} entries skipped, "
+                     f"{profile['unreadable_dirs']} directories unreadable\n")
+    for entry in profile['slowest'][:5]:
+        sys.stderr.write(f"DiskMan: profile: slow {entry['seconds']:.4f}s {entry['path']}\n")
+    for entry in profile['top_level'][:5]:
+        sys.stderr.write(f"DiskMan: profile: below {entry['name']} {entry['seconds']:.4f}s\n")
+    for entry in profile['errors']:
+        sys.stderr.write(f"DiskMan: profile: skipped {entry['path']}: {entry['error']}\n")
+
+
+def _reader_gone(out):
+    """Handle a reader that went away (e.g. piped into head).
+
+    Later writes to stdout, including the interpreter's final flush, go to
+    the null device instead of failing with a traceback.
+    """
+    if out is sys.stdout:
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    return EXIT_OK
+
+
+def run_scan(path, depth=1, top=0, as_json=False, out=None, prune=None, profile=None):
+    """Scan a directory and stream one record per directory down to ``depth``.
+
+    Records are written in post-order as soon as a directory's totals are
+    final, so memory stays bounded however large the tree is. A summary
+    record for the whole tree comes last.
+
+    Args:
+        path (str): Directory to scan
+        depth (int): Deepest level to report (0 = only the starting directory)
+        top (int): Number of largest entries to include per directory
+        as_json (bool): Write NDJSON instead of tab-separated text
+        out (file, optional): Output stream, defaults to stdout
+        prune (ScanFilter, optional): Parts of the tree to leave out; its
+            ``max_depth`` also caps ``depth``
+        profile (ScanProfile, optional): Filled in while scanning and
+            reported after the summary (a ``profile`` record in JSON mode,
+            a few lines on stderr otherwise)
+
+    Returns:
+        int: Process exit status
+    """
+    out = out or sys.stdout
+    if not os.path.isdir(path):
+        sys.stderr.write(f"DiskMan: not a directory: {path}\n")
+        return EXIT_USAGE
+
+    if prune is not None and prune.max_depth is not None:
+        depth = min(depth, prune.max_depth)
+    stats = ScanStats(profile)
+    started = time.perf_counter()
+    try:
+        for dir_path, level, node in iter_directories(path, stats, prune):
+            if level > depth:
+                continue
+            if as_json:
+                record = {'type': 'dir', 'path': dir_path, 'depth': level, 'size': node.size,
+                          'files': node.file_count, 'dirs': node.dir_count}
+                if top:
+                    record['top'] = _largest_entries(node, top)
+                out.write(json.dumps(record) + '\n')
+            else:
+                out.write(f"{node.size}\t{dir_path}\n")
+                for entry in _largest_entries(node, top) if top else ():
+                    out.write(f"{entry['size']}\t  {entry['name']}{os.sep if entry['type'] == 'dir' else ''}\n")
+            out.flush()
+            if level == 0:
+                summary = {'type': 'summary', 'path': dir_path, 'size': node.size,
+                           'files': node.file_count, 'dirs': node.dir_count,
+                           'errors': stats.errors, 'elapsed': round(time.perf_counter() - started, 3)}
+                if prune is not None:
+                    summary['pruned_dirs'] = len(stats.pruned_dirs)
+                    summary['pruned_files'] = stats.pruned_files
+
+        if profile is not None:
+            profile.elapsed = time.perf_counter() - started
+        if as_json:
+            out.write(json.dumps(summary) + '\n')
+            if profile is not None:
+                record = {'type': 'profile'}
+                record.update(profile.as_dict())
+                out.write(json.dumps(record) + '\n')
+            out.flush()
+        else:
+            if prune is not None:
+                sys.stderr.write(f"DiskMan: pruned {len(stats.pruned_dirs)} directories and "
+                                 f"{stats.pruned_files} files ({prune.describe()})\n")
+            if profile is not None:
+                _write_profile(profile.as_dict())
+    except BrokenPipeError:
+        return _reader_gone(out)
+    except (OSError, PermissionError) as e:
+        sys.stderr.write(f"DiskMan: cannot scan {path}: {e}\n")
+        return EXIT_USAGE
+    except KeyboardInterrupt:
+        sys.stderr.write("DiskMan: interrupted\n")
+        return EXIT_INTERRUPTED
+
+    if stats.errors:
+        sys.stderr.write(f"DiskMan: {stats.errors} directories could not be read\n")
+        return EXIT_PARTIAL
+    return EXIT_OK
+
+
+def run_snapshot(path, output, prune=None):
+    """Write a snapshot of a directory for a later ``diff``.
+
+    Args:
+        path (str): Directory to record
+        output (str): Snapshot file to write
+        prune (ScanFilter, optional): Parts of the tree to leave out
+
+    Returns:
+        int: Process exit status
+    """
+    if not os.path.isdir(path):
+        sys.stderr.write(f"DiskMan: not a directory: {path}\n")
+        return EXIT_USAGE
+    try:
+        stats = save_snapshot(path, output, prune)
+    except (OSError, PermissionError) as e:
+        sys.stderr.write(f"DiskMan: cannot snapshot {path}: {e}\n")
+        return EXIT_USAGE
+    except KeyboardInterrupt:
+        sys.stderr.write("DiskMan: interrupted\n")
+        return EXIT_INTERRUPTED
+    if stats.errors:
+        sys.stderr.write(f"DiskMan: {stats.errors} directories could not be read\n")
+        return EXIT_PARTIAL
+    return EXIT_OK
+
+
+def run_diff(old, new, base='', as_json=False, out=None, everything=False):
+    """Print what changed between two snapshots.
+
+    By default the changed entries directly inside ``base`` are printed,
+    most grown first. With ``everything``, every changed file and directory
+    below ``base`` is streamed in snapshot order instead, so memory stays
+    constant however much changed.
+
+    Args:
+        old (str): Earlier snapshot
+        new (str): Later snapshot
+        base (str): Directory to compare, relative to the snapshot root
+        as_json (bool): Write NDJSON instead of tab-separated text
+        out (file, optional): Output stream, defaults to stdout
+        everything (bool): Stream all changes below ``base``
+
+    Returns:
+        int: Process exit status
+    """
+    out = out or sys.stdout
+    base = base.replace(os.sep, '/').strip('/')
+    try:
+        if everything:
+            changes = diff_snapshots(old, new, base)
+        else:
+            changes = diff_directory(old, new, base)[0]
+        for change in changes:
+            if as_json:
+                out.write(json.dumps({'type': 'change', 'path': change.path, 'status': change.status,
+                                      'old': change.old_size, 'new': change.new_size,
+                                      'delta': change.delta}) + '\n')
+            else:
+                suffix = '/' if change.is_dir else ''
+                out.write(f"{change.delta:+d}\t{change.status}\t{change.path}{suffix}\n")
+        out.flush()
+    except BrokenPipeError:
+        return _reader_gone(out)
+    except (OSError, SnapshotError) as e:
+        sys.stderr.write(f"DiskMan: cannot compare snapshots: {e}\n")
+        return EXIT_USAGE
+    except KeyboardInterrupt:
+        sys.stderr.write("DiskMan: interrupted\n")
+        return EXIT_INTERRUPTED
+    return EXIT_OK
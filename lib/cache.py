@@ -0,0 +1,783 @@
+#!/usr/bin/env python3
+"""
+Session-wide size tree cache for DiskMan.
+
+Every scan is kept as a tree of ``DirNode`` objects so that entering a child,
+going back up or turning a page is answered from memory instead of walking
+the filesystem again.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+from .scanner import (scan_tree, read_level, walk_entries, LargestEntries, ScanStats,
+                      ScanCancelled)
+from .filelist import EMPTY
+from .profiler import ScanProfile
+from .ages import add_ages, ages_difference, file_ages
+
+# Rough cap on cached directories + file entries (~140 bytes each on average,
+# see benchmarks/tree_memory.py)
+DEFAULT_MAX_ENTRIES = 2000000
+
+
+def _is_within(path, parent):
+    """Check whether ``path`` is ``parent`` or lies below it."""
+    return path == parent or path.startswith(parent.rstrip(os.sep) + os.sep)
+
+
+def _weight(node):
+    """Count the directories and file entries held by a subtree."""
+    total = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        total += 1 + len(node.files or ())
+        if node.children:
+            stack.extend(node.children.values())
+    return total
+
+
+class SizeCache(object):
+    """A forest of scanned trees with LRU eviction of deep subtrees."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, index=None, workers=1, processes=1,
+                 open_index=None):
+        self.max_entries = max_entries
+        self._index = index           # Optional ScanIndex for warm starts
+        self._open_index = open_index  # Or a callable opening it on first use
+        self._opening = threading.Lock()
+        self.workers = workers        # Threads used for each scan
+        self.processes = processes    # Worker processes; > 1 selects the process backend
+        self.prune = None             # Optional ScanFilter applied to every scan
+        self.profiling = False        # Attach a ScanProfile to every scan (--profile)
+        self.profiles = []            # ScanProfile of every scan while profiling
+        self.aggregating = False      # Run the aggregators during every scan (--aggregate)
+        self.breakdowns = {}          # absolute path -> Aggregates of its last aggregated scan
+        self.last_stats = None        # ScanStats of the most recent scan
+        self.entries = 0
+        self.lock = threading.RLock()  # Guards the trees against background updates
+        self._revalidating = threading.Lock()
+        self._unsaved = []            # Collected index writes, made once the lock is released
+        self._roots = {}              # absolute path -> DirNode of each scan
+        self._prefetching = {}        # absolute path -> Event set once its prefetch ends
+        self._recent = OrderedDict()  # viewed paths, least recently viewed first
+
+    @property
+    def index(self):
+        """The on-disk index, opened when it is first needed (by the first scan)."""
+        if self._open_index is not None:
+            with self._opening:
+                if self._open_index is not None:
+                    self._index = self._open_index()
+                    self._open_index = None
+        return self._index
+
+    @index.setter
+    def index(self, index):
+        self._index = index
+        self._open_index = None
+
+    @property
+    def _store(self):
+        """The on-disk index, unless a filter leaves parts of the trees out."""
+        return self.index if self.prune is None else None
+
+    def _new_stats(self, path, aggregate=False):
+        """Return the counters for a scan of ``path``, profiled and aggregated if enabled."""
+        aggregates = None
+        if aggregate or self.aggregating:
+            from .aggregate import Aggregates  # Only for breakdowns ('b', --aggregate)
+            aggregates = Aggregates()
+        return ScanStats(ScanProfile(path) if self.profiling else None, aggregates)
+
+    def _finish_stats(self, path, stats, elapsed):
+        """Complete the counters of a finished scan and keep them as the latest."""
+        self._estimate_time_saved(stats, elapsed)
+        if stats.profile is not None:
+            stats.profile.elapsed = elapsed
+            self.profiles.append(stats.profile)
+        if stats.aggregates is not None:
+            self.breakdowns[path] = stats.aggregates
+        self.last_stats = stats
+
+    def _drop_breakdowns(self, path):
+        """Forget the breakdowns that a change at ``path`` makes stale."""
+        for root_path in list(self.breakdowns):
+            if _is_within(path, root_path):
+                del self.breakdowns[root_path]
+
+    def _bind(self, path):
+        """Return the scan filter bound to ``path``, or None without a filter."""
+        if self.prune is None:
+            return None
+        return self.prune.bind(path, os.stat(path))
+
+    def lookup(self, path):
+        """Find the cached node for a directory without scanning.
+
+        Args:
+            path (str): Absolute directory path
+
+        Returns:
+            DirNode: Cached node (possibly evicted), or None if never scanned
+        """
+        with self.lock:
+            return self._lookup(path)
+
+    def _lookup(self, path):
+        """Find the best cached node for ``path``; the caller holds the lock."""
+        found = None
+        for root_path, root in self._roots.items():
+            if not _is_within(path, root_path):
+                continue
+            node = root
+            rel = os.path.relpath(path, root_path)
+            if rel != os.curdir:
+                for part in rel.split(os.sep):
+                    if not node.children or part not in node.children:
+                        node = None
+                        break
+                    node = node.children[part]
+            # An evicted ancestor tree may overlap a newer scan of the path
+            if node is not None and (found is None or node.children is not None):
+                found = node
+        return found
+
+    def _nearest(self, path):
+        """Find the deepest cached directory at or above ``path``; the caller holds the lock."""
+        found = None
+        found_depth = -1
+        for root_path, root in self._roots.items():
+            if not _is_within(path, root_path):
+                continue
+            node = root
+            depth = root_path.rstrip(os.sep).count(os.sep)
+            rel = os.path.relpath(path, root_path)
+            if rel != os.curdir:
+                for part in rel.split(os.sep):
+                    if not node.children or part not in node.children:
+                        break
+                    node = node.children[part]
+                    depth += 1
+            if depth > found_depth or (depth == found_depth and node.children is not None):
+                found = node
+                found_depth = depth
+        return found
+
+    def get(self, path):
+        """Return a loaded node for a directory, scanning only if needed.
+
+        Args:
+            path (str): Absolute directory path
+
+        Returns:
+            DirNode: Node holding the directory listing
+
+        Raises:
+            OSError: If the directory can't be read
+        """
+        with self.lock:
+            prefetching = self._prefetching.get(path)
+        if prefetching is not None:
+            prefetching.wait()  # Already being scanned in the background
+
+        with self.lock:
+            node = self._lookup(path)
+            # Subtree totals are known but the directory's own files aren't
+            # (restored from the index, or measured by the process backend):
+            # they are read from the index, or else only this level is listed
+            skeleton = (node is not None and node.children is not None
+                        and not self._restore_files(node, path))
+        if skeleton:
+            self.revalidate(path)
+
+        with self.lock:
+            node = self._lookup(path)
+            if node is None or not node.loaded:
+                node = self._scan(path, node, graft=True)
+                self._restore_files(node, path)
+            self._touch(path)
+        self._write_saves()
+        return node
+
+    def _save(self, node, known=None):
+        """Collect the index rows of a tree; the caller holds the lock.
+
+        They are written by ``_write_saves`` once the lock is released, so a
+        large write doesn't hold up the UI, the watcher or prefetching.
+        """
+        if self._store is not None:
+            self._unsaved.append((self._store, self._store.collect(node, known)))
+
+    def _write_saves(self):
+        """Write the index rows collected so far; the caller must not hold ``lock``."""
+        while True:
+            with self.lock:
+                if not self._unsaved:
+                    return
+                store, collected = self._unsaved.pop(0)
+            store.write(collected)
+
+    def _restore_files(self, node, path):
+        """Read the own files of a cached directory from the index if they aren't kept.
+
+        The caller holds the lock.
+
+        Returns:
+            bool: True if ``node`` holds its own files
+        """
+        if node.files is None and node.children is not None and self._store is not None:
+            files = self._store.files(path, node.mtime, node.ino)
+            if files is not None:
+                node.files = files
+                self.entries += len(files)
+        return node.files is not None
+
+    def refresh(self, path, aggregate=False):
+        """Discard everything cached below a directory and scan it again.
+
+        Args:
+            path (str): Absolute directory path
+            aggregate (bool): Run the aggregators even without ``--aggregate``;
+                the result is kept in ``breakdowns[path]``
+
+        Returns:
+            DirNode: Freshly scanned node
+        """
+        with self.lock:
+            node = self._scan(path, self._lookup(path), graft=False, aggregate=aggregate)
+            self._touch(path)
+        self._write_saves()
+        return node
+
+    def prefetch(self, path, cancel=None):
+        """Make a directory listable ahead of time, without holding ``lock``.
+
+        Meant for background threads guessing where the user goes next: a
+        directory whose own files were never read is listed (one level), one
+        that was trimmed, evicted or never scanned is scanned. Nothing is
+        done once the cache is full, so a guess never evicts what was viewed.
+        The caller must not hold ``lock``.
+
+        Args:
+            path (str): Absolute directory path
+            cancel (threading.Event, optional): Stops the scan once set
+
+        Returns:
+            bool: True if the directory can now be listed without scanning
+        """
+        with self.lock:
+            node = self._lookup(path)
+            if node is not None and node.children is not None and self._restore_files(node, path):
+                return True
+            if self.entries >= self.max_entries or path in self._prefetching:
+                return False
+            done = self._prefetching[path] = threading.Event()
+        try:
+            if node is not None and node.children is not None:
+                self.revalidate(path, cancel=cancel)  # Only this level's files are missing
+            else:
+                known = self._store.load(path) if self._store is not None else None
+                fresh = scan_tree(path, known=known, workers=self.workers, cancel=cancel,
+                                  prune=self._bind(path))
+                with self.lock:
+                    if self._lookup(path) is node:  # Not scanned meanwhile
+                        self._insert(path, fresh, known)
+        except (OSError, PermissionError, ScanCancelled):
+            return False
+        finally:
+            with self.lock:
+                del self._prefetching[path]
+            done.set()
+        self._write_saves()
+        return self.is_loaded(path)
+
+    def is_loaded(self, path):
+        """Check whether a directory can be listed without scanning."""
+        with self.lock:
+            node = self._lookup(path)
+            return (node is not None and node.children is not None
+                    and self._restore_files(node, path))
+
+    def walk_entries(self, path, on_file, on_dir=None):
+        """Report every file and sub-directory anywhere below a directory.
+
+        The cached tree is walked in memory, so no syscalls are made for
+        anything already measured. Directories whose own listing was trimmed
+        are listed again (one level), and evicted subtrees are walked from
+        disk; the own files of directories restored from the index are read
+        from it. The callbacks run while ``lock`` is held for the cached part;
+        the caller must not hold ``lock`` itself.
+
+        Args:
+            path (str): Absolute directory path
+            on_file (callable): ``on_file(size, path, is_hidden)`` for each file
+            on_dir (callable, optional): ``on_dir(size, path, is_hidden)`` for
+                each sub-directory, with its subtree total
+
+        Returns:
+            int: Total size of the directory
+
+        Raises:
+            OSError: If the directory can't be read
+        """
+        trimmed = []   # Totals known, own files not kept: (path, mtime, ino)
+        evicted = []   # Nothing below the node kept
+        node = self.get(path)
+        with self.lock:
+            total = node.size
+            stack = [(node, path)]
+            while stack:
+                node, node_path = stack.pop()
+                if node_path != path and on_dir is not None:
+                    on_dir(node.size, node_path, node.is_hidden)
+                if node.children is None:
+                    evicted.append(node_path)
+                    continue
+                if node.files is None:
+                    trimmed.append((node_path, node.mtime, node.ino))
+                else:
+                    for name, size, is_dir, is_hidden in node.files:
+                        if not is_dir:
+                            on_file(size, os.path.join(node_path, name), is_hidden)
+                stack.extend((child, os.path.join(node_path, name))
+                             for name, child in node.children.items())
+
+        # Fill the gaps from the index or disk without holding the lock; the
+        # listings aren't kept, so a walk doesn't grow the cache
+        store = self._store
+        for node_path, mtime, ino in trimmed:
+            files = store.files(node_path, mtime, ino) if store is not None else None
+            if files is None:
+                try:
+                    files = read_level(node_path, self.prune).files
+                except (OSError, PermissionError):
+                    continue
+            for name, size, is_dir, is_hidden in files:
+                if not is_dir:
+                    on_file(size, os.path.join(node_path, name), is_hidden)
+        for node_path in evicted:
+            try:
+                walk_entries(node_path, on_file, on_dir, prune=self.prune)
+            except (OSError, PermissionError):
+                continue
+        return total
+
+    def largest(self, path, count):
+        """Find the largest files and directories anywhere below a directory.
+
+        Both rankings are kept in bounded heaps, so memory stays O(count)
+        however large the tree is. The caller must not hold ``lock``.
+
+        Args:
+            path (str): Absolute directory path
+            count (int): Number of files and of directories to keep
+
+        Returns:
+            tuple: ``(files, dirs, total)`` where ``files`` and ``dirs`` are
+                lists of ``(size, path, is_hidden)``, largest first, and
+                ``total`` is the size of the directory itself
+
+        Raises:
+            OSError: If the directory can't be read
+        """
+        files = LargestEntries(count)
+        dirs = LargestEntries(count)
+        total = self.walk_entries(path, files.add, dirs.add)
+        return files.results(), dirs.results(), total
+
+    def clear(self):
+        """Drop every cached tree."""
+        with self.lock:
+            self._roots.clear()
+            self._recent.clear()
+            self.entries = 0
+
+    def forget(self, path, counted=True):
+        """Remove a deleted file or directory from the cached trees.
+
+        Its known size and counts are subtracted from the parent directory
+        and every cached ancestor, so nothing has to be rescanned. If the
+        parent's listing was evicted the size isn't known; the totals above
+        it are then left as they are, to be corrected by ``revalidate`` of
+        the parent, which measures the nearest cached directory again.
+
+        Args:
+            path (str): Absolute path of the deleted item
+            counted (bool): False for symbolic links, which never counted as files
+
+        Returns:
+            bool: True if the item was found in a cached listing
+        """
+        parent_path, name = os.path.split(path)
+        with self.lock:
+            self._drop_breakdowns(path)
+            for root_path in list(self._roots):
+                if _is_within(root_path, path):
+                    self.entries -= _weight(self._roots.pop(root_path))
+            if self.index is not None:
+                self.index.forget(path)
+
+            parent = self._lookup(parent_path)
+            if parent is None or parent.children is None:
+                return False
+            self._restore_files(parent, parent_path)
+            if name in parent.children:
+                parent.stored = False
+                node = parent.children.pop(name)
+                self.entries -= _weight(node)
+                self._adjust_ancestors(parent, -node.size, -node.file_count, -(node.dir_count + 1),
+                                       add_ages(None, node.ages, -1))
+                return True
+            if parent.files is None:
+                return False  # Own files not kept (process backend); see revalidate
+            parent.stored = False
+            try:
+                i = parent.files.index(name)
+            except ValueError:
+                return False
+            size = parent.files.sizes[i]
+            ages = add_ages(None, file_ages(size, parent.files.ages(i)), -1)
+            parent.files = parent.files.without(i)
+            self.entries -= 1
+            self._adjust_ancestors(parent, -size, -1 if counted else 0, 0, ages)
+            return True
+
+    def revalidate_later(self, path, rescan=()):
+        """Re-list a cached directory in a background thread.
+
+        Args:
+            path (str): Absolute directory path
+            rescan (iterable): Names of sub-directories to scan again in full
+        """
+        thread = threading.Thread(target=self.revalidate, args=(path, rescan))
+        thread.daemon = True
+        thread.start()
+
+    def revalidate(self, path, rescan=(), cancel=None):
+        """Re-list one cached directory and reconcile it with the cached tree.
+
+        Files are re-read, sub-directories that are still present keep their
+        cached subtrees, and new sub-directories are scanned. The change in
+        totals is applied to the directory and all of its ancestors. The
+        caller must not hold ``lock``.
+
+        A directory whose listing was evicted, or that lies below an evicted
+        directory, can't be reconciled; the nearest cached directory above
+        it is measured again instead so that its totals, and those of its
+        ancestors, are right (after ``forget`` couldn't adjust them).
+
+        Args:
+            path (str): Absolute directory path
+            rescan (iterable): Names of sub-directories to scan again in full
+            cancel (threading.Event, optional): Stops the scans once set;
+                nothing is changed then
+
+        Raises:
+            ScanCancelled: If ``cancel`` was set before the change was applied
+        """
+        with self._revalidating:
+            if cancel is not None and cancel.is_set():
+                raise ScanCancelled(path)  # Waited behind another revalidation
+            with self.lock:
+                old = self._lookup(path)
+                if old is None or old.children is None:
+                    old = self._nearest(path)
+                    if old is None:
+                        return
+                    path = old.path
+                    rescan = ()
+                evicted = old.children is None
+                known = dict(old.children or {})
+            if evicted:
+                self._remeasure(path, old, cancel)
+                return
+
+            # Slow part runs without the lock so the UI stays responsive
+            try:
+                prune = self._bind(path)
+                fresh = read_level(path, prune)
+            except (OSError, PermissionError):
+                return
+            scanned = {}
+            for name, child in fresh.children.items():
+                if name in known and known[name].ino == child.ino and name not in rescan:
+                    continue
+                try:
+                    scanned[name] = scan_tree(os.path.join(path, name), workers=self.workers,
+                                              cancel=cancel, prune=prune)
+                except (OSError, PermissionError):
+                    scanned[name] = child
+
+            with self.lock:
+                if self._lookup(path) is not old:
+                    return  # Replaced by a rescan in the meantime
+                self._drop_breakdowns(path)
+                children = {}
+                for name in fresh.children:
+                    child = scanned.get(name) or old.children.get(name)
+                    if child is None:
+                        continue  # Vanished again since it was listed
+                    child.name = name
+                    child.parent = old
+                    children[name] = child
+                removed = [c for name, c in old.children.items() if children.get(name) is not c]
+
+                size = fresh.size + sum(c.size for c in children.values())
+                file_count = fresh.file_count + sum(c.file_count for c in children.values())
+                dir_count = sum(c.dir_count + 1 for c in children.values())
+                ages = add_ages(None, fresh.ages)
+                for child in children.values():
+                    ages = add_ages(ages, child.ages)
+                self.entries += (len(fresh.files) - len(old.files or ())
+                                 + sum(_weight(c) for c in scanned.values())
+                                 - sum(_weight(c) for c in removed))
+                self._adjust_ancestors(old, size - old.size, file_count - old.file_count,
+                                       dir_count - old.dir_count, ages_difference(ages, old.ages))
+                old.files = fresh.files
+                old.children = children
+                old.mtime = fresh.mtime
+                old.ino = fresh.ino
+                old.stored = False
+                if self._store is not None:
+                    for child in removed:
+                        self._store.forget(os.path.join(path, child.name))
+                self._save(old)
+            self._write_saves()
+
+    def _remeasure(self, path, old, cancel=None):
+        """Scan an evicted directory again and apply the change in its totals.
+
+        The new listing is written to the index and dropped again, so the
+        directory stays evicted. The caller holds ``_revalidating`` but not
+        ``lock``.
+
+        Raises:
+            ScanCancelled: If ``cancel`` was set before the scan finished
+        """
+        try:
+            prune = self._bind(path)
+            with self.lock:
+                known = self._store.load(path) if self._store is not None else None
+            node = scan_tree(path, known=known, workers=self.workers, cancel=cancel, prune=prune)
+        except (OSError, PermissionError):
+            return
+
+        with self.lock:
+            if self._lookup(path) is not old:
+                return  # Replaced by a rescan in the meantime
+            self._drop_breakdowns(path)
+            self._save(node, known)
+            self._adjust_ancestors(old, node.size - old.size, node.file_count - old.file_count,
+                                   node.dir_count - old.dir_count,
+                                   ages_difference(node.ages, old.ages))
+            old.mtime = node.mtime
+            old.ino = node.ino
+        self._write_saves()
+
+    def scan_streaming(self, path, refresh=False, progress=None, cancel=None, on_update=None):
+        """Scan a directory one top-level child at a time.
+
+        The directory is listed first so every entry is known at once; each
+        sub-directory is then measured in turn and reported through
+        ``on_update`` as soon as its size is known. Finished sub-directories
+        are cached straight away, so a cancelled scan keeps its progress.
+
+        Args:
+            path (str): Absolute directory path
+            refresh (bool): Ignore cached sizes and the on-disk index
+            progress (ScanProgress, optional): Live counters to update
+            cancel (threading.Event, optional): Stops the scan once set
+            on_update (callable, optional): ``on_update(root, pending)`` called
+                with the partial root node and the names still being sized
+
+        Returns:
+            DirNode: The fully scanned node, now cached
+
+        Raises:
+            OSError: If the directory can't be read
+            ScanCancelled: If ``cancel`` was set before the scan finished
+        """
+        stats = self._new_stats(path)
+        if stats.aggregates is not None:
+            refresh = True  # Cached sizes carry no per-file details to aggregate
+        known = None
+        if self._store is not None and not refresh:
+            known = self._store.load(path)
+        started = time.perf_counter()
+        prune = self._bind(path)
+        root = read_level(path, prune, stats)
+        root.name = path
+        stats.dirs_read += 1
+        if stats.profile is not None:
+            stats.profile.directory(path, time.perf_counter() - started, True,
+                                    len(root.children) + len(root.files))
+        pending = set(root.children)
+        if progress is not None:
+            progress.add(root.file_count, root.size, len(pending))
+        if on_update is not None:
+            on_update(root, set(pending))
+
+        for name, placeholder in list(root.children.items()):
+            if cancel is not None and cancel.is_set():
+                raise ScanCancelled(path)
+            child_path = os.path.join(path, name)
+            with self.lock:
+                child = None if refresh else self._lookup(child_path)
+            if child is None or child.children is None or child.ino != placeholder.ino:
+                try:
+                    child = scan_tree(child_path, known=known, stats=stats, workers=self.workers,
+                                      progress=progress, cancel=cancel, prune=prune)
+                except (OSError, PermissionError):
+                    child = placeholder
+                    child.files = EMPTY  # Unreadable directories count as empty
+                else:
+                    with self.lock:
+                        self._insert(child_path, child, known)
+                    self._write_saves()
+            elif progress is not None:
+                progress.add(child.file_count, child.size, 0)
+
+            with self.lock:
+                child.name = name
+                child.parent = root
+                root.children[name] = child
+                root.size += child.size
+                root.file_count += child.file_count
+                root.dir_count += child.dir_count + 1
+                root.ages = add_ages(root.ages, child.ages)
+                pending.discard(name)
+            if on_update is not None:
+                on_update(root, set(pending))
+
+        with self.lock:
+            self._insert(path, root, known)
+            self._finish_stats(path, stats, time.perf_counter() - started)
+            self._touch(path)
+        self._write_saves()
+        return root
+
+    def _insert(self, path, node, known=None):
+        """Splice a finished scan into the forest; the caller holds the lock.
+
+        ``known`` is what the index loaded before the scan, if anything.
+        """
+        for root_path in list(self._roots):
+            if root_path != path and _is_within(root_path, path):
+                # Covered by the new tree (or stale): drop the separate root
+                self.entries -= _weight(self._roots.pop(root_path))
+        self._splice(path, self._lookup(path), node)
+        self._save(node, known)
+
+    def _splice(self, path, old, node):
+        """Put ``node`` in the forest in place of ``old`` and apply the change in totals.
+
+        The caller holds the lock.
+        """
+        self.entries += _weight(node)
+        if old is not None:
+            self.entries -= _weight(old)
+        if old is None or old.parent is None:
+            self._roots[path] = node
+        else:
+            node.name = old.name
+            node.parent = old.parent
+            old.parent.children[old.name] = node
+            self._adjust_ancestors(old.parent, node.size - old.size,
+                                   node.file_count - old.file_count,
+                                   node.dir_count - old.dir_count,
+                                   ages_difference(node.ages, old.ages))
+
+    def _scan(self, path, old, graft, aggregate=False):
+        """Scan ``path`` and splice the result into the forest in place of ``old``."""
+        stats = self._new_stats(path, aggregate)
+        if self.processes > 1:
+            graft = False  # Worker processes can't see the cached trees
+        if stats.aggregates is not None:
+            graft = False  # Every file has to be seen by the aggregators
+        reuse = {}
+        for root_path in list(self._roots):
+            if root_path != path and _is_within(root_path, path):
+                # Earlier scans below this directory don't need to be walked again
+                sub = self._roots.pop(root_path)
+                if graft:
+                    reuse[root_path] = sub
+                else:
+                    self.entries -= _weight(sub)
+        known = None
+        if self._store is not None:
+            # Loaded even on refresh so the index can drop vanished directories
+            known = self._store.load(path)
+        started = time.perf_counter()
+        if self.processes > 1:
+            from .process_scan import scan_tree_processes  # multiprocessing is slow to import
+            node = scan_tree_processes(path, self.processes, stats=stats, prune=self.prune)
+        else:
+            node = scan_tree(path, reuse=reuse, known=known if graft else None, stats=stats,
+                             workers=self.workers, prune=self.prune)
+        self._finish_stats(path, stats, time.perf_counter() - started)
+        self.entries -= sum(_weight(n) for n in reuse.values())  # Now part of node
+        self._splice(path, old, node)
+        self._save(node, known)
+        return node
+
+    def _estimate_time_saved(self, stats, elapsed):
+        """Estimate how long the directories a filter left out would have taken.
+
+        Only directories the on-disk index knows from an earlier, unfiltered
+        scan can be estimated; they are costed at this scan's own rate.
+        """
+        if self.index is None or not stats.pruned_dirs or not stats.dirs_read:
+            return
+        skipped = sum(self.index.count_below(path) for path in stats.pruned_dirs)
+        if skipped:
+            stats.time_saved = skipped * elapsed / stats.dirs_read
+
+    def _adjust_ancestors(self, node, size, file_count, dir_count, ages=None):
+        """Apply a change in totals (and age bins) to a node and all of its ancestors."""
+        while node is not None:
+            node.size += size
+            node.file_count += file_count
+            node.dir_count += dir_count
+            node.ages = add_ages(node.ages, ages)
+            node = node.parent
+
+    def _touch(self, path):
+        """Mark a directory as viewed and evict old subtrees if over the cap."""
+        self._recent.pop(path, None)
+        self._recent[path] = None
+        if self.entries > self.max_entries:
+            self._evict(path)
+
+    def _collapse(self, node):
+        """Drop the listing of a subtree but keep its totals for the parent."""
+        self.entries -= _weight(node) - 1
+        node.children = None
+        node.files = None
+
+    def _evict(self, current):
+        """Collapse least recently viewed subtrees until back under the cap."""
+        recent = list(self._recent)
+        for i, path in enumerate(recent):
+            if self.entries <= self.max_entries:
+                return
+            # Never evict the current directory, its ancestors, or anything
+            # that still contains a more recently viewed directory
+            if path == current or any(_is_within(later, path) for later in recent[i + 1:]):
+                continue
+            self._recent.pop(path)
+            node = self._lookup(path)
+            if node is not None:
+                self._collapse(node)
+
+        # Still too big: trim the deepest levels below the current directory
+        node = self._lookup(current)
+        if node is None or not node.children:
+            return
+        for child in node.children.values():
+            for grandchild in (child.children or {}).values():
+                self._collapse(grandchild)
+        if self.entries > self.max_entries:
+            for child in node.children.values():
+                self._collapse(child)
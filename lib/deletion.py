@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Parallel deletion engine for DiskMan.
+
+``shutil.rmtree`` removes a tree one syscall at a time. Here the tree is
+torn down by the work-stealing pool used for scanning: listing a directory
+is one task, and its files are unlinked in batches that any worker can
+pick up, so a flat cache directory with a million files is spread over
+every worker too.
+
+A directory is removed once every file batch and sub-directory below it is
+done, so ``rmdir`` never races ahead of the unlinks. Cancelling stops the
+workers between two files: every entry is then either gone or untouched,
+and the directories still holding something are left in place.
+"""
+import os
+import stat
+import errno
+import time
+import threading
+from .parallel import run_work_stealing
+
+BATCH_SIZE = 256      # Files unlinked per task
+ERRORS_KEPT = 20      # Error examples kept
+
+# Walk and unlink relative to open directories, as ``shutil.rmtree`` does
+# where it can: each directory is opened from its parent's descriptor with
+# O_NOFOLLOW and checked against the entry that was listed, so swapping a
+# sub-directory for a symbolic link can't redirect the deletion elsewhere.
+# Without these calls (Windows) the tree is handed to ``shutil.rmtree``.
+_DIR_FD = ({os.open, os.stat, os.unlink, os.rmdir} <= os.supports_dir_fd
+           and os.scandir in os.supports_fd
+           and hasattr(os, 'O_DIRECTORY') and hasattr(os, 'O_NOFOLLOW'))
+_OPEN_FLAGS = os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0) | getattr(os, 'O_NOFOLLOW', 0)
+
+
+class DeleteStats(object):
+    """Live counters of a deletion, safe to update from worker threads."""
+
+    __slots__ = ('files', 'dirs', 'bytes', 'freed', 'errors', 'error_examples', 'cancelled',
+                 'complete', 'started', '_lock')
+
+    def __init__(self):
+        self.files = 0            # Files and links unlinked
+        self.dirs = 0             # Directories removed
+        self.bytes = 0            # Apparent size of the unlinked files, as DiskMan lists it
+        self.freed = 0            # Disk space released (files with no other hard link)
+        self.errors = 0           # Entries that couldn't be removed
+        self.error_examples = []  # (path, message)
+        self.cancelled = False
+        self.complete = False     # True once the path itself is gone
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def add(self, files, size, freed):
+        """Record a batch of unlinked files."""
+        with self._lock:
+            self.files += files
+            self.bytes += size
+            self.freed += freed
+
+    def error(self, path, error):
+        """Record an entry that couldn't be removed."""
+        with self._lock:
+            self.errors += 1
+            if len(self.error_examples) < ERRORS_KEPT:
+                self.error_examples.append((path, getattr(error, 'strerror', None) or str(error)))
+
+    @property
+    def files_per_second(self):
+        """Average rate at which files have been unlinked."""
+        elapsed = time.time() - self.started
+        return self.files / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def bytes_per_second(self):
+        """Average rate at which file sizes have been released."""
+        elapsed = time.time() - self.started
+        return self.bytes / elapsed if elapsed > 0 else 0.0
+
+
+class _Directory(object):
+    """A directory being emptied and the tasks still holding it up."""
+
+    __slots__ = ('path', 'name', 'parent', 'ident', 'fd', 'pending', 'blocked')
+
+    def __init__(self, path, parent, ident):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.parent = parent
+        self.ident = ident     # (st_dev, st_ino) it was listed with
+        self.fd = None         # Open while anything inside is pending
+        self.pending = 1       # The listing itself
+        self.blocked = False   # Something inside couldn't be removed
+
+    def open(self):
+        """Open the directory from its parent and make sure it is the one listed.
+
+        Raises:
+            OSError: If it can't be opened, is now a link, or was replaced
+        """
+        if self.parent is None:
+            fd = os.open(self.path, _OPEN_FLAGS)
+        else:
+            fd = os.open(self.name, _OPEN_FLAGS, dir_fd=self.parent.fd)
+        try:
+            st = os.fstat(fd)
+            if (st.st_dev, st.st_ino) != self.ident:
+                raise OSError(errno.ENOTDIR, "Directory was replaced while deleting", self.path)
+        except BaseException:
+            os.close(fd)
+            raise
+        self.fd = fd
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def _file_usage(st):
+    """Return ``(size, freed)`` of a file about to be unlinked."""
+    if stat.S_ISLNK(st.st_mode):
+        return 0, 0  # Links are never counted in listings
+    if st.st_nlink > 1:
+        return st.st_size, 0  # Another hard link keeps the data
+    blocks = getattr(st, 'st_blocks', None)
+    return st.st_size, blocks * 512 if blocks is not None else st.st_size
+
+
+def _unlink(path, stats, name=None, dir_fd=None):
+    """Remove a single file or link, recording what it held.
+
+    With ``dir_fd``, ``name`` is unlinked relative to that open directory
+    and ``path`` is only used in error reports.
+    """
+    try:
+        if dir_fd is None:
+            st = os.lstat(path)
+            os.unlink(path)
+        else:
+            st = os.stat(name, dir_fd=dir_fd, follow_symlinks=False)
+            os.unlink(name, dir_fd=dir_fd)
+    except OSError as e:
+        stats.error(path, e)
+        return False
+    size, freed = _file_usage(st)
+    stats.add(1, size, freed)
+    return True
+
+
+def _unlink_batch(directory, names, stats, cancel):
+    """Unlink files of one open directory until done or cancelled.
+
+    Returns:
+        bool: False if any of them couldn't be removed
+    """
+    removed = True
+    for name in names:
+        if cancel.is_set():
+            break
+        if not _unlink(os.path.join(directory.path, name), stats, name, directory.fd):
+            removed = False
+    return removed
+
+
+def _rmtree(path, stats):
+    """Delete a tree with ``shutil.rmtree``, where directories can't be opened safely.
+
+    The files are counted by a read-only walk first, since ``rmtree``
+    reports nothing but errors; they are credited once the tree is gone.
+    """
+    import shutil
+    files = size = freed = 0
+    for root, dirs, names in os.walk(path):
+        for name in names + [name for name in dirs if os.path.islink(os.path.join(root, name))]:
+            try:
+                st = os.lstat(os.path.join(root, name))
+            except OSError:
+                continue
+            file_size, file_freed = _file_usage(st)
+            files += 1
+            size += file_size
+            freed += file_freed
+    shutil.rmtree(path, onerror=lambda function, failed, info: stats.error(failed, info[1]))
+    stats.complete = not os.path.lexists(path)
+    if stats.complete:
+        stats.add(files, size, freed)
+    return stats
+
+
+def delete_tree(path, workers=4, stats=None, cancel=None):
+    """Delete a file or a whole directory tree.
+
+    Args:
+        path (str): File, link or directory to delete; links are removed,
+            never followed
+        workers (int): Number of threads unlinking in parallel
+        stats (DeleteStats, optional): Counters to update as entries go
+        cancel (threading.Event, optional): Stops the deletion once set
+
+    Returns:
+        DeleteStats: What was removed; ``complete`` is False if anything
+            (possibly ``path`` itself) is left, and ``cancelled`` is True if
+            ``cancel`` was set or Ctrl-C was pressed
+    """
+    if stats is None:
+        stats = DeleteStats()
+    if cancel is None:
+        cancel = threading.Event()
+    try:
+        st = os.lstat(path)
+    except OSError as e:
+        stats.error(path, e)
+        return stats
+    if not stat.S_ISDIR(st.st_mode):
+        stats.complete = _unlink(path, stats)
+        return stats
+    if not _DIR_FD:
+        return _rmtree(path, stats)
+
+    lock = threading.Lock()
+    root = _Directory(path, None, (st.st_dev, st.st_ino))
+    opened = set()  # Directories whose descriptor may still be open
+
+    def finish(directory):
+        # One task of ``directory`` is done; remove it and walk up once empty
+        while directory is not None:
+            with lock:
+                directory.pending -= 1
+                if directory.pending:
+                    return
+                directory.close()
+                opened.discard(directory)
+            if cancel.is_set():
+                return  # Leave the rest exactly as it is
+            if directory.blocked:
+                # Not empty, and neither are its ancestors
+                if directory.parent is not None:
+                    directory.parent.blocked = True
+                directory = directory.parent
+                continue
+            try:
+                if directory.parent is None:
+                    os.rmdir(directory.path)
+                else:
+                    os.rmdir(directory.name, dir_fd=directory.parent.fd)
+            except OSError as e:
+                stats.error(directory.path, e)
+                if directory.parent is not None:
+                    directory.parent.blocked = True
+            else:
+                with lock:
+                    stats.dirs += 1
+                if directory is root:
+                    stats.complete = True
+            directory = directory.parent
+
+    def visit(task, worker_id):
+        directory, names = task
+        if names is not None:
+            if not _unlink_batch(directory, names, stats, cancel):
+                directory.blocked = True
+            finish(directory)
+            return []
+
+        subdirs = []
+        files = []
+        try:
+            with lock:
+                opened.add(directory)
+            directory.open()
+            with os.scandir(directory.fd) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                        if is_dir:
+                            st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        subdirs.append(_Directory(os.path.join(directory.path, entry.name), directory,
+                                                  (st.st_dev, st.st_ino)))
+                    else:
+                        files.append(entry.name)
+        except OSError as e:
+            stats.error(directory.path, e)
+            directory.blocked = True
+            subdirs = []
+            files = []
+        tasks = [(subdir, None) for subdir in subdirs]
+        tasks.extend((directory, files[i:i + BATCH_SIZE]) for i in range(0, len(files), BATCH_SIZE))
+        with lock:
+            directory.pending += len(tasks)
+        finish(directory)  # The listing is done
+        return tasks
+
+    try:
+        run_work_stealing([(root, None)], visit, workers, cancel)
+    except KeyboardInterrupt:
+        # A worker may still be finishing a file in one of the open
+        # directories, and closing under it could let the descriptor be
+        # reused; the few left open are dropped with the process
+        cancel.set()
+    else:
+        # Every worker has stopped: close what a cancellation left half done
+        for directory in opened:
+            directory.close()
+    stats.cancelled = cancel.is_set()
+    return stats
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Duplicate file detection for DiskMan.
+
+Candidates are narrowed in stages so that most files are never read:
+
+    1. size          files with a size no other file has can't be duplicates
+    2. partial hash  the first and last block of each remaining file
+    3. full hash     the whole content, only for files that still collide
+
+Hard links to one inode are counted once, since removing a link frees
+nothing. Hashing runs on a thread pool: file reads and ``hashlib`` both
+release the GIL, so several files are read and hashed at the same time.
+"""
+import os
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .scanner import ScanCancelled
+
+BLOCK_SIZE = 64 * 1024       # Bytes hashed at each end of a file in the partial stage
+BUFFER_SIZE = 1024 * 1024    # Read size of the full-hash stage
+DEFAULT_WORKERS = 4
+
+
+class DuplicateGroup(object):
+    """Files of the same size with identical content."""
+
+    __slots__ = ('size', 'paths')
+
+    def __init__(self, size, paths):
+        self.size = size      # Size of each copy
+        self.paths = paths    # Paths of the copies, sorted
+
+    @property
+    def reclaimable(self):
+        """Bytes freed by keeping a single copy."""
+        return self.size * (len(self.paths) - 1)
+
+    def without(self, path):
+        """Return the group with one copy removed."""
+        return DuplicateGroup(self.size, [p for p in self.paths if p != path])
+
+
+def _inode_key(path):
+    """Identify the inode behind a path so hard links collapse into one."""
+    try:
+        st = os.stat(path)
+    except (OSError, PermissionError):
+        return None
+    return st.st_dev, st.st_ino
+
+
+def _partial_hash(size, path, cancel):
+    """Hash the first and last ``BLOCK_SIZE`` bytes of a file."""
+    if cancel is not None and cancel.is_set():
+        return None
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, 'rb') as f:
+            digest.update(f.read(BLOCK_SIZE))
+            if size > BLOCK_SIZE:
+                f.seek(max(BLOCK_SIZE, size - BLOCK_SIZE))
+                digest.update(f.read(BLOCK_SIZE))
+    except (OSError, PermissionError):
+        return None
+    return digest.digest()
+
+
+def _full_hash(size, path, cancel):
+    """Hash a whole file, reading it in large chunks into a reused buffer."""
+    digest = hashlib.blake2b(digest_size=16)
+    buffer = bytearray(min(BUFFER_SIZE, max(size, 1)))
+    view = memoryview(buffer)
+    try:
+        with open(path, 'rb', buffering=0) as f:
+            while True:
+                if cancel is not None and cancel.is_set():
+                    return None
+                count = f.readinto(buffer)
+                if not count:
+                    break
+                digest.update(view[:count])
+    except (OSError, PermissionError):
+        return None
+    return digest.digest()
+
+
+def _regroup(pool, groups, key, cancel):
+    """Split every group by a per-file key computed on the pool.
+
+    Args:
+        pool (ThreadPoolExecutor): Pool to compute keys on
+        groups (list): ``(size, paths)`` pairs
+        key (callable): ``key(size, path, cancel)`` returning a hashable key,
+            or None to drop the file (e.g. unreadable)
+        cancel (threading.Event): Stops the search once set
+
+    Returns:
+        list: ``(size, paths)`` pairs that still hold two files or more
+    """
+    jobs = [(size, path) for size, paths in groups for path in paths]
+    buckets = {}
+    for (size, path), value in zip(jobs, pool.map(lambda job: key(job[0], job[1], cancel), jobs)):
+        if value is not None:
+            buckets.setdefault((size, value), []).append(path)
+    if cancel is not None and cancel.is_set():
+        raise ScanCancelled()
+    return [(size, paths) for (size, _), paths in buckets.items() if len(paths) > 1]
+
+
+class DuplicateFinder(object):
+    """Collect files during a walk, then narrow them down to duplicate groups.
+
+    ``add`` has the signature of a walk callback, so a finder can be fed
+    directly by ``SizeCache.walk_entries`` or ``scanner.walk_entries``.
+    """
+
+    def __init__(self, min_size=1, workers=DEFAULT_WORKERS):
+        self.min_size = min_size   # Smaller files are ignored (empty files are all "equal")
+        self.workers = workers
+        self.files = 0             # Files offered
+        self.partial_hashed = 0    # Files that reached the partial-hash stage
+        self.full_hashed = 0       # Files that reached the full-hash stage
+        self._by_size = {}
+
+    def add(self, size, path, is_hidden=False):
+        """Offer one file found by the walk."""
+        self.files += 1
+        if size >= self.min_size:
+            self._by_size.setdefault(size, []).append(path)
+
+    def find(self, cancel=None):
+        """Run the hashing stages over the collected files.
+
+        Args:
+            cancel (threading.Event, optional): Stops the search once set
+
+        Returns:
+            list: ``DuplicateGroup`` objects, most reclaimable bytes first
+
+        Raises:
+            ScanCancelled: If ``cancel`` was set before the search finished
+        """
+        groups = [(size, paths) for size, paths in self._by_size.items() if len(paths) > 1]
+        self._by_size = {}
+
+        if cancel is None:
+            cancel = threading.Event()
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+            try:
+                groups = self._hash_stages(pool, groups, cancel)
+            except BaseException:
+                cancel.set()  # Queued and running hashes return at their next read
+                raise
+
+        result = [DuplicateGroup(size, sorted(paths)) for size, paths in groups]
+        result.sort(key=lambda group: group.reclaimable, reverse=True)
+        return result
+
+    def _hash_stages(self, pool, groups, cancel):
+        """Drop hard links, then split groups by partial and full hashes."""
+        # Same inode under several names: keep one name, it frees nothing
+        paths = [path for _, group in groups for path in group]
+        inodes = dict(zip(paths, pool.map(_inode_key, paths)))
+        linked = []
+        for size, group in groups:
+            names = {}
+            for path in group:
+                if inodes[path] is not None:
+                    names.setdefault(inodes[path], path)
+            if len(names) > 1:
+                linked.append((size, list(names.values())))
+
+        self.partial_hashed = sum(len(paths) for _, paths in linked)
+        groups = _regroup(pool, linked, _partial_hash, cancel)
+
+        # Files no larger than two blocks were hashed whole already
+        small = [(size, paths) for size, paths in groups if size <= 2 * BLOCK_SIZE]
+        large = [(size, paths) for size, paths in groups if size > 2 * BLOCK_SIZE]
+        self.full_hashed = sum(len(paths) for _, paths in large)
+        return small + _regroup(pool, large, _full_hash, cancel)
@@ -3,32 +3,71 @@
 File operations for DiskMan.
 """
 import os
-import shutil
+import stat
+import atexit
+import threading
+import heapq
 import datetime
-from .utils import get_size, is_hidden, start_spinner, stop_spinner
+from .utils import start_spinner, stop_spinner
+from .cache import SizeCache
+from .scanner import ScanCancelled
+from .ages import add_ages
+from . import profiler
+import humanize
 from colorama import Fore, Style
 
-def list_directory(directory):
-    """List all files and directories in the given directory with their sizes."""
-    try:
-        # Start spinner
-        start_spinner(f"Calculating sizes in {os.path.basename(directory)}...")
+# Feature modules (snapshots, deletion, streaming, watching, ...) are imported
+# by the functions that use them, so none of them delays the first prompt
 
-        # Get all items in the directory
-        items = []
-        for item in os.listdir(directory):
-            item_path = os.path.join(directory, item)
-            try:
-                size = get_size(item_path)
-                is_dir = os.path.isdir(item_path)
-                is_hidden_item = is_hidden(item_path)
-                items.append((item, size, is_dir, is_hidden_item))
-            except (OSError, PermissionError):
-                # Skip items that can't be accessed
-                pass
+def _open_index():
+    """Open the on-disk index; sqlite3 is only loaded once something is scanned."""
+    from .index import open_index
+    return open_index()
+
+# Sizes measured during this session, shared by every listing, and backed by
+# the on-disk index so unchanged directories aren't rescanned on the next run
+size_cache = SizeCache(open_index=_open_index)
+
+# The listing drawn last, reused by every redraw until its directory changes
+_listing = None
+
+# Keeps the sizes of the directories being browsed current (--watch)
+_watcher = None
 
-        # Sort by size (largest first)
-        items.sort(key=lambda x: x[1], reverse=True)
+def list_directory(directory, refresh=False, sort_key='size', age=None):
+    """List all files and directories in the given directory with their sizes.
+
+    Sizes come from the session cache when the directory was already measured,
+    either directly or as part of a parent scan. Nothing is copied or sorted
+    up front: the listing ranks entries as they are read, a page at a time.
+
+    Args:
+        directory (str): Directory to list
+        refresh (bool): Discard cached sizes and scan the directory again
+        sort_key (str): One of ``listing.SORT_KEYS``
+        age (tuple, optional): ``(days, clock)`` ranked by the 'stale' key
+
+    Returns:
+        Listing: ``(name, size, is_dir, is_hidden)`` tuples in sort order,
+            largest first by default, with the directory's ``total`` size;
+            an empty list if the directory can't be read
+    """
+    global _listing
+    from .listing import Listing
+    try:
+        directory = os.path.abspath(directory)
+        if refresh:
+            start_spinner(f"Rescanning {os.path.basename(directory)}...")
+            node = size_cache.refresh(directory)
+        else:
+            if not size_cache.is_loaded(directory):
+                # Walk the whole tree once; every child's size comes out of the same pass
+                start_spinner(f"Calculating sizes in {os.path.basename(directory)}...")
+            node = size_cache.get(directory)
+        with size_cache.lock:
+            if _listing is None or not _listing.is_current(node, sort_key, age):
+                _listing = Listing(node, sort_key, age)
+            items = _listing
 
         # Stop spinner
         stop_spinner()
@@ -41,35 +80,512 @@ def list_directory(directory):
         print(f"{Fore.RED}Error accessing directory: {e}{Style.RESET_ALL}")
         return []
 
-def delete_item(item_path):
-    """Delete a file or directory.
+def get_stale_sizes(items, start, stop, days, clock='mtime'):
+    """Return how much of the entries on one page of a listing is stale.
+
+    Answered from the age bins collected by the scan, without touching the
+    disk, and only for the entries asked for.
 
     Args:
-        item_path (str): Path to the file or directory to delete
+        items (Listing): Listing returned by ``list_directory``
+        start (int): First entry of the page
+        stop (int): Entry after the last one of the page
+        days (int): Age threshold, one of ``ages.AGE_DAYS``
+        clock (str): ``'mtime'`` for not modified, ``'atime'`` for not accessed
+
+    Returns:
+        tuple: ``(stale, ages)`` where ``stale`` maps each name on the page
+            to its bytes older than ``days`` and ``ages`` is a copy of the
+            directory's age histogram (see ``ages.py``), or None if the
+            directory couldn't be listed
+    """
+    from .listing import Listing
+    if not isinstance(items, Listing):
+        return None
+    with size_cache.lock:
+        stale = {items[i][0]: items.stale(i, days, clock) for i in range(start, min(stop, len(items)))}
+        return stale, add_ages(None, items.node.ages)
+
+def find_largest_items(directory, count=100, directories=False):
+    """Find the largest files or directories anywhere below a directory.
+
+    Only ``count`` entries are held at any time, however large the tree is.
+
+    Args:
+        directory (str): Directory to search
+        count (int): Number of entries to return
+        directories (bool): Rank directories instead of files
 
     Returns:
-        bool: True if deletion was successful, False otherwise
+        tuple: ``(items, total_size)`` where ``items`` holds
+            ``(relative_path, size, is_dir, is_hidden)`` tuples, largest
+            first, with paths relative to ``directory`` so they can be used
+            like the names of a regular listing
     """
     try:
-        if os.path.isdir(item_path):
-            # Delete directory and all its contents
-            start_spinner(f"Deleting directory: {os.path.basename(item_path)}...")
-            shutil.rmtree(item_path)
-        else:
-            # Delete file
-            start_spinner(f"Deleting file: {os.path.basename(item_path)}...")
-            os.remove(item_path)
+        directory = os.path.abspath(directory)
+        start_spinner(f"Finding largest {'folders' if directories else 'files'} in {os.path.basename(directory)}...")
+        files, dirs, total_size = size_cache.largest(directory, count)
+        stop_spinner()
+        items = [(os.path.relpath(path, directory), size, directories, is_hidden)
+                 for size, path, is_hidden in (dirs if directories else files)]
+        return items, total_size
+    except (OSError, PermissionError) as e:
+        stop_spinner()
+        print(f"{Fore.RED}Error accessing directory: {e}{Style.RESET_ALL}")
+        return [], 0
+
+def find_duplicate_files(directory):
+    """Find files with identical content anywhere below a directory.
 
+    Sizes come from the session cache; only files sharing a size with
+    another file are read, and only those whose first and last blocks also
+    match are hashed in full. Ctrl-C stops the search.
+
+    Args:
+        directory (str): Directory to search
+
+    Returns:
+        tuple: ``(groups, stats)`` where ``groups`` holds ``DuplicateGroup``
+            objects with paths relative to ``directory``, most reclaimable
+            first, and ``stats`` counts the files examined at each stage;
+            ``(None, None)`` if the search failed or was cancelled
+    """
+    from .duplicates import DuplicateFinder  # hashlib and a thread pool, only needed here
+    directory = os.path.abspath(directory)
+    finder = DuplicateFinder(workers=max(4, size_cache.workers))
+    try:
+        start_spinner(f"Finding duplicate files in {os.path.basename(directory)}...")
+        size_cache.walk_entries(directory, finder.add)
+        groups = finder.find()
+        stop_spinner()
+    except KeyboardInterrupt:
+        stop_spinner()
+        print(f"{Fore.YELLOW}Duplicate search cancelled.{Style.RESET_ALL}")
+        return None, None
+    except (OSError, PermissionError, ScanCancelled) as e:
+        stop_spinner()
+        print(f"{Fore.RED}Error accessing directory: {e}{Style.RESET_ALL}")
+        return None, None
+
+    for group in groups:
+        group.paths = [os.path.relpath(path, directory) for path in group.paths]
+    stats = {
+        'files': finder.files,
+        'partial_hashed': finder.partial_hashed,
+        'full_hashed': finder.full_hashed
+    }
+    return groups, stats
+
+def take_snapshot(directory, path=None):
+    """Record the size of everything below a directory in a snapshot file.
+
+    Args:
+        directory (str): Directory to record
+        path (str, optional): Snapshot file to write; a temporary file,
+            removed when DiskMan exits, if omitted
+
+    Returns:
+        str: Path of the snapshot, or None if it couldn't be taken
+    """
+    from .snapshot import save_snapshot  # gzip, only for snapshots
+    directory = os.path.abspath(directory)
+    if path is None:
+        import tempfile
+        fd, path = tempfile.mkstemp(prefix='diskman-', suffix='.snapshot.gz')
+        os.close(fd)
+        atexit.register(_remove_quietly, path)
+    try:
+        start_spinner(f"Taking snapshot of {os.path.basename(directory) or directory}...")
+        save_snapshot(directory, path, size_cache.prune)
+        stop_spinner()
+        return path
+    except KeyboardInterrupt:
+        stop_spinner()
+        print(f"{Fore.YELLOW}Snapshot cancelled.{Style.RESET_ALL}")
+        return None
+    except (OSError, PermissionError) as e:
+        stop_spinner()
+        print(f"{Fore.RED}Error taking snapshot: {e}{Style.RESET_ALL}")
+        return None
+
+def _remove_quietly(path):
+    """Delete a file if it still exists."""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def snapshot_root(path):
+    """Return the directory a snapshot file records, or None if it can't be read."""
+    from .snapshot import read_header, SnapshotError
+    try:
+        return read_header(path)['root']
+    except (OSError, SnapshotError) as e:
+        print(f"{Fore.RED}Error reading snapshot: {e}{Style.RESET_ALL}")
+        return None
+
+def compare_snapshots(old_path, new_path, directory):
+    """Compare one directory's entries across two snapshots.
+
+    Both files are streamed, so memory stays bounded by the size of one
+    listing however large the recorded trees are.
+
+    Args:
+        old_path (str): Earlier snapshot
+        new_path (str): Later snapshot
+        directory (str): Absolute directory inside the later snapshot's root
+
+    Returns:
+        tuple: ``(changes, summary)`` where ``changes`` holds ``Change``
+            objects for the new, removed, grown and shrunk entries of the
+            directory, most grown first, and ``summary`` has the directory's
+            ``old_total``/``new_total`` and both snapshots' ``old_created``/
+            ``new_created`` timestamps; ``(None, None)`` on error
+    """
+    from .snapshot import read_header, diff_directory, SnapshotError
+    try:
+        old_header = read_header(old_path)
+        new_header = read_header(new_path)
+        base = os.path.relpath(directory, new_header['root'])
+        base = '' if base == os.curdir else base.replace(os.sep, '/')
+        start_spinner("Comparing snapshots...")
+        changes, old_total, new_total = diff_directory(old_path, new_path, base)
+        stop_spinner()
+    except KeyboardInterrupt:
+        stop_spinner()
+        print(f"{Fore.YELLOW}Comparison cancelled.{Style.RESET_ALL}")
+        return None, None
+    except (OSError, SnapshotError) as e:
+        stop_spinner()
+        print(f"{Fore.RED}Error reading snapshot: {e}{Style.RESET_ALL}")
+        return None, None
+    summary = {
+        'old_total': old_total,
+        'new_total': new_total,
+        'old_created': old_header['created'],
+        'new_created': new_header['created']
+    }
+    return changes, summary
+
+def stream_directory(directory, refresh=False):
+    """Start measuring a directory in the background.
+
+    Args:
+        directory (str): Directory to scan
+        refresh (bool): Ignore cached sizes and scan everything again
+
+    Returns:
+        StreamingScan: The running scan, exposing a partial listing and progress
+    """
+    from .streaming import StreamingScan
+    return StreamingScan(size_cache, directory, refresh).start()
+
+def prefetch_directories(directory, items):
+    """Prepare the largest sub-directories on screen in the background.
+
+    Only directories that couldn't be listed straight from the cache are
+    scanned, so after a full scan this starts nothing at all.
+
+    Args:
+        directory (str): Directory being displayed
+        items (list): ``(name, size, is_dir, is_hidden)`` tuples on screen
+
+    Returns:
+        Prefetch: The running prefetch, or None if there is nothing to prepare
+    """
+    from .prefetch import Prefetch, PREFETCH_DIRS
+    directory = os.path.abspath(directory)
+    largest = heapq.nlargest(PREFETCH_DIRS, (item for item in items if item[2] and item[1]),
+                             key=lambda item: item[1])
+    names = [name for name, _, _, _ in largest
+             if not size_cache.is_loaded(os.path.join(directory, name))]
+    if not names:
+        return None
+    return Prefetch(size_cache, directory, names).start()
+
+def is_directory_cached(directory):
+    """Check whether a directory can be listed without scanning."""
+    return size_cache.is_loaded(os.path.abspath(directory))
+
+def set_scan_workers(workers, processes=1):
+    """Set how many threads or processes scan directories in parallel.
+
+    Args:
+        workers (int): Number of worker threads (1 scans serially)
+        processes (int): Number of worker processes; more than 1 selects the
+            multiprocessing backend for CPU-bound walks of enormous trees
+    """
+    size_cache.workers = max(1, workers)
+    size_cache.processes = max(1, processes)
+
+def set_scan_filter(one_filesystem=False, exclude=(), max_depth=None):
+    """Set which parts of a tree every scan leaves out.
+
+    Filtered scans are not written to the on-disk index, since their totals
+    don't cover the whole tree.
+
+    Args:
+        one_filesystem (bool): Don't enter sub-directories on other devices
+        exclude (iterable): Glob patterns of names (or full paths, for
+            patterns containing a separator) to skip
+        max_depth (int, optional): Keep listings only this many levels below
+            the scanned directory; deeper totals are still counted
+
+    Returns:
+        ScanFilter: The filter in use, or None if nothing is pruned
+    """
+    if one_filesystem or exclude or max_depth is not None:
+        from .prune import ScanFilter
+        size_cache.prune = ScanFilter(one_filesystem, exclude, max_depth)
+    else:
+        size_cache.prune = None
+    return size_cache.prune
+
+def set_profiling(enabled):
+    """Record where the time of every scan and every redraw goes.
+
+    Args:
+        enabled (bool): Attach a profile to each scan and time each listing
+    """
+    size_cache.profiling = enabled
+    profiler.render_stats = profiler.RenderStats() if enabled else None
+
+def set_watching(enabled):
+    """Keep the sizes of the directories being browsed up to date as files change.
+
+    Args:
+        enabled (bool): Start watching with inotify (Linux) or by polling
+
+    Returns:
+        Watcher: The running watcher, or None when watching is off
+    """
+    global _watcher
+    if _watcher is not None:
+        _watcher.stop()
+        _watcher = None
+    if enabled:
+        from .watch import Watcher
+        _watcher = Watcher(size_cache).start()
+    return _watcher
+
+def watch_directory(directory, items):
+    """Follow the directory on screen and the entries on its page for changes.
+
+    Changes are applied to the cached sizes in the background; the watcher's
+    ``version`` is bumped when the directory's totals move.
+
+    Args:
+        directory (str): Directory being displayed, or None to pause watching
+        items (list): ``(name, size, is_dir, is_hidden)`` tuples on screen
+
+    Returns:
+        Watcher: The running watcher, or None when watching is off
+    """
+    if _watcher is not None:
+        _watcher.watch(directory, items)
+    return _watcher
+
+def set_aggregating(enabled):
+    """Break every scan down by extension, owner and file type as it runs.
+
+    Args:
+        enabled (bool): Feed the aggregators during every scan; cached sizes
+            and the index (warm starts) are then not reused, since they
+            carry no per-file details
+    """
+    size_cache.aggregating = enabled
+
+def get_breakdown(directory, refresh=False):
+    """Return where the space below a directory goes, by extension, owner and type.
+
+    The breakdown of the last aggregated scan of exactly this directory is
+    reused; otherwise the directory is scanned again with the aggregators.
+
+    Args:
+        directory (str): Directory to break down
+        refresh (bool): Scan again even if a breakdown is available
+
+    Returns:
+        Aggregates: The filled-in aggregators, or None if the directory
+            can't be read
+    """
+    directory = os.path.abspath(directory)
+    with size_cache.lock:
+        breakdown = None if refresh else size_cache.breakdowns.get(directory)
+    if breakdown is not None:
+        return breakdown
+    try:
+        start_spinner(f"Breaking down {os.path.basename(directory) or directory}...")
+        size_cache.refresh(directory, aggregate=True)
         stop_spinner()
-        return True
     except (OSError, PermissionError) as e:
         stop_spinner()
-        print(f"{Fore.RED}Error deleting item: {e}{Style.RESET_ALL}")
+        print(f"{Fore.RED}Error accessing directory: {e}{Style.RESET_ALL}")
+        return None
+    with size_cache.lock:
+        return size_cache.breakdowns.get(directory)
+
+def save_profile(path, profiles=None):
+    """Write scan profiles and render timings to a JSON file.
+
+    Args:
+        path (str): File to write
+        profiles (list, optional): ``ScanProfile`` objects to write, defaults
+            to every scan of this session
+
+    Returns:
+        bool: True if the file was written
+    """
+    import json
+    if profiles is None:
+        profiles = size_cache.profiles
+    report = {
+        'scans': [profile.as_dict() for profile in profiles],
+        'render': profiler.render_stats.as_dict() if profiler.render_stats is not None else None
+    }
+    try:
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        return True
+    except OSError as e:
+        print(f"{Fore.RED}Error writing profile: {e}{Style.RESET_ALL}")
         return False
 
+def get_scan_summary():
+    """Describe how the most recent scan used the on-disk index and pruning.
+
+    Returns:
+        dict: ``reused``/``rescanned`` directory counts and ``index_time``
+            (timestamp of the oldest reused entry or None) when the index is
+            in use, ``pruned_dirs``/``pruned_files``/``pruned_examples``/
+            ``time_saved``/``rules`` when a scan filter is set, and
+            ``profile`` while profiling; None if there is nothing to report
+    """
+    stats = size_cache.last_stats
+    if stats is None:
+        return None
+    summary = {}
+    if size_cache.index is not None and size_cache.prune is None:
+        summary['reused'] = stats.dirs_reused
+        summary['rescanned'] = stats.dirs_read
+        summary['index_time'] = stats.index_time
+    if size_cache.prune is not None:
+        summary['rules'] = size_cache.prune.describe()
+        summary['pruned_dirs'] = len(stats.pruned_dirs)
+        summary['pruned_files'] = stats.pruned_files
+        summary['pruned_examples'] = stats.pruned_dirs[:3]
+        summary['time_saved'] = stats.time_saved
+    if stats.profile is not None:
+        summary['profile'] = stats.profile.as_dict()
+    return summary or None
+
+def delete_item(item_path):
+    """Delete a file or directory.
+
+    Directories are removed by a pool of threads with a live files/bytes
+    per second line; Ctrl-C stops the deletion and leaves every remaining
+    entry untouched. The removed item's known size is subtracted from the
+    cached sizes of its parent and every ancestor; only if it isn't known
+    (the parent's listing was evicted) is the parent re-listed, in the
+    background.
+
+    Args:
+        item_path (str): Path to the file or directory to delete
+
+    Returns:
+        DeleteStats: What was removed, including the bytes freed;
+            ``complete`` is True if the item is gone
+    """
+    from .deletion import DeleteStats, delete_tree
+    item_path = os.path.abspath(item_path)
+    name = os.path.basename(item_path)
+    is_link = os.path.islink(item_path)
+    kind = "directory" if os.path.isdir(item_path) and not is_link else "file"
+    stats = DeleteStats()
+    start_spinner(f"Deleting {kind}: {name}...", lambda: _delete_status(stats))
+    delete_tree(item_path, workers=max(4, size_cache.workers), stats=stats)
+    stop_spinner()
+
+    _report_delete(stats)
+
+    if stats.complete:
+        if not size_cache.forget(item_path, counted=not is_link):
+            size_cache.revalidate_later(os.path.dirname(item_path))
+    else:
+        # Part of a directory may already be gone, so measure it again
+        size_cache.revalidate_later(os.path.dirname(item_path), [name])
+    return stats
+
+def delete_items(item_paths):
+    """Delete several files and directories in one pass.
+
+    The items are removed one after another under a single progress line,
+    each directory by the parallel engine used by ``delete_item``. Ctrl-C
+    stops the whole batch. Cached sizes are updated as in ``delete_item``,
+    with at most one background re-listing per parent directory.
+
+    Args:
+        item_paths (list): Paths of the files and directories to delete
+
+    Returns:
+        tuple: ``(stats, deleted)``, where ``stats`` is the ``DeleteStats``
+            of the whole batch and ``deleted`` lists the paths that are gone
+    """
+    from .deletion import DeleteStats, delete_tree
+    item_paths = [os.path.abspath(path) for path in item_paths]
+    stats = DeleteStats()
+    cancel = threading.Event()
+    deleted = []
+    rescan = {}  # Parent directory to re-list -> names to measure again
+    start_spinner(f"Deleting {len(item_paths)} items...", lambda: _delete_status(stats))
+    for item_path in item_paths:
+        parent, name = os.path.split(item_path)
+        if cancel.is_set():
+            continue  # Left untouched
+        is_link = os.path.islink(item_path)
+        stats.complete = False
+        try:
+            delete_tree(item_path, workers=max(4, size_cache.workers), stats=stats, cancel=cancel)
+        except KeyboardInterrupt:
+            cancel.set()  # Between two items; the rest stays as it is
+            stats.cancelled = True
+        if stats.complete:
+            deleted.append(item_path)
+            if not size_cache.forget(item_path, counted=not is_link):
+                rescan.setdefault(parent, [])
+        else:
+            rescan.setdefault(parent, []).append(name)
+    stop_spinner()
+    stats.complete = len(deleted) == len(item_paths)
+
+    _report_delete(stats)
+    for parent, names in rescan.items():
+        size_cache.revalidate_later(parent, names)
+    return stats, deleted
+
+def _report_delete(stats):
+    """Print why a deletion stopped short, if it did."""
+    if stats.cancelled:
+        print(f"{Fore.YELLOW}Deletion cancelled after {stats.files:,} files ({humanize.naturalsize(stats.bytes)}); the rest was left in place.{Style.RESET_ALL}")
+    elif stats.errors:
+        path, message = stats.error_examples[0]
+        more = f" (and {stats.errors - 1} more)" if stats.errors > 1 else ""
+        print(f"{Fore.RED}Error deleting item: {path}: {message}{more}{Style.RESET_ALL}")
+
+def _delete_status(stats):
+    """Progress text for the deletion spinner."""
+    return (f"{stats.files:,} files ({stats.files_per_second:,.0f}/s), "
+            f"{humanize.naturalsize(stats.bytes)} ({humanize.naturalsize(stats.bytes_per_second)}/s)")
+
 def get_item_details(item_path):
     """Get detailed information about a file or directory.
 
+    Sizes, counts and the largest children come from the session cache, which
+    already holds them for anything shown in a listing; only the item itself
+    is stat'ed, once and without following a symbolic link, for its type
+    and timestamps.
+
     Args:
         item_path (str): Path to the file or directory
 
@@ -78,12 +594,13 @@ def get_item_details(item_path):
     """
     try:
         # Get basic file information
+        item_path = os.path.abspath(item_path)
         name = os.path.basename(item_path)
-        size = get_size(item_path)
-        is_dir = os.path.isdir(item_path)
 
-        # Get file stats
-        stats = os.stat(item_path)
+        # Get file stats; a link is described, not its target
+        stats = os.lstat(item_path)
+        is_dir = stat.S_ISDIR(stats.st_mode)
+        is_link = stat.S_ISLNK(stats.st_mode)
         created_time = datetime.datetime.fromtimestamp(stats.st_ctime)
         modified_time = datetime.datetime.fromtimestamp(stats.st_mtime)
         accessed_time = datetime.datetime.fromtimestamp(stats.st_atime)
@@ -91,35 +608,37 @@ def get_item_details(item_path):
         details = {
             'name': name,
             'path': item_path,
-            'size': size,
+            'size': 0 if is_link else stats.st_size,
             'is_dir': is_dir,
             'created': created_time,
             'modified': modified_time,
             'accessed': accessed_time
         }
 
-        # If it's a directory, get its contents
+        # If it's a directory, summarise its contents from the scan data
         if is_dir:
             try:
-                contents = []
-                for i, item in enumerate(os.listdir(item_path)):
-                    if i >= 20:  # Limit to first 20 items
-                        contents.append("... (more items not shown)")
-                        break
-
-                    sub_path = os.path.join(item_path, item)
-                    sub_is_dir = os.path.isdir(sub_path)
-                    sub_size = get_size(sub_path)
-
-                    contents.append({
-                        'name': item,
-                        'is_dir': sub_is_dir,
-                        'size': sub_size
-                    })
+                if not size_cache.is_loaded(item_path):
+                    start_spinner(f"Calculating sizes in {name}...")
+                node = size_cache.get(item_path)
+                stop_spinner()
+                with size_cache.lock:
+                    # Only the 20 largest entries are ever built
+                    largest = heapq.nlargest(20, node.iter_items(), key=lambda x: x[1])
+                    item_count = node.item_count()
+                    details['size'] = node.size
+                    details['file_count'] = node.file_count
+                    details['dir_count'] = node.dir_count
+
+                contents = [{'name': sub_name, 'is_dir': sub_is_dir, 'size': sub_size}
+                            for sub_name, sub_size, sub_is_dir, _ in largest]
+                if item_count > 20:
+                    contents.append("... (more items not shown)")
 
                 details['contents'] = contents
-                details['item_count'] = len(os.listdir(item_path))
+                details['item_count'] = item_count
             except (OSError, PermissionError):
+                stop_spinner()
                 details['contents'] = ["Error: Unable to access directory contents"]
 
         return details
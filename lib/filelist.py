@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Compact per-directory file listings for DiskMan.
+
+The scan tree keeps one ``DirNode`` per directory, but the files of each
+directory are by far the bulk of the entries. Keeping them as a list of
+``(name, size, is_dir, is_hidden)`` tuples costs a list slot, a 4-tuple and
+usually an int object per file. A ``FileList`` instead stores the columns
+side by side:
+
+    names   tuple of interned str   8 bytes per file + the name itself,
+                                    shared between equal names tree-wide
+    sizes   array('q')              8 bytes per file
+    flags   bytes                   1 byte per file (is_dir, is_hidden and
+                                    the age bins of ``ages.py``)
+    mtimes  array('f')              4 bytes per file, the modification time
+                                    to within about two minutes, for sorting
+
+Measured with ``benchmarks/tree_memory.py`` (CPython 3.11, 64-bit), a file
+entry costs about 23 bytes plus its name instead of about 112 bytes plus
+its name. Names repeated across a tree (``index.js``, ``__init__.py``, ...)
+are stored once. A whole scan of ``/usr`` (80k entries, one directory in
+ten) went from about 210 to about 140 bytes per entry, names and
+``DirNode`` objects included; modification times and age histograms later
+brought it to about 168. Directories without files share one empty listing.
+
+Listings are immutable; removing a file builds a new, smaller listing.
+"""
+import sys
+from array import array
+
+_IS_DIR = 1       # Symbolic link to a directory (real directories are DirNodes)
+_IS_HIDDEN = 2
+_AGE_SHIFT = 2    # Bits above the two flags hold the packed age bins
+
+intern = sys.intern
+
+
+class FileList(object):
+    """Immutable, column-oriented listing of the files of one directory."""
+
+    __slots__ = ('names', 'sizes', 'flags', 'mtimes')
+
+    def __init__(self, names=(), sizes=None, flags=b'', mtimes=None):
+        self.names = names                          # Interned names
+        self.sizes = sizes if sizes is not None else array('q')
+        self.flags = flags                          # One byte of _IS_* bits per file
+        self.mtimes = mtimes if mtimes is not None else array('f')
+
+    @classmethod
+    def from_items(cls, items):
+        """Build a listing from ``(name, size, is_dir, is_hidden[, ages[, mtime]])`` sequences."""
+        names = []
+        sizes = array('q')
+        flags = bytearray()
+        mtimes = array('f')
+        for item in items:
+            name, size, is_dir, is_hidden = item[:4]
+            ages = item[4] if len(item) > 4 else 0
+            names.append(intern(name))
+            sizes.append(size)
+            flags.append((_IS_DIR if is_dir else 0) | (_IS_HIDDEN if is_hidden else 0)
+                         | ages << _AGE_SHIFT)
+            mtimes.append(item[5] if len(item) > 5 else 0.0)
+        return cls(tuple(names), sizes, bytes(flags), mtimes)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        """Yield ``(name, size, is_dir, is_hidden)`` tuples, built on the fly."""
+        for name, size, flag in zip(self.names, self.sizes, self.flags):
+            yield name, size, bool(flag & _IS_DIR), bool(flag & _IS_HIDDEN)
+
+    def __getitem__(self, index):
+        flag = self.flags[index]
+        return self.names[index], self.sizes[index], bool(flag & _IS_DIR), bool(flag & _IS_HIDDEN)
+
+    def iter_records(self):
+        """Yield ``(name, size, is_dir, is_hidden, ages, mtime)`` tuples, ``ages`` being the packed bins."""
+        for name, size, flag, mtime in zip(self.names, self.sizes, self.flags, self.mtimes):
+            yield (name, size, bool(flag & _IS_DIR), bool(flag & _IS_HIDDEN),
+                   flag >> _AGE_SHIFT, mtime)
+
+    def ages(self, index):
+        """Return the packed age bins of one file."""
+        return self.flags[index] >> _AGE_SHIFT
+
+    def index(self, name):
+        """Return the position of a file by name.
+
+        Raises:
+            ValueError: If no file has that name
+        """
+        return self.names.index(name)
+
+    def without(self, index):
+        """Return a copy of the listing with one file removed."""
+        sizes = array('q', self.sizes)
+        del sizes[index]
+        mtimes = array('f', self.mtimes)
+        del mtimes[index]
+        return FileList(self.names[:index] + self.names[index + 1:], sizes,
+                        self.flags[:index] + self.flags[index + 1:], mtimes)
+
+
+class FileListBuilder(object):
+    """Accumulates one directory's files during a scan."""
+
+    __slots__ = ('names', 'sizes', 'flags', 'mtimes')
+
+    def __init__(self):
+        self.names = []
+        self.sizes = array('q')
+        self.flags = bytearray()
+        self.mtimes = array('f')
+
+    def add(self, name, size, is_dir, is_hidden, ages=0, mtime=0.0):
+        """Append one file, with its packed age bins and modification time."""
+        self.names.append(intern(name))
+        self.sizes.append(size)
+        self.flags.append((_IS_DIR if is_dir else 0) | (_IS_HIDDEN if is_hidden else 0)
+                          | ages << _AGE_SHIFT)
+        self.mtimes.append(mtime)
+
+    def build(self):
+        """Return the finished, immutable listing."""
+        if not self.names:
+            return EMPTY  # Shared by every directory without files
+        return FileList(tuple(self.names), self.sizes, bytes(self.flags), self.mtimes)
+
+
+EMPTY = FileList()
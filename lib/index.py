@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Persistent scan index for DiskMan.
+
+Scan results are stored in a small SQLite database, one row per directory
+keyed by path, holding the directory's own size, file count, age bins,
+listing and the mtime/inode it had when it was scanned. On the next run a directory whose
+mtime and inode are unchanged is restored from its row instead of being
+listed again; only changed directories are rescanned.
+
+Restoring a tree only needs the totals and the names of sub-directories,
+so ``load`` leaves the file listings in the database; ``files`` reads one
+when its directory is opened.
+
+Note that a directory's mtime only changes when entries are added, removed
+or renamed, so a file growing in place is picked up by a refresh ('r').
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+from collections import namedtuple
+from .filelist import FileList
+from .ages import add_ages, ages_difference
+
+INDEX_VERSION = '4'
+
+IndexRecord = namedtuple('IndexRecord', 'mtime ino own_size own_files own_ages subdirs scanned_at')
+
+
+def default_index_path():
+    """Return the per-user location of the scan index."""
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'diskman', 'index.sqlite3')
+
+
+def _key_range(directory):
+    """Return the key of a directory and the key bounds of everything below it."""
+    key = os.fsencode(directory)
+    prefix = os.fsencode(directory.rstrip(os.sep) + os.sep)
+    return key, prefix, prefix[:-1] + bytes([prefix[-1] + 1])
+
+
+class ScanIndex(object):
+    """SQLite-backed store of per-directory scan results."""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or row[0] != INDEX_VERSION:
+            self._db.execute("DROP TABLE IF EXISTS dirs")
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (INDEX_VERSION,))
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS dirs ("
+            "path BLOB PRIMARY KEY, mtime REAL, ino INTEGER, own_size INTEGER, "
+            "own_files INTEGER, own_ages TEXT, subdirs TEXT, files TEXT, scanned_at REAL)")
+        self._db.commit()
+
+    def load(self, directory):
+        """Load the stored records for a directory and everything below it.
+
+        File listings are not read; see ``files``.
+
+        Args:
+            directory (str): Absolute directory path
+
+        Returns:
+            dict: ``IndexRecord`` objects keyed by absolute path
+        """
+        key, low, high = _key_range(directory)
+        try:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT path, mtime, ino, own_size, own_files, own_ages, subdirs, scanned_at "
+                    "FROM dirs WHERE path = ? OR (path >= ? AND path < ?)", (key, low, high)).fetchall()
+        except sqlite3.Error:
+            rows = []  # An unreadable index just means a cold scan
+
+        records = {}
+        for path, mtime, ino, own_size, own_files, own_ages, subdirs, scanned_at in rows:
+            records[os.fsdecode(path)] = IndexRecord(mtime, ino, own_size, own_files,
+                                                     json.loads(own_ages) if own_ages else None,
+                                                     json.loads(subdirs), scanned_at)
+        return records
+
+    def files(self, directory, mtime, ino):
+        """Read the stored file listing of one directory.
+
+        Args:
+            directory (str): Absolute directory path
+            mtime (float): Modification time the listing must have been stored with
+            ino (int): Inode number it must have been stored with
+
+        Returns:
+            FileList: The listing, or None if it isn't stored or is out of date
+        """
+        try:
+            with self._lock:
+                row = self._db.execute("SELECT mtime, ino, files FROM dirs WHERE path = ?",
+                                       (os.fsencode(directory),)).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None or row[0] != mtime or row[1] != ino:
+            return None
+        return FileList.from_items(json.loads(row[2]))
+
+    def save(self, root, previous=None):
+        """Write every directory of a tree that changed since it was stored.
+
+        Args:
+            root (DirNode): Root of the scanned tree
+            previous (dict, optional): What ``load`` returned before the scan;
+                rows of sub-directories that have since disappeared are deleted
+        """
+        self.write(self.collect(root, previous))
+
+    def collect(self, root, previous=None):
+        """Take what ``save`` writes from a tree, without encoding or writing it.
+
+        This is the part that reads the tree, so it is quick enough to run
+        while the tree is locked; ``write`` can then run without the lock.
+
+        Args:
+            root (DirNode): Root of the scanned tree
+            previous (dict, optional): As for ``save``
+
+        Returns:
+            tuple: ``(rows, stale)`` to pass to ``write``
+        """
+        rows = []
+        stale = []
+        stack = [(root, root.path)]
+        while stack:
+            node, path = stack.pop()
+            if node.children:
+                stack.extend((child, os.path.join(path, name))
+                             for name, child in node.children.items())
+            if node.stored or not node.loaded:
+                continue
+
+            own_size = node.size - sum(child.size for child in node.children.values())
+            own_files = node.file_count - sum(child.file_count for child in node.children.values())
+            own_ages = ages_difference(node.ages, None)  # A copy to subtract from
+            for child in node.children.values():
+                own_ages = add_ages(own_ages, child.ages, -1)
+            # Listings are immutable, so they can be encoded after the lock is released
+            rows.append((path, node.mtime, node.ino, own_size, own_files,
+                         own_ages if own_ages is not None and any(own_ages) else None,
+                         list(node.children), node.files))
+            node.stored = True
+
+            # Sub-directories that disappeared take their rows with them
+            old = previous.get(path) if previous else None
+            if old is not None:
+                stale.extend(os.path.join(path, name) for name in old.subdirs
+                             if name not in node.children)
+        return rows, stale
+
+    def write(self, collected):
+        """Encode and write what ``collect`` took from a tree.
+
+        Args:
+            collected (tuple): ``(rows, stale)`` returned by ``collect``
+        """
+        now = time.time()
+        rows, stale = collected
+        rows = [(os.fsencode(path), mtime, ino, own_size, own_files,
+                 json.dumps(list(own_ages)) if own_ages is not None else None,
+                 json.dumps(subdirs), json.dumps(list(files.iter_records())), now)
+                for path, mtime, ino, own_size, own_files, own_ages, subdirs, files in rows]
+        try:
+            with self._lock:
+                for path in stale:
+                    key, low, high = _key_range(path)
+                    self._db.execute("DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)",
+                                     (key, low, high))
+                self._db.executemany("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                self._db.commit()
+        except sqlite3.Error:
+            pass  # The index is only an accelerator; the scan result still stands
+
+    def count_below(self, path):
+        """Count the stored directories at or below a path.
+
+        Args:
+            path (str): Absolute directory path
+
+        Returns:
+            int: Number of stored directories, 0 if none or on error
+        """
+        key, low, high = _key_range(path)
+        try:
+            with self._lock:
+                return self._db.execute("SELECT COUNT(*) FROM dirs WHERE path = ? OR (path >= ? AND path < ?)",
+                                        (key, low, high)).fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def forget(self, path):
+        """Remove a directory and everything below it from the index.
+
+        Args:
+            path (str): Absolute path of a deleted file or directory
+        """
+        key, low, high = _key_range(path)
+        try:
+            with self._lock:
+                self._db.execute("DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)",
+                                 (key, low, high))
+                self._db.commit()
+        except sqlite3.Error:
+            pass
+
+    def close(self):
+        """Close the underlying database."""
+        with self._lock:
+            self._db.close()
+
+
+def open_index(path=None):
+    """Open the scan index, or return None if it can't be used.
+
+    Args:
+        path (str, optional): Database location, defaults to the per-user cache
+
+    Returns:
+        ScanIndex: The opened index, or None
+    """
+    try:
+        return ScanIndex(path or default_index_path())
+    except (sqlite3.Error, OSError):
+        return None
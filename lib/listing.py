@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Lazily sorted directory listings for DiskMan.
+
+A flat directory with millions of files (mail spools, object caches) would
+cost a tuple per entry and a full sort on every redraw if it were listed as
+a Python list. A ``Listing`` keeps the directory's compact columns instead
+and only ranks as many entries as have been asked for: showing page ``p``
+selects the top ``(p + 1) * page`` entries with a bounded heap, in
+O(n log k) time and O(k) memory. The total size is taken from the node, so
+percentages don't need a pass over the entries either.
+
+Entries can be ranked by size, name, file count, modification time or
+stale bytes, all from data the scan already holds.
+"""
+import heapq
+import itertools
+from .ages import stale_bytes, file_stale
+
+# Ways a listing can be ordered; 'name' ascending, the others largest first
+SORT_KEYS = ('size', 'name', 'count', 'mtime', 'stale')
+
+# Entries ranked at least, and the share of the listing above which a full
+# sort is cheaper than a heap selection
+_MIN_RANKED = 100
+_FULL_SORT_SHARE = 0.25
+
+
+class Listing(object):
+    """The entries of one directory as a sequence, sorted on demand.
+
+    Behaves like a list of ``(name, size, is_dir, is_hidden)`` tuples in
+    sort order: ``len``, indexing and slicing only rank what they reach.
+    The caller holds the cache lock while building it; afterwards it only
+    reads the immutable file listing and the child nodes it captured.
+    """
+
+    __slots__ = ('node', 'dirs', 'files', 'key', 'age', 'total', 'counts', '_ranked')
+
+    def __init__(self, node, key='size', age=None):
+        """Capture the entries of a loaded directory node.
+
+        Args:
+            node (DirNode): Directory with its listing loaded
+            key (str): One of ``SORT_KEYS``
+            age (tuple, optional): ``(days, clock)`` ranked by the 'stale' key
+        """
+        if key not in SORT_KEYS:
+            raise ValueError(f"unknown sort key: {key}")
+        if key == 'stale' and age is None:
+            raise ValueError("sorting by stale bytes needs an age threshold")
+        self.node = node
+        self.dirs = list(node.children.values())
+        self.files = node.files
+        self.key = key
+        self.age = age if key == 'stale' else None
+        self.total = node.size
+        self.counts = (node.size, node.file_count, node.dir_count)
+        self._ranked = []  # Positions of the best entries found so far, in order
+
+    def is_current(self, node, key='size', age=None):
+        """Check whether the listing still matches a node and an ordering."""
+        return (node is self.node and node.files is self.files
+                and (node.size, node.file_count, node.dir_count) == self.counts
+                and len(node.children) == len(self.dirs)
+                and key == self.key and (age if key == 'stale' else None) == self.age)
+
+    def __len__(self):
+        return len(self.dirs) + len(self.files)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            self._rank(max(start, stop) if step > 0 else start + 1)
+            return [self._item(self._ranked[i]) for i in range(start, stop, step)]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("listing index out of range")
+        self._rank(index + 1)
+        return self._item(self._ranked[index])
+
+    def __iter__(self):
+        self._rank(len(self))
+        for position in self._ranked:
+            yield self._item(position)
+
+    def stale(self, index, days, clock='mtime'):
+        """Return the bytes of the entry at ``index`` older than ``days`` by ``clock``."""
+        self._rank(index + 1)
+        position = self._ranked[index]
+        if position < len(self.dirs):
+            return stale_bytes(self.dirs[position].ages, days, clock)
+        position -= len(self.dirs)
+        return file_stale(self.files.sizes[position], self.files.ages(position), days, clock)
+
+    def _item(self, position):
+        """Return the entry at a position of the unsorted columns."""
+        if position < len(self.dirs):
+            child = self.dirs[position]
+            return child.name, child.size, True, child.is_hidden
+        return self.files[position - len(self.dirs)]
+
+    def _keys(self):
+        """Yield a sortable tuple ending with the position for every entry."""
+        dirs = self.dirs
+        files = self.files
+        positions = itertools.count(len(dirs))  # Of the files, which follow the directories
+        if self.key == 'size':
+            yield from ((child.size, i) for i, child in enumerate(dirs))
+            yield from zip(files.sizes, positions)
+        elif self.key == 'name':
+            yield from ((child.name.casefold(), i) for i, child in enumerate(dirs))
+            yield from zip(map(str.casefold, files.names), positions)
+        elif self.key == 'count':
+            # Files count as one; ties are ranked by size
+            yield from ((child.file_count, child.size, i) for i, child in enumerate(dirs))
+            yield from zip(itertools.repeat(1), files.sizes, positions)
+        elif self.key == 'mtime':
+            yield from ((child.mtime, i) for i, child in enumerate(dirs))
+            yield from zip(files.mtimes, positions)
+        else:
+            days, clock = self.age
+            yield from ((stale_bytes(child.ages, days, clock), child.size, i)
+                        for i, child in enumerate(dirs))
+            yield from ((file_stale(size, packed, days, clock), size, position)
+                        for (_, size, _, _, packed, _), position
+                        in zip(files.iter_records(), positions))
+
+    def _rank(self, count):
+        """Make sure the first ``count`` entries are ranked."""
+        total = len(self)
+        if count <= len(self._ranked) or len(self._ranked) == total:
+            return
+        # Rank ahead so that paging forward doesn't select again each time
+        count = min(total, max(count, 2 * len(self._ranked), _MIN_RANKED))
+        if count >= total * _FULL_SORT_SHARE:
+            ranked = sorted(self._keys(), reverse=self.key != 'name')
+        elif self.key == 'name':
+            ranked = heapq.nsmallest(count, self._keys())
+        else:
+            ranked = heapq.nlargest(count, self._keys())
+        self._ranked = [key[-1] for key in ranked]
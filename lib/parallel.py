@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Work-stealing thread pool for DiskMan.
+
+Directory trees are badly balanced: one child such as ``node_modules`` can
+hold most of the entries. Each worker therefore keeps its own deque of
+tasks, works depth-first from its tail, and when it runs dry steals the
+oldest (shallowest, usually largest) task from the head of another
+worker's deque, so no worker sits idle while work remains.
+"""
+import threading
+from collections import deque
+
+
+def run_work_stealing(tasks, visit, workers, cancel=None):
+    """Run ``visit`` over a growing set of tasks on a pool of threads.
+
+    Args:
+        tasks (list): Initial tasks
+        visit (callable): ``visit(task, worker_id)`` returning a list of new
+            tasks discovered while handling ``task``
+        workers (int): Number of worker threads
+        cancel (threading.Event, optional): Stops the pool once set; the
+            caller is responsible for noticing that work was left undone
+
+    Raises:
+        KeyboardInterrupt: If interrupted while waiting; workers are stopped
+        Exception: The first exception raised by ``visit``
+    """
+    workers = max(1, workers)
+    queues = [deque() for _ in range(workers)]
+    for i, task in enumerate(tasks):
+        queues[i % workers].append(task)
+
+    cond = threading.Condition()
+    state = {'pending': len(tasks), 'error': None}
+    stop = threading.Event()
+
+    def steal(worker_id):
+        for offset in range(1, workers):
+            try:
+                return queues[(worker_id + offset) % workers].popleft()
+            except IndexError:
+                continue
+        return None
+
+    def stopped():
+        return stop.is_set() or (cancel is not None and cancel.is_set())
+
+    def worker(worker_id):
+        own = queues[worker_id]
+        while not stopped():
+            try:
+                task = own.pop()
+            except IndexError:
+                task = steal(worker_id)
+            if task is None:
+                with cond:
+                    if state['pending'] == 0:
+                        return
+                    cond.wait(0.05)
+                continue
+
+            try:
+                new_tasks = visit(task, worker_id)
+            except BaseException as e:
+                with cond:
+                    if state['error'] is None:
+                        state['error'] = e
+                stop.set()
+                new_tasks = ()
+            own.extend(new_tasks)
+            with cond:
+                state['pending'] += len(new_tasks) - 1
+                if new_tasks or state['pending'] == 0:
+                    cond.notify_all()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    try:
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(0.1)  # Short joins keep Ctrl-C responsive
+    except KeyboardInterrupt:
+        stop.set()
+        for thread in threads:
+            thread.join(1.0)
+        raise
+
+    if state['error'] is not None:
+        raise state['error']
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Speculative background scans for DiskMan.
+
+While a listing is on screen, the largest directories shown are the ones
+most likely to be opened next. A ``Prefetch`` makes them listable in a
+background thread, so drilling in is answered from the cache. It works
+within a time budget and is cancelled as soon as the user moves elsewhere;
+the foreground never waits for it, except to pick up a scan of the very
+directory it is opening.
+"""
+import os
+import threading
+
+PREFETCH_DIRS = 3        # Largest directories of the page to prepare
+PREFETCH_SECONDS = 10.0  # Give up on guesses that take longer than this
+
+
+class Prefetch(object):
+    """Background scans of a few directories the user may open next."""
+
+    def __init__(self, cache, directory, names, budget=PREFETCH_SECONDS):
+        self.cache = cache
+        self.directory = os.path.abspath(directory)
+        self.paths = [os.path.join(self.directory, name) for name in names]
+        self.done = False
+        self._current = None
+        self._stop = threading.Event()    # No further directories
+        self._cancel = threading.Event()  # Abandon the running scan too
+        self._timer = threading.Timer(budget, self._cancel.set)
+        self._timer.daemon = True
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+
+    def start(self):
+        """Start prefetching in the background."""
+        self._timer.start()
+        self._thread.start()
+        return self
+
+    def cancel(self, keep=None):
+        """Stop prefetching.
+
+        Args:
+            keep (str, optional): Directory the user is opening; if it is the
+                one being scanned, that scan is finished rather than thrown
+                away, since the foreground would only start it again
+        """
+        self._stop.set()
+        if keep is None or os.path.abspath(keep) != self._current:
+            self._cancel.set()
+        else:
+            self._timer.cancel()  # The user is waiting for this one anyway
+
+    def _run(self):
+        try:
+            for path in self.paths:
+                if self._stop.is_set() or self._cancel.is_set():
+                    break
+                self._current = path
+                self.cache.prefetch(path, self._cancel)
+        finally:
+            self._current = None
+            self._timer.cancel()
+            self.done = True
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Multiprocessing scan backend for DiskMan.
+
+On trees with tens of millions of small files the per-entry Python work
+(path joining, type checks, integer sums) saturates one core regardless of
+how many threads wait on the disk. This backend lists the top-level
+directory itself, hands each top-level sub-directory to a worker process,
+and gets back only one compact aggregate row per directory. The rebuilt
+nodes carry subtree totals but no file listings; a directory's own files
+are listed on demand when it is opened.
+"""
+import os
+import time
+import signal
+import multiprocessing
+from .scanner import DirNode, ScanStats, read_level, scan_tree
+from .filelist import EMPTY, intern
+from .profiler import ScanProfile
+from .ages import add_ages
+
+
+def _ignore_sigint():
+    """Leave Ctrl-C to the parent, which terminates the pool cleanly."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _scan_shard(task):
+    """Scan one top-level sub-directory in a worker process.
+
+    Args:
+        task (tuple): ``(path, prune, profile_root, aggregates)``, the
+            directory to scan, the filter bound to the top-level directory
+            (or None), the top-level directory when profiling (else None) and
+            empty aggregates to fill (or None)
+
+    Returns:
+        tuple: ``(path, rows, stats)`` where ``rows`` holds
+            ``(parent_index, name, size, file_count, dir_count, ages, mtime,
+            ino, is_hidden)`` per directory in pre-order; ``rows`` is None if the
+            directory can't be read
+    """
+    path, prune, profile_root, aggregates = task
+    stats = ScanStats(ScanProfile(profile_root) if profile_root is not None else None, aggregates)
+    try:
+        root = scan_tree(path, stats=stats, prune=prune)
+    except (OSError, PermissionError) as e:
+        if stats.profile is not None:
+            stats.profile.error(path, e, directory=True)
+        return path, None, stats
+
+    rows = []
+    stack = [(root, -1)]
+    while stack:
+        node, parent_index = stack.pop()
+        index = len(rows)
+        rows.append((parent_index, node.name, node.size, node.file_count,
+                     node.dir_count, node.ages, node.mtime, node.ino, node.is_hidden))
+        stack.extend((child, index) for child in (node.children or {}).values())
+    return path, rows, stats
+
+
+def _rebuild(node, rows):
+    """Turn aggregate rows back into a skeleton subtree below ``node``."""
+    nodes = [node]
+    node.size, node.file_count, node.dir_count, node.ages = rows[0][2:6]
+    for parent_index, name, size, file_count, dir_count, ages, mtime, ino, is_hidden in rows[1:]:
+        parent = nodes[parent_index]
+        child = DirNode(intern(name), parent)
+        child.size = size
+        child.file_count = file_count
+        child.dir_count = dir_count
+        child.ages = ages
+        child.mtime = mtime
+        child.ino = ino
+        child.is_hidden = is_hidden
+        parent.children[child.name] = child
+        nodes.append(child)
+
+
+def scan_tree_processes(directory, processes, stats=None, prune=None):
+    """Scan a directory tree with a pool of worker processes.
+
+    Args:
+        directory (str): Directory to scan
+        processes (int): Number of worker processes
+        stats (ScanStats, optional): Counters to fill in
+        prune (ScanFilter, optional): Parts of the tree to leave out
+
+    Returns:
+        DirNode: Root node holding its own listing; sub-directories carry
+            totals only and are listed when opened
+
+    Raises:
+        OSError: If the root directory itself can't be read
+        KeyboardInterrupt: After all worker processes have been stopped
+    """
+    directory = os.path.abspath(directory)
+    if stats is None:
+        stats = ScanStats()
+    if prune is not None and not prune.bound:
+        prune = prune.bind(directory, os.stat(directory))
+    started = time.perf_counter()
+    root = read_level(directory, prune, stats)
+    root.name = directory
+    stats.dirs_read += 1
+    profile_root = None
+    if stats.profile is not None:
+        profile_root = stats.profile.root
+        stats.profile.directory(directory, time.perf_counter() - started, True,
+                                len(root.children) + len(root.files))
+
+    # Largest-first isn't known yet, so shard one sub-directory per task
+    # and let the pool hand them out as workers free up
+    tasks = [(os.path.join(directory, name), prune, profile_root,
+              stats.aggregates.fork() if stats.aggregates is not None else None)
+             for name in root.children]
+    pool = multiprocessing.Pool(processes, initializer=_ignore_sigint)
+    try:
+        for path, rows, shard_stats in pool.imap_unordered(_scan_shard, tasks):
+            child = root.children[os.path.basename(path)]
+            if rows is None:
+                child.files = EMPTY  # Unreadable directories count as empty
+                stats.errors += 1
+            else:
+                _rebuild(child, rows)
+            stats.merge(shard_stats)
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    for child in root.children.values():
+        root.size += child.size
+        root.file_count += child.file_count
+        root.dir_count += child.dir_count + 1
+        root.ages = add_ages(root.ages, child.ages)
+    return root
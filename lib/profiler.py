@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Scan profiling for DiskMan (``--profile``).
+
+A ``ScanProfile`` rides along on a scan's ``ScanStats`` and records where
+the time went: directories listed, stat calls made, time per top-level
+directory, the slowest directories and the errors the scanner skips over.
+Rendering is timed separately by ``RenderStats``.
+
+When profiling is off no profile exists and the scanner only tests for
+None once per directory, so the cost is a few nanoseconds per directory.
+"""
+import os
+from .scanner import LargestEntries
+
+SLOWEST_KEPT = 10      # Slowest directories kept per scan
+ERRORS_KEPT = 20       # Error examples kept per scan
+
+# RenderStats of the session while profiling, else None
+render_stats = None
+
+
+class ScanProfile(object):
+    """Where the time of one scan went."""
+
+    __slots__ = ('root', 'elapsed', 'dirs_listed', 'dirs_restored', 'listdir_calls',
+                 'stat_calls', 'skipped_entries', 'unreadable_dirs', 'errors', 'top_level',
+                 'slowest')
+
+    def __init__(self, root):
+        self.root = root.rstrip(os.sep) or os.sep
+        self.elapsed = None          # Wall time of the whole scan, set by the caller
+        self.dirs_listed = 0         # Directories read with scandir
+        self.dirs_restored = 0       # Directories restored from the on-disk index
+        self.listdir_calls = 0       # opendir/getdents/closedir sequences
+        self.stat_calls = 0          # lstat of each entry plus stat of each link target
+        self.skipped_entries = 0     # Entries that vanished or couldn't be stat'ed
+        self.unreadable_dirs = 0     # Directories that couldn't be listed
+        self.errors = []             # (path, message) examples of both
+        self.top_level = {}          # Top-level name -> seconds spent below it
+        self.slowest = LargestEntries(SLOWEST_KEPT)  # (seconds, path)
+
+    def fork(self):
+        """Return an empty profile for one worker of the same scan."""
+        return ScanProfile(self.root)
+
+    def _top_level(self, path):
+        """Name of the top-level directory ``path`` lies in, '.' for the root."""
+        if len(path) <= len(self.root):
+            return os.curdir
+        return path[len(self.root):].lstrip(os.sep).split(os.sep, 1)[0]
+
+    def directory(self, path, seconds, listed, stat_calls):
+        """Record one directory of the scan.
+
+        Args:
+            path (str): Path of the directory
+            seconds (float): Time spent reading or restoring it
+            listed (bool): True if it was listed, False if restored from the index
+            stat_calls (int): Stat calls it took
+        """
+        if listed:
+            self.dirs_listed += 1
+            self.listdir_calls += 1
+        else:
+            self.dirs_restored += 1
+        self.stat_calls += stat_calls
+        name = self._top_level(path)
+        self.top_level[name] = self.top_level.get(name, 0.0) + seconds
+        self.slowest.add(seconds, path)
+
+    def error(self, path, error, directory=False):
+        """Record an error the scan skipped over."""
+        if directory:
+            self.unreadable_dirs += 1
+        else:
+            self.skipped_entries += 1
+        if len(self.errors) < ERRORS_KEPT:
+            self.errors.append((path, getattr(error, 'strerror', None) or str(error)))
+
+    def merge(self, other):
+        """Add the records of another (per-worker) profile."""
+        self.dirs_listed += other.dirs_listed
+        self.dirs_restored += other.dirs_restored
+        self.listdir_calls += other.listdir_calls
+        self.stat_calls += other.stat_calls
+        self.skipped_entries += other.skipped_entries
+        self.unreadable_dirs += other.unreadable_dirs
+        self.errors.extend(other.errors[:ERRORS_KEPT - len(self.errors)])
+        for name, seconds in other.top_level.items():
+            self.top_level[name] = self.top_level.get(name, 0.0) + seconds
+        for seconds, path, _ in other.slowest.results():
+            self.slowest.add(seconds, path)
+
+    def as_dict(self):
+        """Return the profile as JSON-serialisable data, slowest first."""
+        top_level = sorted(self.top_level.items(), key=lambda item: item[1], reverse=True)
+        return {
+            'root': self.root,
+            'elapsed': round(self.elapsed, 6) if self.elapsed is not None else None,
+            'dirs_listed': self.dirs_listed,
+            'dirs_restored': self.dirs_restored,
+            'listdir_calls': self.listdir_calls,
+            'stat_calls': self.stat_calls,
+            'skipped_entries': self.skipped_entries,
+            'unreadable_dirs': self.unreadable_dirs,
+            'errors': [{'path': path, 'error': message} for path, message in self.errors],
+            'top_level': [{'name': name, 'seconds': round(seconds, 6)} for name, seconds in top_level],
+            'slowest': [{'path': path, 'seconds': round(seconds, 6)}
+                        for seconds, path, _ in self.slowest.results()]
+        }
+
+
+class RenderStats(object):
+    """Time spent drawing listings."""
+
+    __slots__ = ('frames', 'total', 'last', 'slowest')
+
+    def __init__(self):
+        self.frames = 0
+        self.total = 0.0
+        self.last = None
+        self.slowest = 0.0
+
+    def add(self, seconds):
+        """Record one drawn frame."""
+        self.frames += 1
+        self.total += seconds
+        self.last = seconds
+        self.slowest = max(self.slowest, seconds)
+
+    def as_dict(self):
+        """Return the timings as JSON-serialisable data."""
+        return {
+            'frames': self.frames,
+            'last': round(self.last, 6) if self.last is not None else None,
+            'average': round(self.total / self.frames, 6) if self.frames else None,
+            'slowest': round(self.slowest, 6)
+        }
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Scan pruning rules for DiskMan.
+
+A ``ScanFilter`` tells the scanner which parts of a tree to leave out:
+
+    * one_filesystem  sub-directories on another device (mount points such as
+                      /proc, network shares, bind mounts) are not entered
+    * exclude         entries whose name, or whose full path for patterns
+                      containing a separator, matches a glob are skipped
+    * max_depth       sub-directories more than this many levels below the
+                      scanned directory are still counted, but their listings
+                      are dropped once totals are known; they are listed again
+                      when opened
+
+A filter is bound to the directory a scan starts from, which fixes the
+device and the depth the rules are measured from.
+"""
+import os
+import re
+import fnmatch
+
+
+def _compile(patterns):
+    """Combine glob patterns into one case-aware regular expression, or None."""
+    if not patterns:
+        return None
+    return re.compile('|'.join(fnmatch.translate(os.path.normcase(p)) for p in patterns))
+
+
+class ScanFilter(object):
+    """Which parts of a tree a scan leaves out."""
+
+    __slots__ = ('one_filesystem', 'exclude', 'max_depth', 'device', 'base_depth',
+                 '_names', '_paths')
+
+    def __init__(self, one_filesystem=False, exclude=(), max_depth=None):
+        self.one_filesystem = one_filesystem
+        self.exclude = tuple(exclude)
+        self.max_depth = max(1, max_depth) if max_depth is not None else None
+        self.device = None       # st_dev of the scan root, once bound
+        self.base_depth = 0      # Separator count of the scan root, once bound
+        self._names = _compile([p for p in self.exclude if os.sep not in p and '/' not in p])
+        self._paths = _compile([p.rstrip('/' + os.sep) or p for p in self.exclude
+                                if os.sep in p or '/' in p])
+
+    def __getstate__(self):
+        # Compiled patterns are rebuilt on the other side of a process boundary
+        return self.one_filesystem, self.exclude, self.max_depth, self.device, self.base_depth
+
+    def __setstate__(self, state):
+        one_filesystem, exclude, max_depth, device, base_depth = state
+        self.__init__(one_filesystem, exclude, max_depth)
+        self.device = device
+        self.base_depth = base_depth
+
+    @property
+    def bound(self):
+        """Whether the filter is tied to a scan root yet."""
+        return self.device is not None
+
+    def bind(self, directory, st):
+        """Return a copy of the filter measured from ``directory``.
+
+        Args:
+            directory (str): Absolute path the scan starts from
+            st (os.stat_result): Its stat result
+
+        Returns:
+            ScanFilter: The bound copy
+        """
+        bound = ScanFilter(self.one_filesystem, self.exclude, self.max_depth)
+        bound.device = st.st_dev
+        bound.base_depth = directory.rstrip(os.sep).count(os.sep)
+        return bound
+
+    def depth(self, path):
+        """Levels between the scan root and ``path``."""
+        return path.rstrip(os.sep).count(os.sep) - self.base_depth
+
+    def excluded(self, name, path):
+        """Check whether an entry matches an exclude pattern."""
+        if self._names is not None and self._names.match(os.path.normcase(name)):
+            return True
+        return self._paths is not None and self._paths.match(os.path.normcase(path)) is not None
+
+    def crosses_device(self, st):
+        """Check whether a sub-directory lies on another filesystem."""
+        return self.one_filesystem and st.st_dev != self.device
+
+    def describe(self):
+        """Summarise the active rules for the UI."""
+        rules = []
+        if self.one_filesystem:
+            rules.append("one filesystem")
+        if self.exclude:
+            rules.append("excluding " + ", ".join(self.exclude))
+        if self.max_depth is not None:
+            rules.append(f"detail to depth {self.max_depth}")
+        return "; ".join(rules)
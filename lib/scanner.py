@@ -0,0 +1,591 @@
+#!/usr/bin/env python3
+"""
+Single-pass directory scanner for DiskMan.
+
+The scanner walks a tree once with ``os.scandir`` and builds a ``DirNode``
+for every directory it visits. Each node carries the aggregated size of its
+subtree, so the size of every child of the scanned directory is known at the
+end of one walk instead of one ``os.walk`` per child.
+
+Syscall budget (per entry, POSIX):
+    * regular file      -> 1 ``lstat`` (``DirEntry.stat(follow_symlinks=False)``)
+    * directory         -> 1 ``lstat`` + 1 ``opendir``/``getdents``/``closedir``
+    * symbolic link     -> 1 ``stat`` of the target, only to label it in listings
+                           (links are never followed or counted)
+    * unknown ``d_type`` -> +1 ``lstat`` (cached by ``DirEntry`` and reused)
+
+On Windows ``DirEntry.stat()`` is served from the directory listing itself,
+so files cost no extra syscalls at all. Aggregators (see ``aggregate.py``)
+are handed the stat results above and add no syscalls either, and neither
+do the age histograms (see ``ages.py``), read from the same results.
+"""
+import os
+import stat
+import time
+import heapq
+import threading
+from .parallel import run_work_stealing
+from .filelist import FileListBuilder, EMPTY, intern
+from .ages import AGE_SLOTS, age_cutoffs, add_ages
+
+# Windows hidden attribute (stat.FILE_ATTRIBUTE_HIDDEN is only defined on Windows)
+_FILE_ATTRIBUTE_HIDDEN = getattr(stat, 'FILE_ATTRIBUTE_HIDDEN', 2)
+
+
+class DirNode(object):
+    """A scanned directory and the aggregated size of its subtree."""
+
+    __slots__ = ('name', 'parent', 'size', 'file_count', 'dir_count', 'ages',
+                 'mtime', 'ino', 'is_hidden', 'stored', 'children', 'files')
+
+    def __init__(self, name, parent=None, st=None):
+        self.name = name
+        self.parent = parent
+        self.size = 0          # Bytes in the whole subtree
+        self.file_count = 0    # Files in the whole subtree
+        self.dir_count = 0     # Directories in the whole subtree (excluding self)
+        self.ages = None       # Stale bytes in the whole subtree by age bin (see ages.py)
+        self.mtime = st.st_mtime if st else 0.0
+        self.ino = st.st_ino if st else 0
+        self.is_hidden = _is_hidden(name, st) if st else name.startswith('.')
+        self.stored = False    # True while the on-disk index matches this node
+        self.children = {}     # name -> DirNode for sub-directories, None once evicted
+        self.files = None      # FileList of the directory's own files, or None if not kept
+
+    @property
+    def path(self):
+        """Absolute path of the node, rebuilt from the parent chain."""
+        parts = []
+        node = self
+        while node is not None:
+            parts.append(node.name)
+            node = node.parent
+        return os.path.join(*reversed(parts))
+
+    @property
+    def loaded(self):
+        """Whether the node still holds its listing (not evicted or trimmed)."""
+        return self.files is not None and self.children is not None
+
+    def iter_items(self):
+        """Yield the immediate entries as ``(name, size, is_dir, is_hidden)`` tuples.
+
+        Tuples are built one at a time from the compact node data, so callers
+        that only need a few entries (the largest, a page) never hold the
+        whole listing.
+        """
+        for child in self.children.values():
+            yield child.name, child.size, True, child.is_hidden
+        if self.files:
+            yield from self.files
+
+    def items(self):
+        """Return the immediate entries as ``(name, size, is_dir, is_hidden)`` tuples.
+
+        Returns:
+            list: Directories and files of this node, unsorted
+        """
+        return list(self.iter_items())
+
+    def item_count(self):
+        """Number of immediate entries, without building them."""
+        return len(self.children) + len(self.files or ())
+
+
+class ScanStats(object):
+    """Counters describing how a scan was carried out."""
+
+    __slots__ = ('dirs_read', 'dirs_reused', 'errors', 'skipped', 'index_time', 'pruned_dirs',
+                 'pruned_files', 'time_saved', 'profile', 'aggregates')
+
+    def __init__(self, profile=None, aggregates=None):
+        self.dirs_read = 0      # Directories listed with scandir
+        self.dirs_reused = 0    # Directories taken unchanged from the index
+        self.errors = 0         # Directories that couldn't be read
+        self.skipped = 0        # Entries that vanished or couldn't be stat'ed
+        self.index_time = None  # When the oldest reused index entry was written
+        self.pruned_dirs = []   # Directories left out by a ScanFilter
+        self.pruned_files = 0   # Files left out by a ScanFilter
+        self.time_saved = None  # Estimated seconds the pruning saved, if known
+        self.profile = profile  # ScanProfile while profiling (--profile), else None
+        self.aggregates = aggregates  # Aggregates fed every file scanned, or None
+
+    def worker(self):
+        """Return empty counters for one worker of the same scan."""
+        return ScanStats(self.profile.fork() if self.profile is not None else None,
+                         self.aggregates.fork() if self.aggregates is not None else None)
+
+    def merge(self, other):
+        """Add the counters of another (per-worker) ``ScanStats``."""
+        self.dirs_read += other.dirs_read
+        self.dirs_reused += other.dirs_reused
+        self.errors += other.errors
+        self.skipped += other.skipped
+        self.pruned_dirs.extend(other.pruned_dirs)
+        self.pruned_files += other.pruned_files
+        if other.index_time is not None and (self.index_time is None
+                                             or other.index_time < self.index_time):
+            self.index_time = other.index_time
+        if self.profile is not None and other.profile is not None:
+            self.profile.merge(other.profile)
+        if self.aggregates is not None and other.aggregates is not None:
+            self.aggregates.merge(other.aggregates)
+
+
+class ScanProgress(object):
+    """Live counters of a running scan, safe to update from worker threads."""
+
+    __slots__ = ('files', 'bytes', 'dirs_found', 'dirs_done', 'started', '_lock')
+
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.dirs_found = 0   # Directories discovered and waiting to be listed
+        self.dirs_done = 0    # Directories listed or restored
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def add(self, files, size, found):
+        """Record one finished directory and the sub-directories it revealed."""
+        with self._lock:
+            self.files += files
+            self.bytes += size
+            self.dirs_found += found
+            self.dirs_done += 1
+
+    @property
+    def dirs_remaining(self):
+        """Directories discovered but not listed yet."""
+        return max(0, self.dirs_found - self.dirs_done)
+
+    @property
+    def files_per_second(self):
+        """Average rate at which files have been counted."""
+        elapsed = time.time() - self.started
+        return self.files / elapsed if elapsed > 0 else 0.0
+
+
+class ScanCancelled(Exception):
+    """Raised when a scan is stopped through its cancel event."""
+
+
+class LargestEntries(object):
+    """The ``count`` largest entries seen so far, kept in a bounded min-heap.
+
+    Each ``add`` costs O(log count) and memory never exceeds ``count``
+    entries, however many are offered.
+    """
+
+    __slots__ = ('count', '_heap')
+
+    def __init__(self, count):
+        self.count = count
+        self._heap = []  # (size, path, is_hidden), smallest on top
+
+    def add(self, size, path, is_hidden=False):
+        """Offer one entry; it is kept only if it ranks among the largest."""
+        if len(self._heap) < self.count:
+            heapq.heappush(self._heap, (size, path, is_hidden))
+        elif size > self._heap[0][0]:
+            heapq.heapreplace(self._heap, (size, path, is_hidden))
+
+    def results(self):
+        """Return the kept entries as ``(size, path, is_hidden)``, largest first."""
+        return sorted(self._heap, reverse=True)
+
+
+def _is_hidden(name, st):
+    """Check whether an entry is hidden using data the scan already has."""
+    if name.startswith('.'):
+        return True
+    return bool(getattr(st, 'st_file_attributes', 0) & _FILE_ATTRIBUTE_HIDDEN)
+
+
+def _read_directory(node, path, prune=None, stats=None):
+    """Scan the immediate entries of one directory into ``node``.
+
+    Files are added to ``node.size``/``node.file_count``/``node.ages`` straight
+    away and sub-directories are attached as empty child nodes for the caller
+    to visit.
+
+    Args:
+        node (DirNode): Node to fill
+        path (str): Path of the directory
+        prune (ScanFilter, optional): Bound filter of entries to leave out
+        stats (ScanStats, optional): Receives what the filter left out and
+            the entries that couldn't be read; its aggregates are given the
+            stat result of every file counted
+
+    Returns:
+        list: ``(child_node, child_path)`` pairs for the sub-directories
+    """
+    subdirs = []
+    files = FileListBuilder()
+    aggregates = stats.aggregates if stats is not None else None
+    recent, older, oldest = age_cutoffs()
+    own_ages = [0] * AGE_SLOTS
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                if prune is not None and prune.excluded(entry.name, entry.path):
+                    if stats is not None:
+                        if entry.is_dir(follow_symlinks=False):
+                            stats.pruned_dirs.append(entry.path)
+                        else:
+                            stats.pruned_files += 1
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    st = entry.stat(follow_symlinks=False)
+                    if prune is not None and prune.crosses_device(st):
+                        if stats is not None:
+                            stats.pruned_dirs.append(entry.path)
+                        continue
+                    name = intern(entry.name)
+                    child = DirNode(name, node, st)
+                    node.children[name] = child
+                    subdirs.append((child, entry.path))
+                elif entry.is_symlink():
+                    # Links are listed but never followed or counted
+                    files.add(entry.name, 0, entry.is_dir(), entry.name.startswith('.'))
+                else:
+                    st = entry.stat(follow_symlinks=False)
+                    size = st.st_size
+                    node.size += size
+                    node.file_count += 1
+                    # Age bins, inlined: this runs once per file
+                    packed = 0
+                    mtime = st.st_mtime
+                    if mtime < recent:
+                        packed = 3 if mtime < oldest else 2 if mtime < older else 1
+                        own_ages[packed - 1] += size
+                    atime = st.st_atime
+                    if atime < recent:
+                        age = 3 if atime < oldest else 2 if atime < older else 1
+                        own_ages[age + 2] += size
+                        packed |= age << 2
+                    files.add(entry.name, size, False, _is_hidden(entry.name, st), packed, mtime)
+                    if aggregates is not None:
+                        aggregates.add(entry.name, st)
+            except (OSError, PermissionError) as e:
+                # Skip entries that vanish or can't be accessed
+                if stats is not None:
+                    stats.skipped += 1
+                    if stats.profile is not None:
+                        stats.profile.error(entry.path, e)
+    node.files = files.build()
+    if any(own_ages):
+        node.ages = add_ages(node.ages, own_ages)
+    return subdirs
+
+
+def _restore_directory(node, path, record):
+    """Fill ``node`` from an index record instead of listing the directory.
+
+    Only the sub-directories are stat'ed again so that they can be validated
+    in turn; the files of the directory itself are taken as recorded. Their
+    listing is left in the index (``files`` stays None) until the directory
+    is opened, see ``SizeCache.get``.
+
+    Args:
+        node (DirNode): Node to fill
+        path (str): Path of the directory
+        record (IndexRecord): Stored state of the directory
+
+    Returns:
+        list: ``(child_node, child_path)`` pairs for the sub-directories
+    """
+    subdirs = []
+    node.size += record.own_size
+    node.file_count += record.own_files
+    node.ages = add_ages(node.ages, record.own_ages)
+    node.stored = True
+    for name in record.subdirs:
+        child_path = os.path.join(path, name)
+        try:
+            st = os.lstat(child_path)
+        except (OSError, PermissionError):
+            continue
+        if stat.S_ISDIR(st.st_mode):
+            name = intern(name)
+            child = DirNode(name, node, st)
+            node.children[name] = child
+            subdirs.append((child, child_path))
+    return subdirs
+
+
+def _is_current(node, record):
+    """Check whether an index record still describes a directory."""
+    return (record is not None and record.mtime == node.mtime
+            and record.ino == node.ino)
+
+
+def _roll_up(nodes):
+    """Add every node's totals to its parent, deepest nodes first."""
+    for node in reversed(nodes):
+        parent = node.parent
+        if parent is not None:
+            parent.size += node.size
+            parent.file_count += node.file_count
+            parent.dir_count += node.dir_count + 1
+            parent.ages = add_ages(parent.ages, node.ages)
+
+
+def read_level(directory, prune=None, stats=None):
+    """List one directory without descending into its sub-directories.
+
+    Args:
+        directory (str): Directory to list
+        prune (ScanFilter, optional): Entries to leave out; an unbound filter
+            is bound to ``directory``
+        stats (ScanStats, optional): Receives what the filter left out
+
+    Returns:
+        DirNode: Unlinked node whose size and file count cover only the files
+            directly inside the directory; child nodes are empty
+
+    Raises:
+        OSError: If the directory can't be read
+    """
+    st = os.stat(directory)
+    node = DirNode(os.path.basename(directory), None, st)
+    if prune is not None and not prune.bound:
+        prune = prune.bind(os.path.abspath(directory), st)
+    _read_directory(node, directory, prune, stats)
+    return node
+
+
+def trim_depth(root, levels):
+    """Drop the listings of every directory ``levels`` below ``root``.
+
+    Their totals stay; the nodes look evicted and are listed again when
+    opened.
+    """
+    level = [root]
+    for _ in range(levels):
+        level = [child for node in level if node.children for child in node.children.values()]
+    for node in level:
+        node.children = None
+        node.files = None
+
+
+def _stat_calls(node):
+    """Stat calls ``_read_directory`` made: one per entry kept, links included."""
+    return len(node.children) + len(node.files)
+
+
+def _visit(node, path, reuse, known, stats, nodes, progress=None, prune=None):
+    """Fill one directory node by grafting, restoring from the index or listing.
+
+    Returns:
+        list: ``(child_node, child_path)`` pairs still to be visited
+    """
+    if reuse and path in reuse:
+        # Graft the known subtree; its totals are already final
+        known_node = reuse[path]
+        known_node.name = node.name
+        known_node.parent = node.parent
+        node.parent.children[node.name] = known_node
+        nodes.append(known_node)
+        if progress is not None:
+            progress.add(known_node.file_count, known_node.size, 0)
+        return []
+    # Parents are appended before their children so _roll_up can run backwards
+    nodes.append(node)
+    profile = stats.profile
+    if profile is not None:
+        started = time.perf_counter()
+    record = known.get(path) if known else None
+    if _is_current(node, record):
+        stats.dirs_reused += 1
+        if stats.index_time is None or record.scanned_at < stats.index_time:
+            stats.index_time = record.scanned_at
+        subdirs = _restore_directory(node, path, record)
+        if profile is not None:
+            profile.directory(path, time.perf_counter() - started, False, len(record.subdirs))
+    else:
+        stats.dirs_read += 1
+        try:
+            subdirs = _read_directory(node, path, prune, stats)
+        except (OSError, PermissionError) as e:
+            if node.parent is None:
+                raise
+            node.files = EMPTY  # Unreadable directories count as empty
+            stats.errors += 1
+            subdirs = []
+            if profile is not None:
+                profile.error(path, e, directory=True)
+        if profile is not None:
+            profile.directory(path, time.perf_counter() - started, True, _stat_calls(node))
+    if progress is not None:
+        # Before the roll-up a node's totals cover only its own files
+        progress.add(node.file_count, node.size, len(subdirs))
+    return subdirs
+
+
+def _child_name(pair):
+    """Sort key of a ``(child_node, child_path)`` pair."""
+    return pair[0].name
+
+
+def iter_directories(directory, stats=None, prune=None, ordered=False):
+    """Walk a tree and yield each directory once its totals are final.
+
+    Directories come out in post-order (children before their parent). A
+    directory's listing is released as soon as it has been yielded, so
+    memory is bounded by the entries along the current path, not by the
+    size of the tree.
+
+    Args:
+        directory (str): Directory to walk
+        stats (ScanStats, optional): Counters to fill in
+        prune (ScanFilter, optional): Entries to leave out (``max_depth`` is
+            left to the caller, which sees every directory's depth)
+        ordered (bool): Visit sub-directories in name order, so the output
+            is the same however the filesystem orders its listings
+
+    Yields:
+        tuple: ``(path, depth, node)`` where ``node`` holds its final totals,
+            its own ``files`` and its immediate child nodes (totals only)
+
+    Raises:
+        OSError: If the root directory itself can't be read
+    """
+    directory = os.path.abspath(directory)
+    if stats is None:
+        stats = ScanStats()
+    st = os.stat(directory)
+    root = DirNode(directory, None, st)
+    root.is_hidden = _is_hidden(os.path.basename(directory), st)
+    if prune is not None and not prune.bound:
+        prune = prune.bind(directory, st)
+
+    profile = stats.profile
+    if profile is not None:
+        started = time.perf_counter()
+    frames = [(root, directory, 0, _read_directory(root, directory, prune, stats))]
+    stats.dirs_read += 1
+    if ordered:
+        # Pending sub-directories are popped from the end: sort them backwards
+        frames[0][3].sort(key=_child_name, reverse=True)
+    if profile is not None:
+        profile.directory(directory, time.perf_counter() - started, True, _stat_calls(root))
+    while frames:
+        node, path, depth, pending = frames[-1]
+        if pending:
+            child, child_path = pending.pop()
+            stats.dirs_read += 1
+            if profile is not None:
+                started = time.perf_counter()
+            try:
+                subdirs = _read_directory(child, child_path, prune, stats)
+            except (OSError, PermissionError) as e:
+                child.files = EMPTY  # Unreadable directories count as empty
+                stats.errors += 1
+                subdirs = []
+                if profile is not None:
+                    profile.error(child_path, e, directory=True)
+            if profile is not None:
+                profile.directory(child_path, time.perf_counter() - started, True,
+                                  _stat_calls(child))
+            if ordered:
+                subdirs.sort(key=_child_name, reverse=True)
+            frames.append((child, child_path, depth + 1, subdirs))
+            continue
+
+        frames.pop()
+        yield path, depth, node
+        node.children = None
+        node.files = None
+        parent = node.parent
+        if parent is not None:
+            parent.size += node.size
+            parent.file_count += node.file_count
+            parent.dir_count += node.dir_count + 1
+            parent.ages = add_ages(parent.ages, node.ages)
+
+
+def walk_entries(directory, on_file, on_dir=None, stats=None, prune=None):
+    """Walk a tree and report every file and sub-directory below it.
+
+    Uses the post-order walk of ``iter_directories``, so memory stays
+    bounded by the current path plus whatever the callbacks keep.
+
+    Args:
+        directory (str): Directory to walk; it is not reported itself
+        on_file (callable): ``on_file(size, path, is_hidden)`` for each file
+        on_dir (callable, optional): ``on_dir(size, path, is_hidden)`` for
+            each sub-directory, with its subtree total
+        stats (ScanStats, optional): Counters to fill in
+        prune (ScanFilter, optional): Entries to leave out
+
+    Raises:
+        OSError: If the root directory itself can't be read
+    """
+    for path, depth, node in iter_directories(directory, stats, prune):
+        for name, size, is_dir, is_hidden in node.files:
+            if not is_dir:  # Symlinks to directories are listed but never counted
+                on_file(size, os.path.join(path, name), is_hidden)
+        if depth and on_dir is not None:
+            on_dir(node.size, path, node.is_hidden)
+
+
+def scan_tree(directory, reuse=None, known=None, stats=None, workers=1,
+              progress=None, cancel=None, prune=None):
+    """Scan a directory tree in a single pass.
+
+    Args:
+        directory (str): Directory to scan
+        reuse (dict, optional): Already scanned nodes keyed by absolute path.
+            Matching sub-directories are grafted into the new tree instead of
+            being walked again.
+        known (dict, optional): ``IndexRecord`` objects keyed by absolute path.
+            Directories whose mtime and inode still match their record are
+            restored from it rather than listed.
+        stats (ScanStats, optional): Counters to fill in
+        workers (int): Number of threads listing directories in parallel.
+            The resulting tree is identical to a serial scan.
+        progress (ScanProgress, optional): Live counters to update
+        cancel (threading.Event, optional): Stops the scan once set
+        prune (ScanFilter, optional): Parts of the tree to leave out; an
+            unbound filter is bound to ``directory``
+
+    Returns:
+        DirNode: Root node with sizes aggregated for every sub-directory
+
+    Raises:
+        OSError: If the root directory itself can't be read
+        ScanCancelled: If ``cancel`` was set before the scan finished
+    """
+    directory = os.path.abspath(directory)
+    if stats is None:
+        stats = ScanStats()
+    st = os.stat(directory)
+    root = DirNode(directory, None, st)
+    root.is_hidden = _is_hidden(os.path.basename(directory), st)
+    if prune is not None and not prune.bound:
+        prune = prune.bind(directory, st)
+
+    nodes = []
+    stack = _visit(root, directory, reuse, known, stats, nodes, progress, prune)
+    if workers > 1 and stack:
+        worker_stats = [stats.worker() for _ in range(workers)]
+
+        def visit(task, worker_id):
+            return _visit(task[0], task[1], reuse, known, worker_stats[worker_id],
+                          nodes, progress, prune)
+
+        run_work_stealing(stack, visit, workers, cancel)
+        for other in worker_stats:
+            stats.merge(other)
+    else:
+        while stack:
+            if cancel is not None and cancel.is_set():
+                break
+            node, path = stack.pop()
+            stack.extend(_visit(node, path, reuse, known, stats, nodes, progress, prune))
+    if cancel is not None and cancel.is_set():
+        raise ScanCancelled(directory)
+    _roll_up(nodes)
+    if prune is not None and prune.max_depth is not None:
+        trim_depth(root, max(1, prune.max_depth - prune.depth(directory)))
+    return root
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Buffered terminal output for DiskMan.
+
+A redraw is collected in memory as one frame and written with a single
+write. Clearing uses ANSI escapes (translated by colorama on Windows)
+instead of running ``clear`` in a subprocess. When the previous frame is
+still on screen, unchanged, only the lines that differ are rewritten, which
+removes the flicker and most of the traffic over slow SSH links.
+
+Listing pages are taller than many windows once the list of commands is
+included, and a frame that scrolls can't be redrawn line by line. Frames
+opened with ``clip=True`` are therefore cut to the window: long lines end
+in an ellipsis, and lines that don't fit are left out from the bottom (the
+commands first), with a note saying how many.
+
+Only the thread that opened a frame prints into it. A spinner, streaming
+scan or prefetch running alongside keeps writing to the terminal, below
+the frame, where the next redraw erases it.
+"""
+import io
+import re
+import sys
+import time
+import shutil
+import threading
+from functools import wraps
+from contextlib import contextmanager, redirect_stdout
+from . import profiler
+
+CLEAR = '\033[H\033[2J'   # Cursor home, erase the screen
+# Rows kept free below a frame for the prompt, a spinner and short messages;
+# a frame that leaves fewer could scroll, so it is repainted in full
+MARGIN = 8
+
+_ANSI = re.compile(r'(\x1b\[[0-9;]*[A-Za-z])')
+DIM = '\033[2m'
+RESET = '\033[0m'
+
+_depth = 0        # Nesting of open frames; only the outermost one is written
+_previous = None  # Lines of the frame on screen, None if unknown
+_size = None      # Terminal size when it was drawn
+
+
+def _is_terminal():
+    try:
+        return sys.stdout.isatty()
+    except (AttributeError, ValueError):
+        return False
+
+
+class _FrameOutput(object):
+    """Stand-in for ``sys.stdout`` while a frame is open.
+
+    Writes from the thread that opened the frame go to its buffer; those
+    from any other thread go to the stream the frame replaced.
+    """
+    __slots__ = ('_owner', '_buffer', '_stream')
+
+    def __init__(self, buffer, stream):
+        self._owner = threading.get_ident()
+        self._buffer = buffer
+        self._stream = stream
+
+    def _target(self):
+        return self._buffer if threading.get_ident() == self._owner else self._stream
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def clear():
+    """Clear the screen, unless a frame being built will replace it anyway."""
+    global _previous
+    if _depth:
+        return
+    _previous = None
+    if _is_terminal():
+        sys.stdout.write(CLEAR)
+        sys.stdout.flush()
+
+
+@contextmanager
+def frame(clip=False):
+    """Collect everything printed inside the block and draw it as one frame.
+
+    Frames may be nested; the outermost one is drawn when it closes. Only
+    what the calling thread prints goes into the frame. With
+    ``--profile``, the time from opening the frame to writing it is added
+    to ``profiler.render_stats``.
+
+    Args:
+        clip (bool): Cut the frame to the window instead of letting it
+            scroll; only for frames whose end can be left out, never for
+            ones ending in a question
+    """
+    global _depth
+    if _depth:
+        yield
+        return
+    started = time.perf_counter()
+    buffer = io.StringIO()
+    _depth += 1
+    try:
+        with redirect_stdout(_FrameOutput(buffer, sys.stdout)):
+            yield
+    finally:
+        _depth -= 1
+        _draw(buffer.getvalue(), clip)
+        if profiler.render_stats is not None:
+            profiler.render_stats.add(time.perf_counter() - started)
+
+
+def framed(function):
+    """Decorator drawing everything a function prints as one frame."""
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        with frame():
+            return function(*args, **kwargs)
+    return wrapper
+
+
+def _width(line):
+    """Number of columns a line takes, without its colour codes."""
+    return len(_ANSI.sub('', line))
+
+
+def _clip(line, width):
+    """Cut a line to ``width`` columns, ending in an ellipsis, keeping its colour codes."""
+    if _width(line) <= width:
+        return line
+    parts = []
+    room = width
+    for i, part in enumerate(_ANSI.split(line)):
+        if i % 2:
+            parts.append(part)  # A colour code
+        elif len(part) < room:
+            parts.append(part)
+            room -= len(part)
+        elif room > 0:
+            parts.append(part[:room - 1] + '\u2026')
+            room = 0
+    return ''.join(parts)
+
+
+def _fit(lines, size):
+    """Cut the lines of a frame to the width and height of the window, less ``MARGIN``.
+
+    Returns:
+        list: The lines to draw; unchanged in a window too small to hold
+            more than the note about what was left out
+    """
+    room = size.lines - MARGIN
+    if room < 2 or size.columns < 2:
+        return lines
+    lines = [_clip(line, size.columns - 1) for line in lines]
+    if len(lines) > room:
+        hidden = len(lines) - room + 1
+        lines = lines[:room - 1] + [f"{DIM}... {hidden} more lines; enlarge the window to see them{RESET}"]
+    return lines
+
+
+def _draw(text, clip=False):
+    """Write a frame over the previous one, rewriting only what changed.
+
+    Args:
+        text (str): The frame
+        clip (bool): Cut it to the window (see ``frame``)
+    """
+    global _previous, _size
+    if not _is_terminal():
+        sys.stdout.write(text)
+        sys.stdout.flush()
+        return
+
+    lines = text.split('\n')
+    if lines and lines[-1] == '':
+        lines.pop()  # The frame ends with a newline
+    size = shutil.get_terminal_size()
+    if clip:
+        lines = _fit(lines, size)
+        text = ''.join(line + '\n' for line in lines)
+    # Diffing relies on every line taking one row and nothing having scrolled
+    fits = (len(lines) + MARGIN <= size.lines
+            and all(_width(line) < size.columns for line in lines))
+
+    if fits and _previous is not None and size == _size:
+        parts = [f"\033[{row};1H{line}\033[K"
+                 for row, line in enumerate(lines, 1)
+                 if row > len(_previous) or _previous[row - 1] != line]
+        # Erase whatever was printed below the old frame (prompt, messages)
+        parts.append(f"\033[{len(lines) + 1};1H\033[J")
+        output = ''.join(parts)
+    else:
+        output = CLEAR + text
+
+    sys.stdout.write(output)
+    sys.stdout.flush()
+    _previous = lines if fits else None
+    _size = size
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Scan snapshots and snapshot diffs for DiskMan.
+
+A snapshot records the size of every file and directory below a path as
+gzip-compressed JSON lines: a header, then one ``[kind, size, path]`` array
+per entry with paths relative to the root and '/'-separated:
+
+    {"snapshot": 1, "root": "/var", "created": 1700000000.0, "rules": ""}
+    ["f", 2048, "log/syslog"]
+    ["d", 2048, "log"]
+    ["d", 2048, ""]
+
+Entries are written in one fixed order (see ``_key``): inside a directory,
+its sub-directories by name with everything below them, then its files by
+name, then the directory itself. Two snapshots in that order are compared
+with a single streaming merge, so memory stays constant however large the
+trees are.
+"""
+import os
+import gzip
+import json
+import time
+from operator import itemgetter
+from .scanner import iter_directories, ScanStats
+
+FORMAT_VERSION = 1
+
+NEW = 'new'
+REMOVED = 'removed'
+GROWN = 'grown'
+SHRUNK = 'shrunk'
+
+
+class SnapshotError(Exception):
+    """Raised when a file is not a readable DiskMan snapshot."""
+
+
+class Change(object):
+    """An entry whose size differs between two snapshots."""
+
+    __slots__ = ('path', 'is_dir', 'old_size', 'new_size')
+
+    def __init__(self, path, is_dir, old_size, new_size):
+        self.path = path          # '/'-separated, relative to the snapshot root
+        self.is_dir = is_dir
+        self.old_size = old_size  # None if the entry is new
+        self.new_size = new_size  # None if the entry was removed
+
+    @property
+    def name(self):
+        """Last component of the path."""
+        return self.path.rpartition('/')[2]
+
+    @property
+    def delta(self):
+        """Growth in bytes, negative if the entry shrank or was removed."""
+        return (self.new_size or 0) - (self.old_size or 0)
+
+    @property
+    def status(self):
+        """One of ``NEW``, ``REMOVED``, ``GROWN`` or ``SHRUNK``."""
+        if self.old_size is None:
+            return NEW
+        if self.new_size is None:
+            return REMOVED
+        return GROWN if self.new_size > self.old_size else SHRUNK
+
+
+def _key(kind, path):
+    """Sort key of an entry, matching the order ``save_snapshot`` writes.
+
+    Below a common parent, sub-directory subtrees (0) come before files (1),
+    which come before the directory's own record (2).
+    """
+    parts = path.split('/') if path else []
+    if kind == 'd':
+        return tuple((0, part) for part in parts) + ((2, ''),)
+    return tuple((0, part) for part in parts[:-1]) + ((1, parts[-1]),)
+
+
+def _within(path, base):
+    """Check whether a relative path is ``base`` or lies below it."""
+    return not base or path == base or path.startswith(base + '/')
+
+
+def save_snapshot(directory, path, prune=None):
+    """Walk a tree and write its snapshot.
+
+    The walk is post-order with bounded memory (see ``iter_directories``),
+    and the file is written next to ``path`` and renamed into place, so an
+    interrupted walk never leaves a truncated snapshot behind.
+
+    Args:
+        directory (str): Directory to record
+        path (str): Snapshot file to write
+        prune (ScanFilter, optional): Parts of the tree to leave out
+
+    Returns:
+        ScanStats: Counters of the walk
+
+    Raises:
+        OSError: If the directory can't be read or the file can't be written
+    """
+    directory = os.path.abspath(directory)
+    stats = ScanStats()
+    partial = path + '.partial'
+    try:
+        with gzip.open(partial, 'wt', encoding='utf-8') as f:
+            f.write(json.dumps({'snapshot': FORMAT_VERSION, 'root': directory,
+                                'created': time.time(),
+                                'rules': prune.describe() if prune is not None else ''}) + '\n')
+            for dir_path, depth, node in iter_directories(directory, stats, prune, ordered=True):
+                rel = os.path.relpath(dir_path, directory).replace(os.sep, '/') if depth else ''
+                prefix = rel + '/' if rel else ''
+                for name, size, is_dir, _ in sorted(node.files, key=itemgetter(0)):
+                    if not is_dir:  # Links to directories are never counted
+                        f.write(json.dumps(['f', size, prefix + name]) + '\n')
+                f.write(json.dumps(['d', node.size, rel]) + '\n')
+        os.replace(partial, path)
+    except BaseException:
+        try:
+            os.remove(partial)
+        except OSError:
+            pass
+        raise
+    return stats
+
+
+def read_header(path):
+    """Return the header of a snapshot file.
+
+    Returns:
+        dict: ``root``, ``created`` and ``rules`` of the snapshot
+
+    Raises:
+        OSError: If the file can't be read
+        SnapshotError: If it is not a DiskMan snapshot
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return _parse_header(f.readline(), path)
+
+
+def _parse_header(line, path):
+    try:
+        header = json.loads(line)
+    except ValueError:
+        header = None
+    if not isinstance(header, dict) or header.get('snapshot') != FORMAT_VERSION:
+        raise SnapshotError(f"not a DiskMan snapshot: {path}")
+    return header
+
+
+def _entries(path):
+    """Yield ``(key, kind, size, path)`` for every entry of a snapshot, in order."""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        _parse_header(f.readline(), path)
+        last = None
+        for number, line in enumerate(f, 2):
+            try:
+                kind, size, rel = json.loads(line)
+            except ValueError:
+                raise SnapshotError(f"{path}: line {number} is damaged")
+            key = _key(kind, rel)
+            if last is not None and key <= last:
+                raise SnapshotError(f"{path}: line {number} is out of order")
+            last = key
+            yield key, kind, size, rel
+
+
+def _merge(old_path, new_path, base=''):
+    """Pair up the entries of two snapshots below ``base``.
+
+    Yields:
+        tuple: ``(path, is_dir, old_size, new_size)`` for every entry of
+            either snapshot, with None for the side it is missing from
+    """
+    end = _key('d', base)  # The subtree of base ends with base's own record
+    old = _entries(old_path)
+    new = _entries(new_path)
+    a = next(old, None)
+    b = next(new, None)
+    while a is not None or b is not None:
+        if (a is None or a[0] > end) and (b is None or b[0] > end):
+            break
+        if b is None or (a is not None and a[0] < b[0]):
+            entry = (a[3], a[1] == 'd', a[2], None)
+            a = next(old, None)
+        elif a is None or b[0] < a[0]:
+            entry = (b[3], b[1] == 'd', None, b[2])
+            b = next(new, None)
+        else:
+            entry = (a[3], a[1] == 'd', a[2], b[2])
+            a = next(old, None)
+            b = next(new, None)
+        if _within(entry[0], base):
+            yield entry
+    old.close()
+    new.close()
+
+
+def diff_snapshots(old_path, new_path, base=''):
+    """Yield every entry that differs between two snapshots, in snapshot order.
+
+    Args:
+        old_path (str): Earlier snapshot
+        new_path (str): Later snapshot
+        base (str): Only compare below this '/'-separated relative path
+
+    Yields:
+        Change: One per new, removed, grown or shrunk entry
+
+    Raises:
+        OSError: If a snapshot can't be read
+        SnapshotError: If a file is not a valid snapshot
+    """
+    for path, is_dir, old_size, new_size in _merge(old_path, new_path, base):
+        if old_size != new_size:
+            yield Change(path, is_dir, old_size, new_size)
+
+
+def diff_directory(old_path, new_path, base=''):
+    """Compare the immediate entries of one directory across two snapshots.
+
+    Both files are streamed; only the changed entries of ``base`` are kept.
+
+    Args:
+        old_path (str): Earlier snapshot
+        new_path (str): Later snapshot
+        base (str): '/'-separated directory relative to the snapshot root
+
+    Returns:
+        tuple: ``(changes, old_total, new_total)`` where ``changes`` holds the
+            changed entries directly inside ``base``, most grown first, and
+            the totals are the sizes of ``base`` itself (None where absent)
+
+    Raises:
+        OSError: If a snapshot can't be read
+        SnapshotError: If a file is not a valid snapshot
+    """
+    changes = []
+    old_total = new_total = None
+    for path, is_dir, old_size, new_size in _merge(old_path, new_path, base):
+        if path == base:
+            if is_dir:
+                old_total, new_total = old_size, new_size
+        elif old_size != new_size and path.rpartition('/')[0] == base:
+            changes.append(Change(path, is_dir, old_size, new_size))
+    changes.sort(key=lambda change: change.delta, reverse=True)
+    return changes, old_total, new_total
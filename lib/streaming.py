@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Progressive directory listing for DiskMan.
+
+A ``StreamingScan`` measures a directory in a background thread and exposes
+the partial listing while it runs, so the UI can show every entry at once
+and fill in sizes as they arrive.
+"""
+import os
+import threading
+from .scanner import ScanProgress, ScanCancelled
+
+
+class StreamingScan(object):
+    """Background scan of one directory with a live, partial listing."""
+
+    def __init__(self, cache, directory, refresh=False):
+        self.cache = cache
+        self.directory = os.path.abspath(directory)
+        self.refresh = refresh
+        self.progress = ScanProgress()
+        self.version = 0        # Bumped whenever the listing changes
+        self.done = False
+        self.error = None
+        self._cancel = threading.Event()
+        self._root = None
+        self._pending = set()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+
+    def start(self):
+        """Start scanning in the background."""
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """Stop the scan; sub-directories already measured stay cached."""
+        self._cancel.set()
+
+    def items(self):
+        """Return the current listing, largest first.
+
+        Returns:
+            list: ``(name, size, is_dir, is_hidden)`` tuples where ``size`` is
+                None for sub-directories still being measured; those are
+                listed after every sized entry
+        """
+        with self.cache.lock:
+            if self._root is None:
+                return []
+            items = [(name, None, is_dir, is_hidden) if name in self._pending
+                     else (name, size, is_dir, is_hidden)
+                     for name, size, is_dir, is_hidden in self._root.items()]
+        items.sort(key=lambda x: (x[1] is not None, x[1] or 0), reverse=True)
+        return items
+
+    def _on_update(self, root, pending):
+        self._root = root
+        self._pending = pending
+        self.version += 1
+
+    def _run(self):
+        try:
+            self.cache.scan_streaming(self.directory, self.refresh, self.progress,
+                                      self._cancel, self._on_update)
+        except ScanCancelled:
+            pass
+        except (OSError, PermissionError) as e:
+            self.error = e
+        finally:
+            self.done = True
+            self.version += 1
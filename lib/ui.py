@@ -4,12 +4,47 @@ User interface functions for DiskMan.
 """
 import os
 import time
+import datetime
 import humanize
 from colorama import Fore, Style
+from functools import lru_cache
 from .utils import clear_screen
+from .screen import framed
+from .ages import AGE_DAYS, CLOCKS, stale_bytes
+from . import profiler
 
-def display_directory(directory, items, page=0, items_per_page=20):
-    """Display the directory contents with sizes, paginated."""
+BATCH_SHOWN = 15  # Items listed on the batch delete confirmation
+
+# How each listing order is described in the header
+SORT_NAMES = {'size': "size", 'name': "name", 'count': "number of files",
+              'mtime': "last modified, newest first", 'stale': "stale bytes"}
+
+# Listings show the same few sizes on every redraw
+_naturalsize = lru_cache(maxsize=4096)(humanize.naturalsize)
+
+@framed
+def display_directory(directory, items, page=0, items_per_page=20, scan_summary=None,
+                      scan_progress=None, title="Current directory", total_size=None, marked=None,
+                      ages=None, sort_key='size'):
+    """Display the directory contents with sizes, paginated.
+
+    Args:
+        directory (str): Directory being displayed
+        items (list): ``(name, size, is_dir, is_hidden)`` tuples, sorted;
+            ``size`` is None for entries still being measured. A ``Listing``
+            is only read for the page shown and supplies the total
+        page (int): Page to show
+        items_per_page (int): Rows per page
+        scan_summary (dict, optional): Index usage from ``get_scan_summary``
+        scan_progress (ScanProgress, optional): Progress of a running scan
+        title (str): Header label shown before the directory
+        total_size (int, optional): Size the percentages are relative to,
+            defaults to the sum of ``items``
+        marked (dict, optional): Items marked for deletion, by full path
+        ages (dict, optional): ``days`` and ``clock`` of the stale column,
+            ``stale`` bytes by name and the directory's ``histogram``
+        sort_key (str): Order of ``items``, named in the header unless 'size'
+    """
     total_items = len(items)
     total_pages = (total_items + items_per_page - 1) // items_per_page  # Ceiling division
 
@@ -27,22 +62,39 @@ def display_directory(directory, items, page=0, items_per_page=20):
     clear_screen()
 
     # Display header with colors
-    print(f"\n{Fore.CYAN}{Style.BRIGHT}Current directory: {Fore.YELLOW}{directory}{Style.RESET_ALL}")
+    print(f"\n{Fore.CYAN}{Style.BRIGHT}{title}: {Fore.YELLOW}{directory}{Style.RESET_ALL}")
     print(f"{Fore.CYAN}Showing items {Fore.WHITE}{start_idx + 1}-{end_idx} {Fore.CYAN}of {Fore.WHITE}{total_items} {Fore.CYAN}(Page {Fore.WHITE}{page + 1} {Fore.CYAN}of {Fore.WHITE}{total_pages or 1}{Fore.CYAN}){Style.RESET_ALL}")
+    if scan_progress is not None:
+        show_scan_progress(scan_progress)
+    elif scan_summary:
+        show_scan_summary(scan_summary)
+
+    if total_size is None:
+        total_size = getattr(items, 'total', None)  # A Listing knows it without a pass
+    if total_size is None:
+        total_size = sum(item[1] or 0 for item in items) if items else 0
+    if sort_key != 'size':
+        print(f"{Fore.CYAN}Sorted by: {Fore.WHITE}{SORT_NAMES[sort_key]}{Fore.CYAN} ('{Fore.WHITE}s size{Fore.CYAN}' to sort by size){Style.RESET_ALL}")
+    if ages is not None:
+        show_age_summary(ages, total_size)
+        stale_heading = f"{'Stale ' + str(ages['days']) + 'd+':<12} "
+    else:
+        stale_heading = ""
+
     print(f"{Fore.BLUE}{'-' * 100}{Style.RESET_ALL}")
-    print(f"{Fore.GREEN}{Style.BRIGHT}{'#':<4} {'Name':<40} {'Size':<15} {'%':<8} {'Type':<10}{Style.RESET_ALL}")
+    print(f"{Fore.GREEN}{Style.BRIGHT}{'#':<4} {'Name':<40} {'Size':<15} {'%':<8} {stale_heading}{'Type':<10}{Style.RESET_ALL}")
     print(f"{Fore.BLUE}{'-' * 100}{Style.RESET_ALL}")
 
-    total_size = sum(item[1] for item in items) if items else 0
-
     for i, (name, size, is_dir, is_hidden) in enumerate(page_items, start_idx + 1):
-        # Truncate long filenames
-        if len(name) > 37:
+        # Truncate long filenames; relative paths keep their tail
+        if len(name) > 37 and os.sep in name:
+            display_name = "..." + name[-34:]
+        elif len(name) > 37:
             display_name = name[:34] + "..."
         else:
             display_name = name
 
-        size_str = humanize.naturalsize(size)
+        size_str = _naturalsize(size) if size is not None else "sizing..."
 
         # Set colors based on item type and if it's hidden
         if is_dir and is_hidden:
@@ -63,8 +115,11 @@ def display_directory(directory, items, page=0, items_per_page=20):
             type_color = Fore.YELLOW
 
         # Calculate percentage of total size and set color based on percentage
-        percentage = (size / total_size * 100) if total_size > 0 else 0
-        if percentage > 10:
+        percentage = (size / total_size * 100) if total_size > 0 and size is not None else 0
+        if size is None:
+            percentage_color = Fore.WHITE + Style.DIM
+            size_color = Fore.WHITE + Style.DIM
+        elif percentage > 10:
             percentage_color = Fore.RED
             size_color = Fore.RED
         elif percentage > 5:
@@ -73,14 +128,22 @@ def display_directory(directory, items, page=0, items_per_page=20):
         else:
             percentage_color = Fore.GREEN
             size_color = Fore.GREEN
-        percentage_str = f"{percentage:.1f}%"
+        percentage_str = f"{percentage:.1f}%" if size is not None else "-"
+
+        stale_str = ""
+        if ages is not None:
+            stale = ages['stale'].get(name, 0)
+            stale_color = Fore.RED if size and stale * 2 > size else Fore.WHITE
+            stale_str = f"{stale_color}{_naturalsize(stale) if stale else '-':<12} "
 
         # Print item with colors
-        print(f"{Fore.YELLOW}{i:<4} {name_color}{display_name:<40} {size_color}{size_str:<15} {percentage_color}{percentage_str:<8} {type_color}{item_type:<10}{Style.RESET_ALL}")
+        mark = _mark(marked, directory, name)
+        print(f"{Fore.YELLOW}{i:<4}{mark}{name_color}{display_name:<40} {size_color}{size_str:<15} {percentage_color}{percentage_str:<8} {stale_str}{type_color}{item_type:<10}{Style.RESET_ALL}")
 
     print(f"{Fore.BLUE}{'-' * 100}{Style.RESET_ALL}")
     print(f"{Fore.CYAN}Total size: {Fore.YELLOW}{humanize.naturalsize(total_size)}{Style.RESET_ALL}")
     print(f"{Fore.CYAN}Total items: {Fore.YELLOW}{total_items}{Style.RESET_ALL}")
+    show_marked(marked)
 
     # Show pagination info if there are multiple pages
     if total_pages > 1:
@@ -90,14 +153,268 @@ def display_directory(directory, items, page=0, items_per_page=20):
         if page < total_pages - 1:
             print(f"{Fore.CYAN}Use '{Fore.WHITE}n{Fore.CYAN}' for next page{Style.RESET_ALL}")
 
+    render_stats = profiler.render_stats
+    if render_stats is not None and render_stats.frames:
+        # This frame is still being built, so the previous one is reported
+        print(f"{Fore.CYAN}Last frame rendered in {Fore.WHITE}{render_stats.last * 1000:.1f} ms{Fore.CYAN} (average {Fore.WHITE}{render_stats.total / render_stats.frames * 1000:.1f} ms{Fore.CYAN} over {Fore.WHITE}{render_stats.frames}{Fore.CYAN} frames){Style.RESET_ALL}")
+
+def _mark(marked, directory, name):
+    """Return the marker shown between an item's number and its name."""
+    if marked and os.path.join(directory, name) in marked:
+        return f"{Fore.RED}{Style.BRIGHT}*{Style.RESET_ALL}"
+    return " "
+
+def show_marked(marked):
+    """Summarise the items marked for deletion, if any."""
+    if not marked:
+        return
+    total = sum(size or 0 for size, _ in marked.values())
+    print(f"{Fore.RED}Marked: {Fore.WHITE}{len(marked)}{Fore.RED} items, {Fore.WHITE}{humanize.naturalsize(total)}{Fore.CYAN} ('{Fore.WHITE}d{Fore.CYAN}' deletes them, '{Fore.WHITE}u{Fore.CYAN}' clears the marks){Style.RESET_ALL}")
+
+@framed
+def display_duplicates(directory, groups, page=0, items_per_page=20, stats=None, marked=None):
+    """Display groups of duplicate files, paginated by file.
+
+    Files are numbered across groups so they can be opened or deleted by
+    number; each group starts with a line showing how much deleting every
+    copy but one would free.
+
+    Args:
+        directory (str): Directory that was searched
+        groups (list): ``DuplicateGroup`` objects with relative paths
+        page (int): Page to show
+        items_per_page (int): Files per page
+        stats (dict, optional): Files examined at each stage of the search
+        marked (dict, optional): Items marked for deletion, by full path
+    """
+    rows = [(group_no, group, path) for group_no, group in enumerate(groups, 1)
+            for path in group.paths]
+    total_items = len(rows)
+    total_pages = (total_items + items_per_page - 1) // items_per_page  # Ceiling division
+    page = max(0, min(page, total_pages - 1)) if total_pages > 0 else 0
+    start_idx = page * items_per_page
+    end_idx = min(start_idx + items_per_page, total_items)
+    reclaimable = sum(group.reclaimable for group in groups)
+
+    # Clear screen
+    clear_screen()
+
+    # Display header with colors
+    print(f"\n{Fore.CYAN}{Style.BRIGHT}Duplicate files below: {Fore.YELLOW}{directory}{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}Showing files {Fore.WHITE}{start_idx + 1 if total_items else 0}-{end_idx} {Fore.CYAN}of {Fore.WHITE}{total_items} {Fore.CYAN}in {Fore.WHITE}{len(groups)}{Fore.CYAN} groups (Page {Fore.WHITE}{page + 1} {Fore.CYAN}of {Fore.WHITE}{total_pages or 1}{Fore.CYAN}){Style.RESET_ALL}")
+    if stats:
+        print(f"{Fore.CYAN}Checked: {Fore.WHITE}{stats['files']:,}{Fore.CYAN} files by size, {Fore.WHITE}{stats['partial_hashed']:,}{Fore.CYAN} by first/last block, {Fore.WHITE}{stats['full_hashed']:,}{Fore.CYAN} by full content{Style.RESET_ALL}")
+    print(f"{Fore.BLUE}{'-' * 100}{Style.RESET_ALL}")
+    print(f"{Fore.GREEN}{Style.BRIGHT}{'#':<4} {'Name':<64} {'Size':<15}{Style.RESET_ALL}")
+    print(f"{Fore.BLUE}{'-' * 100}{Style.RESET_ALL}")
+
+    shown_group = None
+    for i, (group_no, group, path) in enumerate(rows[start_idx:end_idx], start_idx + 1):
+        if group_no != shown_group:
+            shown_group = group_no
+            print(f"{Fore.MAGENTA}Group {group_no}: {Fore.WHITE}{len(group.paths)}{Fore.MAGENTA} copies, {Fore.RED}{humanize.naturalsize(group.reclaimable)}{Fore.MAGENTA} reclaimable{Style.RESET_ALL}")
+
+        # Truncate long paths, keeping their tail
+        display_name = "..." + path[-61:] if len(path) > 64 else path
+        name_color = Fore.WHITE if os.path.basename(path).startswith('.') else Fore.WHITE + Style.BRIGHT
+        print(f"{Fore.YELLOW}{i:<4}{_mark(marked, directory, path)}{name_color}{display_name:<64} {Fore.GREEN}{humanize.naturalsize(group.size):<15}{Style.RESET_ALL}")
+
+    print(f"{Fore.BLUE}{'-' * 100}{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}Reclaimable: {Fore.YELLOW}{humanize.naturalsize(reclaimable)}{Fore.CYAN} by keeping one copy of each file{Style.RESET_ALL}")
+    show_marked(marked)
+
+    # Show pagination info if there are multiple pages
+    if total_pages > 1:
+        print(f"{Fore.CYAN}Viewing page {Fore.WHITE}{page + 1} {Fore.CYAN}of {Fore.WHITE}{total_pages}{Style.RESET_ALL}")
+
+def _signed_size(delta):
+    """Format a size change with an explicit sign."""
+    return ("+" if delta >= 0 else "-") + humanize.naturalsize(abs(delta))
+
+@framed
+def display_diff(directory, changes, page=0, items_per_page=20, summary=None):
+    """Display what changed in a directory between two snapshots, paginated.
+
+    Args:
+        directory (str): Directory being compared
+        changes (list): ``Change`` objects of its immediate entries, most grown first
+        page (int): Page to show
+        items_per_page (int): Rows per page
+        summary (dict, optional): Totals and snapshot times from ``compare_snapshots``
+    """
+    total_items = len(changes)
+    total_pages = (total_items + items_per_page - 1) // items_per_page  # Ceiling division
+    page = max(0, min(page, total_pages - 1)) if total_pages > 0 else 0
+    start_idx = page * items_per_page
+    end_idx = min(start_idx + items_per_page, total_items)
+
+    # Clear screen
+    clear_screen()
+
+    # Display header with colors
+    print(f"\n{Fore.CYAN}{Style.BRIGHT}Changes in: {Fore.YELLOW}{directory}{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}Showing changes {Fore.WHITE}{start_idx + 1 if total_items else 0}-{end_idx} {Fore.CYAN}of {Fore.WHITE}{total_items} {Fore.CYAN}(Page {Fore.WHITE}{page + 1} {Fore.CYAN}of {Fore.WHITE}{total_pages or 1}{Fore.CYAN}){Style.RESET_ALL}")
+    if summary:
+        old_time = datetime.datetime.fromtimestamp(summary['old_created']).strftime('%Y-%m-%d %H:%M')
+        new_time = datetime.datetime.fromtimestamp(summary['new_created']).strftime('%Y-%m-%d %H:%M')
+        print(f"{Fore.CYAN}Snapshots: {Fore.WHITE}{old_time}{Fore.CYAN} -> {Fore.WHITE}{new_time}{Style.RESET_ALL}")
+    print(f"{Fore.BLUE}{'-' * 100}{Style.RESET_ALL}")
+    print(f"{Fore.GREEN}{Style.BRIGHT}{'#':<4} {'Name':<40} {'Before':<12} {'After':<12} {'Change':<13} {'Status':<10}{Style.RESET_ALL}")
+    print(f"{Fore.BLUE}{'-' * 100}{Style.RESET_ALL}")
+
+    status_colors = {'new': Fore.RED, 'grown': Fore.YELLOW, 'shrunk': Fore.GREEN, 'removed': Fore.GREEN + Style.DIM}
+    for i, change in enumerate(changes[start_idx:end_idx], start_idx + 1):
+        name = change.name + ("/" if change.is_dir else "")
+        display_name = name[:34] + "..." if len(name) > 37 else name
+        name_color = Fore.CYAN + Style.BRIGHT if change.is_dir else Fore.WHITE + Style.BRIGHT
+        before = humanize.naturalsize(change.old_size) if change.old_size is not None else "-"
+        after = humanize.naturalsize(change.new_size) if change.new_size is not None else "-"
+        status_color = status_colors[change.status]
+        print(f"{Fore.YELLOW}{i:<4} {name_color}{display_name:<40} {Fore.WHITE}{before:<12} {after:<12} {status_color}{_signed_size(change.delta):<13} {change.status:<10}{Style.RESET_ALL}")
+
+    print(f"{Fore.BLUE}{'-' * 100}{Style.RESET_ALL}")
+    if summary:
+        old_total = summary['old_total'] or 0
+        new_total = summary['new_total'] or 0
+        print(f"{Fore.CYAN}Total: {Fore.WHITE}{humanize.naturalsize(old_total)}{Fore.CYAN} -> {Fore.WHITE}{humanize.naturalsize(new_total)}{Fore.CYAN} ({Fore.YELLOW}{_signed_size(new_total - old_total)}{Fore.CYAN}){Style.RESET_ALL}")
+    grown = sum(change.delta for change in changes if change.delta > 0)
+    freed = -sum(change.delta for change in changes if change.delta < 0)
+    print(f"{Fore.CYAN}Grown: {Fore.YELLOW}{humanize.naturalsize(grown)}{Fore.CYAN}, shrunk or removed: {Fore.GREEN}{humanize.naturalsize(freed)}{Style.RESET_ALL}")
+
+    # Show pagination info if there are multiple pages
+    if total_pages > 1:
+        print(f"{Fore.CYAN}Viewing page {Fore.WHITE}{page + 1} {Fore.CYAN}of {Fore.WHITE}{total_pages}{Style.RESET_ALL}")
+
+@framed
+def display_breakdown(directory, aggregator, page=0, items_per_page=20, others=()):
+    """Display where the space below a directory goes, grouped by one aggregator.
+
+    Args:
+        directory (str): Directory that was scanned
+        aggregator (Aggregator): Filled-in aggregator to show
+        page (int): Page to show
+        items_per_page (int): Rows per page
+        others (iterable): Names of the other breakdowns, offered in the header
+    """
+    rows = aggregator.rows()
+    total_items = len(rows)
+    total_pages = (total_items + items_per_page - 1) // items_per_page  # Ceiling division
+    page = max(0, min(page, total_pages - 1)) if total_pages > 0 else 0
+    start_idx = page * items_per_page
+    end_idx = min(start_idx + items_per_page, total_items)
+    total_size = sum(size for _, size, _ in rows)
+
+    # Clear screen
+    clear_screen()
+
+    # Display header with colors
+    print(f"\n{Fore.CYAN}{Style.BRIGHT}{aggregator.title} below: {Fore.YELLOW}{directory}{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}Showing groups {Fore.WHITE}{start_idx + 1 if total_items else 0}-{end_idx} {Fore.CYAN}of {Fore.WHITE}{total_items} {Fore.CYAN}(Page {Fore.WHITE}{page + 1} {Fore.CYAN}of {Fore.WHITE}{total_pages or 1}{Fore.CYAN}){Style.RESET_ALL}")
+    if others:
+        switch = ", ".join(f"'{Fore.WHITE}b {name}{Fore.CYAN}'" for name in others)
+        print(f"{Fore.CYAN}Other breakdowns: {switch}{Style.RESET_ALL}")
+    print(f"{Fore.BLUE}{'-' * 100}{Style.RESET_ALL}")
+    print(f"{Fore.GREEN}{Style.BRIGHT}{'#':<4} {'Name':<40} {'Size':<15} {'%':<8} {'Files':<10}{Style.RESET_ALL}")
+    print(f"{Fore.BLUE}{'-' * 100}{Style.RESET_ALL}")
+
+    for i, (label, size, files) in enumerate(rows[start_idx:end_idx], start_idx + 1):
+        display_name = label[:34] + "..." if len(label) > 37 else label
+        percentage = size / total_size * 100 if total_size > 0 else 0
+        if percentage > 10:
+            color = Fore.RED
+        elif percentage > 5:
+            color = Fore.YELLOW
+        else:
+            color = Fore.GREEN
+        print(f"{Fore.YELLOW}{i:<4} {Fore.WHITE}{Style.BRIGHT}{display_name:<40} {color}{_naturalsize(size):<15} {f'{percentage:.1f}%':<8} {Fore.WHITE}{files:<10,}{Style.RESET_ALL}")
+
+    print(f"{Fore.BLUE}{'-' * 100}{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}Total size: {Fore.YELLOW}{humanize.naturalsize(total_size)}{Fore.CYAN} in {Fore.YELLOW}{sum(files for _, _, files in rows):,}{Fore.CYAN} files{Style.RESET_ALL}")
+
+    # Show pagination info if there are multiple pages
+    if total_pages > 1:
+        print(f"{Fore.CYAN}Viewing page {Fore.WHITE}{page + 1} {Fore.CYAN}of {Fore.WHITE}{total_pages}{Style.RESET_ALL}")
+
+def show_age_summary(ages, total_size):
+    """Display how much of the directory hasn't been modified or accessed for 30/90/365 days."""
+    for clock, verb in zip(CLOCKS, ("modified", "accessed")):
+        parts = []
+        for days in AGE_DAYS:
+            stale = stale_bytes(ages['histogram'], days, clock)
+            share = stale / total_size * 100 if total_size > 0 else 0
+            selected = Style.BRIGHT if (days, clock) == (ages['days'], ages['clock']) else ""
+            parts.append(f"{selected}{Fore.WHITE}{days}d+ {Fore.YELLOW}{humanize.naturalsize(stale)}{Fore.CYAN} ({share:.0f}%){Style.RESET_ALL}{Fore.CYAN}")
+        print(f"{Fore.CYAN}Not {verb}: {', '.join(parts)}{Style.RESET_ALL}")
+
+def show_scan_progress(progress):
+    """Display the live counters of a running scan."""
+    print(f"{Fore.CYAN}Sizing: {Fore.WHITE}{progress.files:,}{Fore.CYAN} files ({Fore.WHITE}{progress.files_per_second:,.0f}/s{Fore.CYAN}), {Fore.WHITE}{humanize.naturalsize(progress.bytes)}{Fore.CYAN} counted, {Fore.WHITE}{progress.dirs_remaining:,}{Fore.CYAN} directories remaining{Style.RESET_ALL}")
+
+def show_scan_summary(scan_summary):
+    """Display how the most recent scan was carried out."""
+    if 'rules' in scan_summary:
+        show_prune_summary(scan_summary)
+    if 'reused' in scan_summary:
+        show_index_summary(scan_summary)
+    if 'profile' in scan_summary:
+        show_profile_summary(scan_summary['profile'])
+
+def show_index_summary(scan_summary):
+    """Display the age of the scan index and how much of it was revalidated."""
+    reused = scan_summary['reused']
+    total = reused + scan_summary['rescanned']
+    if scan_summary['index_time'] is None or total == 0:
+        print(f"{Fore.CYAN}Scan index: {Fore.WHITE}new{Fore.CYAN}, {Fore.WHITE}{total}{Fore.CYAN} directories scanned and saved{Style.RESET_ALL}")
+        return
+    age = humanize.naturaltime(datetime.datetime.fromtimestamp(scan_summary['index_time']))
+    print(f"{Fore.CYAN}Scan index from {Fore.WHITE}{age}{Fore.CYAN}: {Fore.WHITE}{reused}{Fore.CYAN} of {Fore.WHITE}{total}{Fore.CYAN} directories revalidated ({Fore.WHITE}{reused / total * 100:.1f}%{Fore.CYAN}), {Fore.WHITE}{scan_summary['rescanned']}{Fore.CYAN} rescanned{Style.RESET_ALL}")
+
+def show_prune_summary(scan_summary):
+    """Display what the scan filter left out and roughly how much time it saved."""
+    pruned = f"{scan_summary['pruned_dirs']:,}{Fore.CYAN} folders and {Fore.WHITE}{scan_summary['pruned_files']:,}{Fore.CYAN} files skipped"
+    if scan_summary['pruned_examples']:
+        more = ", ..." if scan_summary['pruned_dirs'] > len(scan_summary['pruned_examples']) else ""
+        pruned += f" ({Fore.WHITE}{', '.join(scan_summary['pruned_examples'])}{more}{Fore.CYAN})"
+    if scan_summary['time_saved'] is not None:
+        pruned += f", about {Fore.WHITE}{scan_summary['time_saved']:.1f}s{Fore.CYAN} saved"
+    print(f"{Fore.CYAN}Pruning ({scan_summary['rules']}): {Fore.WHITE}{pruned}{Style.RESET_ALL}")
+
+def show_profile_summary(profile):
+    """Display where the time of the most recent scan went (``--profile``)."""
+    def relative(path):
+        return os.path.relpath(path, profile['root']) if path != profile['root'] else os.curdir
+
+    dirs = profile['dirs_listed'] + profile['dirs_restored']
+    elapsed = profile['elapsed'] or 0
+    rate = f" ({Fore.WHITE}{profile['stat_calls'] / elapsed:,.0f}/s{Fore.CYAN})" if elapsed > 0 else ""
+    print(f"{Fore.CYAN}Profile: {Fore.WHITE}{dirs:,}{Fore.CYAN} folders in {Fore.WHITE}{elapsed:.2f}s{Fore.CYAN}, {Fore.WHITE}{profile['listdir_calls']:,}{Fore.CYAN} listdir and {Fore.WHITE}{profile['stat_calls']:,}{Fore.CYAN} stat calls{rate}, {Fore.WHITE}{profile['dirs_restored']:,}{Fore.CYAN} from index, {Fore.WHITE}{profile['skipped_entries']:,}{Fore.CYAN} entries skipped, {Fore.WHITE}{profile['unreadable_dirs']:,}{Fore.CYAN} folders unreadable{Style.RESET_ALL}")
+    if profile['top_level']:
+        top = ", ".join(f"{Fore.WHITE}{entry['name']}{Fore.CYAN} {entry['seconds']:.2f}s" for entry in profile['top_level'][:5])
+        print(f"{Fore.CYAN}Time by top-level folder: {top}{Style.RESET_ALL}")
+    if profile['slowest']:
+        slowest = ", ".join(f"{Fore.WHITE}{relative(entry['path'])}{Fore.CYAN} {entry['seconds'] * 1000:.1f} ms" for entry in profile['slowest'][:3])
+        print(f"{Fore.CYAN}Slowest folders: {slowest}{Style.RESET_ALL}")
+    if profile['errors']:
+        errors = ", ".join(f"{Fore.WHITE}{relative(entry['path'])}{Fore.CYAN} ({entry['error']})" for entry in profile['errors'][:2])
+        print(f"{Fore.CYAN}Skipped: {errors}{Style.RESET_ALL}")
+
 def show_navigation_options(current_page, total_pages):
     """Display navigation options."""
     print(f"\n{Fore.CYAN}{Style.BRIGHT}Navigation options:{Style.RESET_ALL}")
     print(f"  {Fore.YELLOW}number{Fore.CYAN}: Navigate to item by number (1, 2, 3, ...){Style.RESET_ALL}")
     print(f"  {Fore.YELLOW}o number{Fore.CYAN}: Open parent folder and highlight item (e.g., 'o 1'){Style.RESET_ALL}")
-    print(f"  {Fore.YELLOW}d number{Fore.CYAN}: Delete file or folder with smart confirmation (e.g., 'd 1'){Style.RESET_ALL}")
+    print(f"  {Fore.YELLOW}d number{Fore.CYAN}: Delete file or folder with smart confirmation (e.g., 'd 1', or 'd 1-5,8' for several){Style.RESET_ALL}")
+    print(f"  {Fore.YELLOW}m numbers{Fore.CYAN}: Mark items for deletion (e.g., 'm 2-4'); 'u numbers' unmarks, 'u' clears, 'd' deletes the marked items{Style.RESET_ALL}")
     print(f"  {Fore.YELLOW}g path{Fore.CYAN} : Go to specific directory (e.g., 'g /Users/Documents'){Style.RESET_ALL}")
     print(f"  {Fore.YELLOW}..{Fore.CYAN}    : Go up one level{Style.RESET_ALL}")
+    print(f"  {Fore.YELLOW}r{Fore.CYAN}     : Refresh (rescan) current directory{Style.RESET_ALL}")
+    print(f"  {Fore.YELLOW}t{Fore.CYAN}     : Largest files anywhere below this directory ('t d' for folders){Style.RESET_ALL}")
+    print(f"  {Fore.YELLOW}dup{Fore.CYAN}   : Find duplicate files below this directory{Style.RESET_ALL}")
+    print(f"  {Fore.YELLOW}b [ext|uid|type]{Fore.CYAN}: Size below this directory by extension, owner or file type{Style.RESET_ALL}")
+    print(f"  {Fore.YELLOW}a [30|90|365] [atime]{Fore.CYAN}: Show bytes not modified (accessed) for that many days, most first ('a off' hides){Style.RESET_ALL}")
+    print(f"  {Fore.YELLOW}s size|name|count|mtime|stale{Fore.CYAN}: Sort the listing by size, name, number of files, modification time or stale bytes{Style.RESET_ALL}")
+    print(f"  {Fore.YELLOW}snap file{Fore.CYAN}: Save the sizes of everything below this directory to a snapshot file{Style.RESET_ALL}")
+    print(f"  {Fore.YELLOW}diff old [new]{Fore.CYAN}: Show what grew since snapshot 'old' (compared with now, or with snapshot 'new'){Style.RESET_ALL}")
     if current_page > 0:
         print(f"  {Fore.YELLOW}p{Fore.CYAN}     : Previous page{Style.RESET_ALL}")
     if current_page < total_pages - 1:
@@ -214,6 +531,63 @@ def clean_text_for_confirmation(text):
     # Convert to lowercase and remove spaces and special characters
     return re.sub(r'[^a-z0-9]', '', text.lower())
 
+def show_batch_delete_confirmation(entries):
+    """Display one confirmation screen for deleting several items.
+
+    Sizes come from the existing scan, so nothing is read from disk.
+
+    Args:
+        entries (list): ``(path, size, is_dir)`` of every item to delete
+
+    Returns:
+        bool: True if user confirms deletion, False otherwise
+    """
+    clear_screen()
+    total = sum(size or 0 for _, size, _ in entries)
+    dirs = sum(1 for _, _, is_dir in entries if is_dir)
+
+    # Display warning header
+    print(f"\n{Fore.RED}{Style.BRIGHT}{'!' * 80}{Style.RESET_ALL}")
+    print(f"{Fore.RED}{Style.BRIGHT}{'WARNING: PERMANENT DELETION':^80}{Style.RESET_ALL}")
+    print(f"{Fore.RED}{Style.BRIGHT}{'!' * 80}{Style.RESET_ALL}")
+
+    print(f"\n{Fore.RED}{Style.BRIGHT}You are about to delete {Fore.WHITE}{len(entries)}{Fore.RED} items "
+          f"({Fore.WHITE}{dirs}{Fore.RED} folders, {Fore.WHITE}{len(entries) - dirs}{Fore.RED} files), "
+          f"{Fore.WHITE}{humanize.naturalsize(total)}{Fore.RED} in total (largest first):{Style.RESET_ALL}")
+    print(f"{Fore.BLUE}{'-' * 80}{Style.RESET_ALL}")
+
+    shown = sorted(entries, key=lambda entry: entry[1] or 0, reverse=True)
+    for i, (path, size, is_dir) in enumerate(shown[:BATCH_SHOWN], 1):
+        display_path = "..." + path[-57:] if len(path) > 60 else path
+        name_color = Fore.CYAN + Style.BRIGHT if is_dir else Fore.WHITE + Style.BRIGHT
+        print(f"{Fore.YELLOW}{i:<4} {name_color}{display_path:<60} {Fore.GREEN}{humanize.naturalsize(size or 0):<15}{Style.RESET_ALL}")
+    if len(shown) > BATCH_SHOWN:
+        print(f"{Fore.YELLOW}... and {len(shown) - BATCH_SHOWN} more items{Style.RESET_ALL}")
+
+    # Display warning message
+    print(f"\n{Fore.RED}{Style.BRIGHT}{'!' * 80}{Style.RESET_ALL}")
+    print(f"{Fore.RED}{Style.BRIGHT}WARNING: This action is {Fore.WHITE}PERMANENT{Fore.RED} and {Fore.WHITE}CANNOT BE UNDONE{Fore.RED}!{Style.RESET_ALL}")
+    print(f"{Fore.RED}{Style.BRIGHT}All data in these items will be permanently lost.{Style.RESET_ALL}")
+    print(f"{Fore.RED}{Style.BRIGHT}{'!' * 80}{Style.RESET_ALL}")
+
+    # The number of items must be typed, so a stray range can't slip through
+    confirm_str = clean_text_for_confirmation(f"delete {len(entries)}")
+    print(f"\n{Fore.YELLOW}To confirm deletion, type {Fore.RED}{Style.BRIGHT}\"{confirm_str}\"{Style.RESET_ALL}{Fore.YELLOW} (lowercase with no spaces or special characters):{Style.RESET_ALL}")
+    print(f"{Fore.YELLOW}(or type '{Fore.WHITE}c{Fore.YELLOW}' to abort){Style.RESET_ALL}")
+
+    user_input = input(f"{Fore.RED}> {Style.RESET_ALL}").strip()
+    if user_input.lower() == 'c':
+        print(f"\n{Fore.GREEN}Deletion cancelled.{Style.RESET_ALL}")
+        input(f"{Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
+        return False
+    if clean_text_for_confirmation(user_input) == confirm_str:
+        return True
+    print(f"\n{Fore.RED}Confirmation failed. Deletion cancelled.{Style.RESET_ALL}")
+    print(f"{Fore.YELLOW}You entered: {Fore.WHITE}{user_input}{Style.RESET_ALL}")
+    print(f"{Fore.YELLOW}Expected: {Fore.WHITE}{confirm_str}{Style.RESET_ALL}")
+    input(f"{Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
+    return False
+
 def show_delete_confirmation(item_details):
     """Display a confirmation screen for deleting a file or folder.
 
@@ -254,6 +628,8 @@ def show_delete_confirmation(item_details):
     print(f"{Fore.CYAN}Path:           {Fore.WHITE}{path}{Style.RESET_ALL}")
     print(f"{Fore.CYAN}Size:           {Fore.WHITE}{humanize.naturalsize(size)}{Style.RESET_ALL}")
     print(f"{Fore.CYAN}Type:           {Fore.WHITE}{'Directory' if is_dir else 'File'}{Style.RESET_ALL}")
+    if is_dir and 'file_count' in item_details:
+        print(f"{Fore.CYAN}Contents:       {Fore.WHITE}{item_details['file_count']:,} files in {item_details['dir_count']:,} folders{Style.RESET_ALL}")
     print(f"{Fore.CYAN}Created:        {Fore.WHITE}{created.strftime('%Y-%m-%d %H:%M:%S')}{Style.RESET_ALL}")
     print(f"{Fore.CYAN}Last Modified:  {Fore.WHITE}{modified.strftime('%Y-%m-%d %H:%M:%S')}{Style.RESET_ALL}")
     print(f"{Fore.CYAN}Last Accessed:  {Fore.WHITE}{accessed.strftime('%Y-%m-%d %H:%M:%S')}{Style.RESET_ALL}")
@@ -263,7 +639,7 @@ def show_delete_confirmation(item_details):
         contents = item_details['contents']
         item_count = item_details.get('item_count', len(contents))
 
-        print(f"\n{Fore.CYAN}Directory contains {Fore.WHITE}{item_count}{Fore.CYAN} items:{Style.RESET_ALL}")
+        print(f"\n{Fore.CYAN}Directory contains {Fore.WHITE}{item_count}{Fore.CYAN} items (largest first):{Style.RESET_ALL}")
         print(f"{Fore.BLUE}{'-' * 80}{Style.RESET_ALL}")
 
         for i, item in enumerate(contents):
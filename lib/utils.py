@@ -4,38 +4,33 @@ Utility functions for DiskMan.
 """
 import os
 import sys
-import subprocess
 import threading
 import time
 import itertools
 import shutil
+from .scanner import scan_tree
+from . import screen
 
-# Check if required packages are installed
-try:
-    import humanize
-except ImportError:
-    print("The 'humanize' package is required. Installing...")
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "humanize"])
-    import humanize
-
-try:
-    from colorama import init, Fore, Back, Style
-    init(autoreset=True)  # Initialize colorama
-except ImportError:
-    print("The 'colorama' package is required for colored output. Installing...")
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "colorama"])
-    from colorama import init, Fore, Back, Style
-    init(autoreset=True)  # Initialize colorama
+from colorama import init, Fore, Style
+init(autoreset=True)  # Initialize colorama
 
 # Global variable to control the spinner
 spinner_running = False
 spinner_thread = None
+spinner_stopped = threading.Event()  # Wakes the spinner as soon as it is stopped
 
-def start_spinner(message):
-    """Start a spinner with a message."""
+def start_spinner(message, status=None):
+    """Start a spinner with a message.
+
+    Args:
+        message (str): What is being done
+        status (callable, optional): Returns a short progress text shown
+            after the message, refreshed with the spinner
+    """
     global spinner_running, spinner_thread
     spinner_running = True
-    spinner_thread = threading.Thread(target=_show_spinner, args=(message,))
+    spinner_stopped.clear()
+    spinner_thread = threading.Thread(target=_show_spinner, args=(message, status))
     spinner_thread.daemon = True
     spinner_thread.start()
     return spinner_thread
@@ -45,10 +40,11 @@ def stop_spinner():
     global spinner_running, spinner_thread
     if spinner_running:
         spinner_running = False
+        spinner_stopped.set()
         if spinner_thread and spinner_thread.is_alive():
             spinner_thread.join(timeout=1.0)  # Add timeout to prevent hanging
 
-def _show_spinner(message):
+def _show_spinner(message, status=None):
     """Display a spinner with a message while a task is running."""
     global spinner_running
     spinner_chars = itertools.cycle(['⣾', '⣽', '⣻', '⢿', '⡿', '⣟', '⣯', '⣷'])
@@ -60,34 +56,96 @@ def _show_spinner(message):
 
     while spinner_running:
         char = next(spinner_chars)
-        sys.stdout.write(f"\r{Fore.CYAN}{message} {Fore.YELLOW}{char}{Style.RESET_ALL}")
+        progress = f" {Fore.WHITE}{status()}\033[K" if status is not None else ""  # Erase leftovers of a longer line
+        sys.stdout.write(f"\r{Fore.CYAN}{message} {Fore.YELLOW}{char}{progress}{Style.RESET_ALL}")
         sys.stdout.flush()
-        time.sleep(0.1)
+        spinner_stopped.wait(0.1)
 
     # Clear spinner when done
     sys.stdout.write('\r' + ' ' * 80)
     sys.stdout.write(f"\r{Fore.GREEN}✓ {message} completed!{Style.RESET_ALL}\n")
     sys.stdout.flush()
 
-def get_size(path):
-    """Calculate the size of a file or directory."""
+def get_size(path, workers=1):
+    """Calculate the size of a file or directory.
+
+    Args:
+        path (str): Path to measure
+        workers (int): Number of threads used to scan a directory
+
+    Returns:
+        int: Size in bytes
+    """
     if os.path.isfile(path):
         return os.path.getsize(path)
 
-    total_size = 0
-    for dirpath, _, filenames in os.walk(path):
-        for f in filenames:
-            fp = os.path.join(dirpath, f)
-            if not os.path.islink(fp):  # Skip symbolic links
-                try:
-                    total_size += os.path.getsize(fp)
-                except (OSError, PermissionError):
-                    pass  # Skip files that can't be accessed
-    return total_size
+    try:
+        return scan_tree(path, workers=workers).size
+    except (OSError, PermissionError):
+        return 0  # Directory can't be accessed
+
+def poll_input(timeout):
+    """Wait up to ``timeout`` seconds for a line of input.
+
+    Only meant for interactive terminals: on POSIX it relies on ``select``
+    and on Windows on ``msvcrt``.
+
+    Args:
+        timeout (float): Seconds to wait
+
+    Returns:
+        str: The line entered, without the newline, or None on timeout
+    """
+    if os.name == 'nt':
+        import msvcrt
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if msvcrt.kbhit():
+                # A key was pressed: read the rest of the line normally
+                first = msvcrt.getwche()
+                if first in ('\r', '\n'):
+                    print()
+                    return ''
+                return first + input()
+            time.sleep(0.02)
+        return None
+
+    import select
+    ready, _, _ = select.select([sys.stdin], [], [], timeout)
+    if not ready:
+        return None
+    line = sys.stdin.readline()
+    if not line:
+        raise EOFError
+    return line.rstrip('\n')
+
+def parse_selection(text, count):
+    """Parse a list of item numbers and ranges such as ``1-5,8 12``.
+
+    Args:
+        text (str): Numbers and ``first-last`` ranges, separated by commas
+            or spaces
+        count (int): Number of items that can be selected
+
+    Returns:
+        list: Zero-based indices in ascending order without repeats, or None
+            if the text isn't a selection or mentions a missing item
+    """
+    indices = set()
+    for part in text.replace(',', ' ').split():
+        first, _, last = part.partition('-')
+        if not first.isdigit() or (last and not last.isdigit()):
+            return None
+        first = int(first)
+        last = int(last) if last else first
+        if not 1 <= first <= last <= count:
+            return None
+        indices.update(range(first - 1, last))
+    return sorted(indices) or None
 
 def clear_screen():
     """Clear the terminal screen."""
-    os.system('cls' if os.name == 'nt' else 'clear')
+    screen.clear()
 
 def is_hidden(path):
     """Check if a file or directory is hidden."""
@@ -119,6 +177,7 @@ def set_terminal_size(width, height):
     Returns:
         bool: True if successful, False otherwise
     """
+    import subprocess  # Only needed here and to open the file explorer
     try:
         # For Windows
         if os.name == 'nt':
@@ -223,6 +282,7 @@ def set_terminal_size(width, height):
 
 def open_file_explorer(item_path, name):
     """Open the file explorer and highlight the selected item."""
+    import subprocess
     try:
         # Use the appropriate command based on the OS
         if sys.platform == 'darwin':  # macOS
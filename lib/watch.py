@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Live cache freshness for DiskMan.
+
+A ``Watcher`` follows the directory on screen, the sub-directories shown on
+the page and, within a budget, the cached directories below them. On Linux
+it uses inotify through ``ctypes`` (no extra packages); elsewhere, or when
+inotify can't be set up, it polls the watched paths with ``os.stat`` and
+compares their modification times (and, for files on the page, sizes).
+
+Events are not applied one by one: every directory touched is marked and,
+at most once a second, re-listed with ``SizeCache.revalidate``, which
+re-reads its files, keeps the cached subtrees of unchanged sub-directories
+and applies the difference to every ancestor. ``version`` is bumped when the
+totals of the directory on screen change, so the page can be redrawn.
+
+Watches are not recursive: a change deeper than the watched directories is
+picked up by a refresh ('r').
+"""
+import os
+import sys
+import stat
+import time
+import errno
+import select
+import struct
+import threading
+from collections import deque
+
+MAX_WATCHES = 512     # Directories watched at most, the one on screen first
+SETTLE_SECONDS = 1.0  # Changes are applied at most this often
+POLL_SECONDS = 2.0    # Interval of the polling fallback
+
+# inotify(7) flags
+_IN_MODIFY = 0x2
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_DELETE_SELF = 0x400
+_IN_MOVE_SELF = 0x800
+_IN_Q_OVERFLOW = 0x4000
+_IN_IGNORED = 0x8000
+_IN_ONLYDIR = 0x1000000
+_IN_NONBLOCK = getattr(os, 'O_NONBLOCK', 0o4000)
+_IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0o2000000)
+_MASK = (_IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE
+         | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_ONLYDIR)
+_EVENT = struct.Struct('iIII')  # wd, mask, cookie, len; followed by the name
+
+
+class Inotify(object):
+    """A minimal inotify instance, through the C library."""
+
+    def __init__(self):
+        """Create the instance.
+
+        Raises:
+            OSError: If inotify isn't available (not Linux, or out of instances)
+        """
+        if not sys.platform.startswith('linux'):
+            raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+        import ctypes
+        import ctypes.util
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            self._add = libc.inotify_add_watch
+            self._rm = libc.inotify_rm_watch
+            init = libc.inotify_init1
+        except (OSError, AttributeError) as e:
+            raise OSError(errno.ENOSYS, f"inotify is not available: {e}")
+        self._add.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._rm.argtypes = (ctypes.c_int, ctypes.c_int)
+        self._errno = ctypes.get_errno
+        self.fd = init(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            code = self._errno()
+            raise OSError(code, os.strerror(code))
+
+    def add(self, path):
+        """Watch a directory and return its watch descriptor.
+
+        Raises:
+            OSError: If it can't be watched (gone, no permission, out of watches)
+        """
+        wd = self._add(self.fd, os.fsencode(path), _MASK)
+        if wd < 0:
+            code = self._errno()
+            raise OSError(code, os.strerror(code), path)
+        return wd
+
+    def remove(self, wd):
+        """Stop watching a directory."""
+        self._rm(self.fd, wd)
+
+    def read(self, timeout):
+        """Wait up to ``timeout`` seconds for events.
+
+        Returns:
+            list: ``(wd, mask, name)`` tuples, empty on timeout
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class Watcher(object):
+    """Keeps the cached sizes of the directories being browsed up to date."""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.version = 0        # Bumped whenever the directory on screen changes
+        self.backend = None     # 'inotify' or 'polling'
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._key = None        # Arguments of the last watch(), to skip repeats
+        self._directory = None  # Directory on screen
+        self._shown = None      # Its (size, file_count, dir_count) when watched
+        self._dirs = {}         # path -> watch descriptor (inotify) or stat signature
+        self._files = {}        # path -> stat signature of files on the page (polling)
+        self._paths = {}        # watch descriptor -> path (inotify)
+        self._dirty = set()     # Directories to re-list
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        try:
+            self._inotify = Inotify()
+            self.backend = 'inotify'
+        except OSError:
+            self._inotify = None
+            self.backend = 'polling'
+
+    def start(self):
+        """Start watching in the background."""
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop watching; the background thread exits within a second."""
+        self._stop.set()
+
+    def watch(self, directory, items=()):
+        """Follow a directory and the entries on its page.
+
+        Args:
+            directory (str): Directory on screen, or None to pause watching
+            items (list): ``(name, size, is_dir, is_hidden)`` tuples on the page
+        """
+        key = (directory, tuple(name for name, _, _, _ in items))
+        if key == self._key:
+            return
+        self._key = key
+        dirs = []
+        files = []
+        shown = None
+        if directory is not None:
+            directory = os.path.abspath(directory)
+            with self.cache.lock:
+                node = self.cache.lookup(directory)
+                if node is not None:
+                    shown = (node.size, node.file_count, node.dir_count)
+                    visible = [node.children.get(name) for name, _, is_dir, _ in items
+                               if is_dir and node.children]
+                    dirs = self._below(directory, [child for child in visible if child is not None])
+            files = [os.path.join(directory, name) for name, _, is_dir, _ in items if not is_dir]
+        with self._lock:
+            self._directory = directory
+            self._shown = shown
+            if self._inotify is not None:
+                self._watch_dirs(dirs)
+            else:
+                self._dirs = {path: self._dirs.get(path) or _signature(path) for path in dirs}
+                self._files = {path: self._files.get(path) or _signature(path) for path in files}
+
+    def _below(self, directory, children):
+        """Return the directories to watch, nearest first; the caller holds the cache lock.
+
+        That is the directory itself, then the given children and their
+        cached sub-directories breadth first, up to ``MAX_WATCHES``.
+        """
+        # The index is written by every revalidation; watching it would loop
+        index = self.cache.index
+        skip = os.path.dirname(index.path) if index is not None else None
+        paths = [directory] if directory != skip else []
+        queue = deque((os.path.join(directory, child.name), child) for child in children)
+        while queue and len(paths) < MAX_WATCHES:
+            path, node = queue.popleft()
+            if path == skip:
+                continue
+            paths.append(path)
+            for child in (node.children or {}).values():
+                queue.append((os.path.join(path, child.name), child))
+        return paths
+
+    def _watch_dirs(self, paths):
+        """Add and remove inotify watches to match ``paths``; the caller holds ``_lock``."""
+        wanted = set(paths)
+        for path in [path for path in self._dirs if path not in wanted]:
+            self._inotify.remove(self._dirs.pop(path))
+        for path in paths:
+            if path in self._dirs:
+                continue
+            try:
+                wd = self._inotify.add(path)
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    break  # Out of watches (fs.inotify.max_user_watches)
+                continue
+            self._dirs[path] = wd
+            self._paths[wd] = path
+
+    def _run(self):
+        settled = time.time()
+        try:
+            while not self._stop.is_set():
+                if self._inotify is not None:
+                    self._read_events()
+                else:
+                    self._stop.wait(POLL_SECONDS)
+                    self._poll()
+                if self._dirty and time.time() - settled >= SETTLE_SECONDS:
+                    self._apply()
+                    settled = time.time()
+        finally:
+            if self._inotify is not None:
+                self._inotify.close()
+
+    def _read_events(self):
+        """Mark the directories reported by inotify as dirty."""
+        events = self._inotify.read(SETTLE_SECONDS)
+        with self._lock:
+            for wd, mask, name in events:
+                if mask & _IN_Q_OVERFLOW:
+                    self._dirty.update(self._dirs)  # Events were lost
+                    continue
+                path = self._paths.get(wd)
+                if path is None:
+                    continue
+                if mask & _IN_IGNORED:
+                    # Removed, or its directory is gone
+                    del self._paths[wd]
+                    if self._dirs.get(path) == wd:
+                        del self._dirs[path]
+                    continue
+                if mask & (_IN_DELETE_SELF | _IN_MOVE_SELF):
+                    self._dirty.add(os.path.dirname(path))
+                else:
+                    self._dirty.add(path)
+
+    def _poll(self):
+        """Mark the watched directories (or parents of files) whose stat changed."""
+        with self._lock:
+            for paths in (self._dirs, self._files):
+                for path, old in list(paths.items()):
+                    new = _signature(path)
+                    if new == old:
+                        continue
+                    paths[path] = new
+                    is_dir = paths is self._dirs and new is not None
+                    self._dirty.add(path if is_dir else os.path.dirname(path))
+
+    def _apply(self):
+        """Re-list the dirty directories and report a change to the one on screen."""
+        with self._lock:
+            dirty = self._dirty
+            self._dirty = set()
+        for path in dirty:
+            self.cache.revalidate(path)
+        with self.cache.lock:
+            node = self.cache.lookup(self._directory) if self._directory is not None else None
+            shown = (node.size, node.file_count, node.dir_count) if node is not None else None
+        with self._lock:
+            if shown != self._shown:
+                self._shown = shown
+                self._key = None  # Entries may have come or gone; watch them again
+                self.version += 1
+
+
+def _signature(path):
+    """Return what the polling fallback compares for a path, or None if it's gone."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_ino, 0 if stat.S_ISDIR(st.st_mode) else st.st_size
@@ -0,0 +1,92 @@
+import os
+import time
+
+import pytest
+
+from lib.ages import (file_ages, add_ages, ages_difference, stale_bytes, file_stale, DAY)
+from lib.cache import SizeCache
+from lib.index import ScanIndex
+from lib.scanner import scan_tree
+
+NOW = time.time()
+
+# name -> (size, days since modified, days since accessed)
+FILES = {
+    'fresh.bin': (1, 1, 1),
+    'month.bin': (10, 45, 5),
+    'quarter.bin': (100, 100, 40),
+    'old/year.bin': (1000, 400, 400),
+    'old/deeper/ancient.bin': (10000, 800, 200),
+}
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / 'root'
+    for name, (size, modified, accessed) in FILES.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'x' * size)
+        os.utime(str(path), (NOW - accessed * DAY, NOW - modified * DAY))
+    return str(root)
+
+
+def packed(node, name):
+    return node.files.ages(node.files.index(name))
+
+
+def check(root):
+    assert packed(root, 'fresh.bin') == 0
+    assert packed(root, 'month.bin') == 1
+    assert packed(root, 'quarter.bin') == 2 | 1 << 2
+    old = root.children['old']
+    assert packed(old, 'year.bin') == 3 | 3 << 2
+    assert list(root.ages) == [10, 100, 11000, 100, 10000, 1000]
+    assert list(old.ages) == [0, 0, 11000, 0, 10000, 1000]
+    assert stale_bytes(root.ages, 30) == 11110
+    assert stale_bytes(root.ages, 90) == 11100
+    assert stale_bytes(root.ages, 365) == 11000
+    assert stale_bytes(root.ages, 30, 'atime') == 11100
+    assert stale_bytes(root.ages, 365, 'atime') == 1000
+
+
+def test_bins_are_packed_and_rolled_up(tree):
+    root = scan_tree(tree)
+    check(root)
+    assert root.children['old'].children['deeper'].ages is not None
+    assert file_stale(100, packed(root, 'quarter.bin'), 90) == 100
+    assert file_stale(100, packed(root, 'quarter.bin'), 365) == 0
+    assert file_stale(100, packed(root, 'quarter.bin'), 30, 'atime') == 100
+
+
+def test_parallel_scan_bins_match(tree):
+    assert list(scan_tree(tree, workers=4).ages) == list(scan_tree(tree).ages)
+
+
+def test_bins_restored_from_the_index(tree, tmp_path):
+    index = ScanIndex(str(tmp_path / 'index.sqlite3'))
+    SizeCache(index=index).get(tree)
+    cache = SizeCache(index=index)
+    root = cache.get(tree)
+    assert cache.last_stats.dirs_reused == 3
+    cache.get(os.path.join(tree, 'old'))
+    check(root)
+    index.close()
+
+
+def test_fresh_directory_has_no_ages(tmp_path):
+    (tmp_path / 'new.txt').write_bytes(b'n')
+    assert scan_tree(str(tmp_path)).ages is None
+
+
+def test_arithmetic():
+    assert file_ages(5, 0) is None
+    ages = file_ages(5, 2 | 3 << 2)
+    assert list(ages) == [0, 5, 0, 0, 0, 5]
+    total = add_ages(None, ages)
+    total = add_ages(total, file_ages(7, 1))
+    assert list(total) == [7, 5, 0, 0, 0, 5]
+    assert list(ages_difference(total, ages)) == [7, 0, 0, 0, 0, 0]
+    assert add_ages(None, None) is None
+    assert list(add_ages(total, ages, -1)) == [7, 0, 0, 0, 0, 0]
+    assert stale_bytes(None, 30) == 0
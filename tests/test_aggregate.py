@@ -0,0 +1,94 @@
+import os
+
+import pytest
+
+from lib.aggregate import (Aggregates, Aggregator, AGGREGATORS, register, NO_EXTENSION, OTHER)
+from lib.cache import SizeCache
+from lib.index import ScanIndex
+from lib.process_scan import scan_tree_processes
+from lib.scanner import scan_tree, ScanStats
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / 'root'
+    files = {'a/photo.JPG': 300, 'a/b/clip.mp4': 1000, 'a/b/notes.txt': 40, 'c/Makefile': 7,
+             'c/lib.so': 500, 'top.jpg': 60, 'd/e/f/deep.log': 11}
+    for name, size in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'x' * size)
+    os.symlink('top.jpg', str(root / 'link.jpg'))  # Links are not files
+    return str(root)
+
+
+def breakdown(aggregates):
+    return {aggregator.name: sorted(aggregator.rows()) for aggregator in aggregates.aggregators}
+
+
+def test_groups(tree):
+    stats = ScanStats(aggregates=Aggregates())
+    root = scan_tree(tree, stats=stats)
+    by_type = dict((label, (size, count)) for label, size, count in stats.aggregates.get('type').rows())
+    assert by_type == {'Images': (360, 2), 'Video': (1000, 1), 'Documents': (40, 1),
+                       OTHER: (7, 1), 'Binaries': (500, 1), 'Logs': (11, 1)}
+    by_ext = dict((label, size) for label, size, _ in stats.aggregates.get('ext').rows())
+    assert by_ext['.jpg'] == 360 and by_ext[NO_EXTENSION] == 7
+    owner = stats.aggregates.get('uid')
+    assert owner.bytes == {os.getuid(): root.size}
+    for aggregator in stats.aggregates.aggregators:
+        assert sum(aggregator.bytes.values()) == root.size
+        assert sum(aggregator.counts.values()) == root.file_count == 7
+
+
+@pytest.mark.parametrize('workers', [2, 4])
+def test_threads_and_processes_match_a_serial_scan(tree, workers):
+    serial = ScanStats(aggregates=Aggregates())
+    scan_tree(tree, stats=serial)
+    threads = ScanStats(aggregates=Aggregates())
+    scan_tree(tree, stats=threads, workers=workers)
+    processes = ScanStats(aggregates=Aggregates())
+    scan_tree_processes(tree, workers, stats=processes)
+    assert breakdown(threads.aggregates) == breakdown(serial.aggregates)
+    assert breakdown(processes.aggregates) == breakdown(serial.aggregates)
+
+
+def test_fork_and_merge():
+    st = os.stat(__file__)
+    total = Aggregates(['ext', 'type'])
+    part = total.fork()
+    assert [a.name for a in part.aggregators] == ['ext', 'type'] and part.get('ext').bytes == {}
+    total.add('a.PY', st)
+    part.add('b.py', st)
+    part.add('c', st)
+    total.merge(part)
+    assert total.get('ext').counts == {'.py': 2, '': 1}
+    assert total.get('type').bytes == {'Code': 2 * st.st_size, OTHER: st.st_size}
+    assert total.get('uid') is None
+
+
+def test_registered_aggregator_is_fed_by_scans(tree, monkeypatch):
+    monkeypatch.setattr('lib.aggregate.AGGREGATORS', dict(AGGREGATORS))
+
+    @register
+    class SizeClass(Aggregator):
+        name = 'class'
+        __slots__ = ()
+
+        def key(self, name, st):
+            return 'big' if st.st_size >= 100 else 'small'
+
+    stats = ScanStats(aggregates=Aggregates())
+    scan_tree(tree, stats=stats)
+    assert stats.aggregates.get('class').counts == {'big': 3, 'small': 4}
+
+
+def test_aggregating_scans_skip_the_index(tree, tmp_path):
+    index = ScanIndex(str(tmp_path / 'index.sqlite3'))
+    SizeCache(index=index).get(tree)
+    cache = SizeCache(index=index)
+    cache.aggregating = True
+    cache.get(tree)
+    assert cache.last_stats.dirs_reused == 0  # Every file has to be seen
+    assert cache.breakdowns[tree].get('type').counts['Images'] == 2
+    index.close()
@@ -0,0 +1,106 @@
+import io
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+from lib import scanner
+from lib.batch import run_scan, EXIT_OK, EXIT_PARTIAL, EXIT_USAGE
+from lib.profiler import ScanProfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / 'a' / 'deep').mkdir(parents=True)
+    (tmp_path / 'b').mkdir()
+    (tmp_path / 'a' / 'one').write_bytes(b'x' * 100)
+    (tmp_path / 'a' / 'deep' / 'two').write_bytes(b'x' * 200)
+    (tmp_path / 'b' / 'three').write_bytes(b'x' * 300)
+    return tmp_path
+
+
+def records(text):
+    return [json.loads(line) for line in text.splitlines()]
+
+
+def test_json_records_and_summary(tree):
+    out = io.StringIO()
+    assert run_scan(str(tree), depth=1, top=1, as_json=True, out=out) == EXIT_OK
+    found = records(out.getvalue())
+    dirs = {os.path.basename(r['path']): r for r in found if r['type'] == 'dir'}
+    assert set(dirs) == {'a', 'b', os.path.basename(str(tree))}  # 'deep' is below --depth
+    assert dirs['a']['size'] == 300 and dirs['a']['files'] == 2 and dirs['a']['dirs'] == 1
+    assert dirs['a']['top'] == [{'name': 'deep', 'size': 200, 'type': 'dir'}]
+    summary = found[-1]
+    assert summary['type'] == 'summary' and summary['size'] == 600 and summary['errors'] == 0
+
+
+def test_text_output(tree):
+    out = io.StringIO()
+    assert run_scan(str(tree), depth=0, out=out) == EXIT_OK
+    assert out.getvalue() == f"600\t{tree}\n"
+
+
+def test_profile_record_comes_last(tree):
+    out = io.StringIO()
+    assert run_scan(str(tree), as_json=True, out=out, profile=ScanProfile(str(tree))) == EXIT_OK
+    found = records(out.getvalue())
+    assert [r['type'] for r in found[-2:]] == ['summary', 'profile']
+
+
+def test_not_a_directory(tmp_path):
+    assert run_scan(str(tmp_path / 'missing'), out=io.StringIO()) == EXIT_USAGE
+
+
+def test_unreadable_directories_give_partial_status(tree, monkeypatch):
+    original = scanner._read_directory
+
+    def refuse_b(node, path, prune=None, stats=None):
+        if os.path.basename(path) == 'b':
+            raise PermissionError(13, 'Permission denied', path)
+        return original(node, path, prune, stats)
+
+    monkeypatch.setattr(scanner, '_read_directory', refuse_b)
+    out = io.StringIO()
+    assert run_scan(str(tree), as_json=True, out=out) == EXIT_PARTIAL
+    assert records(out.getvalue())[-1]['errors'] == 1
+
+
+class ClosedAfter(io.StringIO):
+    """An output whose reader goes away after some writes."""
+
+    def __init__(self, writes):
+        super().__init__()
+        self.writes = writes
+
+    def write(self, text):
+        if self.writes <= 0:
+            raise BrokenPipeError(32, 'Broken pipe')
+        self.writes -= 1
+        return super().write(text)
+
+
+@pytest.mark.parametrize('writes', range(6))
+def test_reader_going_away_is_not_an_error(tree, writes):
+    # Four directory records, the summary, then the profile record
+    out = ClosedAfter(writes)
+    assert run_scan(str(tree), depth=2, as_json=True, out=out,
+                    profile=ScanProfile(str(tree))) == EXIT_OK
+
+
+@pytest.mark.skipif(os.name == 'nt', reason="relies on POSIX pipes")
+def test_piped_into_head(tmp_path):
+    for i in range(3000):  # Well over a pipe buffer of output
+        (tmp_path / f'dir{i}').mkdir()
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'DiskMan.py'), 'scan', str(tmp_path),
+                                '--json', '--profile'],
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    assert process.stdout.readline()
+    process.stdout.close()
+    _, errors = process.communicate(timeout=60)
+    assert process.returncode == EXIT_OK
+    assert b'Traceback' not in errors and b'BrokenPipe' not in errors
@@ -0,0 +1,156 @@
+import os
+import shutil
+import threading
+
+import pytest
+
+from lib.cache import SizeCache
+from lib.scanner import scan_tree, ScanCancelled
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / 'root'
+    (root / 'a' / 'b').mkdir(parents=True)
+    (root / 'c').mkdir()
+    (root / 'top.txt').write_bytes(b'x' * 100)
+    (root / 'a' / 'mid.txt').write_bytes(b'x' * 200)
+    (root / 'a' / 'b' / 'deep.txt').write_bytes(b'x' * 300)
+    (root / 'a' / 'b' / 'other.txt').write_bytes(b'x' * 400)
+    (root / 'c' / 'one.dat').write_bytes(b'y' * 50)
+    return str(root)
+
+
+def totals(node):
+    return node.size, node.file_count, node.dir_count
+
+
+def assert_matches_disk(cache, path):
+    assert totals(cache.lookup(path)) == totals(scan_tree(path))
+
+
+def test_forget_file_adjusts_every_ancestor(tree):
+    cache = SizeCache()
+    root = cache.get(tree)
+    deep = os.path.join(tree, 'a', 'b', 'deep.txt')
+    os.remove(deep)
+    assert cache.forget(deep)
+    assert list(cache.lookup(os.path.join(tree, 'a', 'b')).files.names) == ['other.txt']
+    assert totals(root) == (1050 - 300, 4, 3)
+    assert_matches_disk(cache, tree)
+    assert_matches_disk(cache, os.path.join(tree, 'a'))
+
+
+def test_forget_directory_drops_its_subtree(tree):
+    cache = SizeCache()
+    root = cache.get(tree)
+    path = os.path.join(tree, 'a')
+    shutil.rmtree(path)
+    assert cache.forget(path)
+    assert 'a' not in root.children
+    assert totals(root) == (150, 2, 1)
+    assert_matches_disk(cache, tree)
+
+
+def test_forget_symlink_does_not_count_a_file(tree):
+    link = os.path.join(tree, 'link')
+    os.symlink('top.txt', link)
+    cache = SizeCache()
+    root = cache.get(tree)
+    before = totals(root)
+    os.remove(link)
+    assert cache.forget(link, counted=False)
+    assert root.file_count == before[1]
+    assert_matches_disk(cache, tree)
+
+
+def test_forget_below_evicted_parent_is_corrected_by_revalidate(tree):
+    cache = SizeCache()
+    root = cache.get(tree)
+    parent = os.path.join(tree, 'a', 'b')
+    cache._collapse(cache.lookup(parent))
+    deep = os.path.join(parent, 'deep.txt')
+    os.remove(deep)
+    assert not cache.forget(deep)
+    assert root.size == 1050  # Not known without the listing
+
+    cache.revalidate(parent)
+    assert totals(root) == (750, 4, 3)
+    assert cache.lookup(parent).children is None  # Still evicted
+    assert_matches_disk(cache, tree)
+
+
+def test_forget_below_evicted_grandparent_is_corrected_by_revalidate(tree):
+    cache = SizeCache()
+    root = cache.get(tree)
+    a = cache.lookup(os.path.join(tree, 'a'))
+    cache._collapse(a)
+    parent = os.path.join(tree, 'a', 'b')
+    assert cache.lookup(parent) is None
+    other = os.path.join(parent, 'other.txt')
+    os.remove(other)
+    assert not cache.forget(other)
+
+    cache.revalidate(parent)
+    assert totals(root) == (650, 4, 3)
+    assert totals(a) == (500, 2, 1)
+    assert_matches_disk(cache, tree)
+
+
+def test_revalidate_keeps_unchanged_subtrees(tree):
+    cache = SizeCache()
+    root = cache.get(tree)
+    a = root.children['a']
+    with open(os.path.join(tree, 'new.txt'), 'wb') as f:
+        f.write(b'z' * 25)
+    os.mkdir(os.path.join(tree, 'd'))
+    shutil.rmtree(os.path.join(tree, 'c'))
+
+    cache.revalidate(tree)
+    assert root.children['a'] is a
+    assert set(root.children) == {'a', 'd'}
+    assert sorted(root.files.names) == ['new.txt', 'top.txt']
+    assert totals(root) == (1025, 5, 3)
+    assert_matches_disk(cache, tree)
+
+
+def test_revalidate_rescans_named_subdirectories(tree):
+    cache = SizeCache()
+    root = cache.get(tree)
+    # A change two levels down doesn't touch the mtime of the root
+    with open(os.path.join(tree, 'a', 'b', 'deep.txt'), 'ab') as f:
+        f.write(b'x' * 1000)
+    cache.revalidate(tree)
+    assert root.size == 1050
+    cache.revalidate(tree, ['a'])
+    assert root.size == 2050
+    assert_matches_disk(cache, tree)
+
+
+class CancelledLater(object):
+    """A cancel event that is only set once it has been checked ``after`` times."""
+
+    def __init__(self, after):
+        self.after = after
+
+    def is_set(self):
+        self.after -= 1
+        return self.after < 0
+
+
+def test_prefetch_of_skeleton_is_cancelled(tree):
+    cache = SizeCache()
+    root = cache.get(tree)
+    root.files = None  # Own files not kept, as after the process backend
+    os.mkdir(os.path.join(tree, 'new'))
+    with open(os.path.join(tree, 'new', 'big.bin'), 'wb') as f:
+        f.write(b'z' * 5000)
+
+    with pytest.raises(ScanCancelled):
+        cache.revalidate(tree, cancel=CancelledLater(1))
+    assert not cache.prefetch(tree, cancel=CancelledLater(1))
+    assert root.files is None and 'new' not in root.children
+    assert root.size == 1050
+
+    assert cache.prefetch(tree, cancel=threading.Event())
+    assert root.size == 6050 and 'new' in root.children
@@ -0,0 +1,202 @@
+import os
+import threading
+
+import pytest
+
+from lib import deletion
+from lib.deletion import delete_tree, DeleteStats
+
+
+def make_tree(root):
+    (root / 'a' / 'b').mkdir(parents=True)
+    (root / 'c').mkdir()
+    (root / 'top.txt').write_bytes(b'x' * 100)
+    (root / 'a' / 'mid.txt').write_bytes(b'x' * 200)
+    (root / 'a' / 'b' / 'deep.txt').write_bytes(b'x' * 300)
+    for i in range(600):  # More than one batch
+        (root / 'c' / f'{i}.dat').write_bytes(b'y')
+
+
+def test_deletes_tree_and_counts(tmp_path):
+    root = tmp_path / 'root'
+    make_tree(root)
+    stats = delete_tree(str(root), workers=4)
+    assert stats.complete and not stats.cancelled
+    assert not root.exists()
+    assert stats.files == 603
+    assert stats.bytes == 100 + 200 + 300 + 600
+    assert stats.dirs == 4
+    assert stats.errors == 0
+
+
+def test_single_file(tmp_path):
+    path = tmp_path / 'file'
+    path.write_bytes(b'x' * 10)
+    stats = delete_tree(str(path))
+    assert stats.complete and stats.files == 1 and stats.bytes == 10
+    assert not path.exists()
+
+
+def test_missing_path_is_an_error(tmp_path):
+    stats = delete_tree(str(tmp_path / 'missing'))
+    assert not stats.complete and stats.errors == 1
+
+
+@pytest.mark.skipif(not hasattr(os, 'symlink'), reason="needs symbolic links")
+def test_links_are_removed_not_followed(tmp_path):
+    outside = tmp_path / 'outside'
+    outside.mkdir()
+    (outside / 'keep.txt').write_bytes(b'keep')
+    root = tmp_path / 'root'
+    root.mkdir()
+    os.symlink(str(outside), str(root / 'link'))
+
+    stats = delete_tree(str(root))
+    assert stats.complete and not root.exists()
+    assert (outside / 'keep.txt').read_bytes() == b'keep'
+    assert stats.bytes == 0  # Links never count
+
+    link = tmp_path / 'link'
+    os.symlink(str(outside), str(link))
+    assert delete_tree(str(link)).complete
+    assert not os.path.lexists(str(link)) and (outside / 'keep.txt').exists()
+
+
+@pytest.mark.skipif(not deletion._DIR_FD, reason="needs directory descriptors")
+def test_directory_swapped_for_symlink_is_not_followed(tmp_path, monkeypatch):
+    outside = tmp_path / 'outside'
+    outside.mkdir()
+    (outside / 'victim.txt').write_bytes(b'victim')
+    root = tmp_path / 'root'
+    (root / 'sub').mkdir(parents=True)
+    (root / 'sub' / 'own.txt').write_bytes(b'own')
+
+    original = deletion._Directory.open
+
+    def swap_then_open(directory):
+        # Between the listing of root and the descent into sub
+        if directory.name == 'sub':
+            os.rename(str(root / 'sub'), str(tmp_path / 'moved'))
+            os.symlink(str(outside), str(root / 'sub'))
+        return original(directory)
+
+    monkeypatch.setattr(deletion._Directory, 'open', swap_then_open)
+    stats = delete_tree(str(root), workers=2)
+    assert not stats.complete and stats.errors
+    assert (outside / 'victim.txt').read_bytes() == b'victim'
+    assert os.path.islink(str(root / 'sub'))
+
+
+@pytest.mark.skipif(not deletion._DIR_FD, reason="needs directory descriptors")
+def test_directory_replaced_by_another_is_left_alone(tmp_path, monkeypatch):
+    other = tmp_path / 'other'
+    other.mkdir()
+    (other / 'victim.txt').write_bytes(b'victim')
+    root = tmp_path / 'root'
+    (root / 'sub').mkdir(parents=True)
+
+    original = deletion._Directory.open
+
+    def replace_then_open(directory):
+        if directory.name == 'sub':
+            os.rmdir(str(root / 'sub'))
+            os.rename(str(other), str(root / 'sub'))
+        return original(directory)
+
+    monkeypatch.setattr(deletion._Directory, 'open', replace_then_open)
+    stats = delete_tree(str(root))
+    assert not stats.complete and stats.errors
+    assert (root / 'sub' / 'victim.txt').read_bytes() == b'victim'
+
+
+def test_cancel_leaves_everything_in_place(tmp_path):
+    root = tmp_path / 'root'
+    make_tree(root)
+    cancel = threading.Event()
+    cancel.set()
+    stats = delete_tree(str(root), cancel=cancel, stats=DeleteStats())
+    assert stats.cancelled and not stats.complete
+    assert (root / 'a' / 'b' / 'deep.txt').exists()
+
+
+def test_unreadable_entries_block_only_their_ancestors(tmp_path, monkeypatch):
+    root = tmp_path / 'root'
+    make_tree(root)
+    original = deletion._unlink
+
+    def refuse_deep(path, stats, name=None, dir_fd=None):
+        if os.path.basename(path) == 'deep.txt':
+            stats.error(path, OSError(13, 'Permission denied'))
+            return False
+        return original(path, stats, name, dir_fd)
+
+    monkeypatch.setattr(deletion, '_unlink', refuse_deep)
+    stats = delete_tree(str(root))
+    assert not stats.complete and stats.errors == 1
+    assert (root / 'a' / 'b' / 'deep.txt').exists()
+    assert not (root / 'c').exists() and not (root / 'top.txt').exists()
+
+
+def test_fallback_without_directory_descriptors(tmp_path, monkeypatch):
+    root = tmp_path / 'root'
+    make_tree(root)
+    monkeypatch.setattr(deletion, '_DIR_FD', False)
+    stats = delete_tree(str(root))
+    assert stats.complete and not root.exists()
+    assert stats.files == 603 and stats.bytes == 1200
+
+
+@pytest.fixture
+def session(monkeypatch):
+    """A fresh session cache for file_operations, recording scheduled re-listings."""
+    from lib import file_operations
+    from lib.cache import SizeCache
+    cache = SizeCache()
+    relisted = []
+    monkeypatch.setattr(cache, 'revalidate_later', lambda path, rescan=(): relisted.append(path))
+    monkeypatch.setattr(file_operations, 'size_cache', cache)
+    return file_operations, cache, relisted
+
+
+def test_delete_item_relists_only_when_the_size_is_unknown(tmp_path, session):
+    file_operations, cache, relisted = session
+    root = tmp_path / 'root'
+    make_tree(root)
+    node = cache.get(str(root))
+    file_operations.delete_item(str(root / 'top.txt'))
+    file_operations.delete_item(str(root / 'a'))
+    assert relisted == []
+    assert node.size == 600 and node.file_count == 600
+
+    cache._collapse(cache.lookup(str(root / 'c')))
+    file_operations.delete_item(str(root / 'c' / '0.dat'))
+    assert relisted == [str(root / 'c')]
+
+
+def test_delete_items_relists_only_when_the_size_is_unknown(tmp_path, session):
+    file_operations, cache, relisted = session
+    root = tmp_path / 'root'
+    make_tree(root)
+    node = cache.get(str(root))
+    stats, deleted = file_operations.delete_items([str(root / 'top.txt'), str(root / 'c' / '1.dat')])
+    assert len(deleted) == 2 and relisted == []
+    assert node.size == 1099
+
+
+def test_item_details_describe_links_not_their_targets(tmp_path, session):
+    file_operations, _, _ = session
+    target = tmp_path / 'target.bin'
+    target.write_bytes(b'x' * 500)
+    os.utime(str(target), (1000000, 1000000))
+    link = tmp_path / 'link'
+    os.symlink(str(target), str(link))
+    details = file_operations.get_item_details(str(link))
+    assert details['size'] == 0 and not details['is_dir']
+    assert details['modified'].timestamp() != 1000000
+
+    os.symlink(str(tmp_path), str(tmp_path / 'dirlink'))
+    details = file_operations.get_item_details(str(tmp_path / 'dirlink'))
+    assert not details['is_dir'] and 'contents' not in details
+
+    details = file_operations.get_item_details(str(target))
+    assert details['size'] == 500 and details['modified'].timestamp() == 1000000
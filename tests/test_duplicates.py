@@ -0,0 +1,90 @@
+import os
+import threading
+
+import pytest
+
+from lib.duplicates import DuplicateFinder, BLOCK_SIZE
+from lib.scanner import walk_entries, ScanCancelled
+
+
+def write(root, name, data):
+    path = os.path.join(str(root), name)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def find(root, **kwargs):
+    finder = DuplicateFinder(workers=3, **kwargs)
+    walk_entries(str(root), finder.add)
+    return finder, finder.find()
+
+
+def test_identical_files_are_grouped(tmp_path):
+    a = write(tmp_path, 'a', b'same' * 100)
+    os.mkdir(str(tmp_path / 'sub'))
+    b = write(tmp_path, 'sub/b', b'same' * 100)
+    write(tmp_path, 'unique', b'other size')
+    finder, groups = find(tmp_path)
+    assert [(g.size, g.paths, g.reclaimable) for g in groups] == [(400, [a, b], 400)]
+    assert finder.files == 3
+    assert finder.partial_hashed == 2  # The file of a unique size is never read
+
+
+def test_same_size_with_different_tails_is_not_grouped(tmp_path):
+    head = b'h' * BLOCK_SIZE
+    write(tmp_path, 'a', head + b'm' * BLOCK_SIZE + b'tail-one' * 100)
+    write(tmp_path, 'b', head + b'm' * BLOCK_SIZE + b'tail-two' * 100)
+    finder, groups = find(tmp_path)
+    assert groups == []
+    assert finder.partial_hashed == 2 and finder.full_hashed == 0
+
+
+def test_same_ends_with_different_middles_need_the_full_hash(tmp_path):
+    ends = b'e' * BLOCK_SIZE
+    a = write(tmp_path, 'a', ends + b'x' * (3 * BLOCK_SIZE) + ends)
+    write(tmp_path, 'b', ends + b'x' * BLOCK_SIZE + b'y' + b'x' * (2 * BLOCK_SIZE - 1) + ends)
+    c = write(tmp_path, 'c', ends + b'x' * (3 * BLOCK_SIZE) + ends)
+    finder, groups = find(tmp_path)
+    assert [g.paths for g in groups] == [[a, c]]
+    assert finder.full_hashed == 3
+
+
+def test_small_files_differing_past_the_first_block(tmp_path):
+    write(tmp_path, 'a', b'z' * BLOCK_SIZE + b'1' * 10)
+    write(tmp_path, 'b', b'z' * BLOCK_SIZE + b'2' * 10)
+    assert find(tmp_path)[1] == []
+
+
+def test_hard_links_are_not_duplicates(tmp_path):
+    a = write(tmp_path, 'a', b'linked' * 50)
+    os.link(a, str(tmp_path / 'b'))
+    assert find(tmp_path)[1] == []
+
+    c = write(tmp_path, 'c', b'linked' * 50)
+    groups = find(tmp_path)[1]
+    assert len(groups) == 1
+    assert len(groups[0].paths) == 2 and c in groups[0].paths  # One name per inode
+
+
+def test_groups_by_reclaimable_bytes_and_min_size(tmp_path):
+    small = [write(tmp_path, f's{i}', b's' * 10) for i in range(3)]
+    big = [write(tmp_path, f'b{i}', b'b' * 25) for i in range(2)]
+    write(tmp_path, 'empty1', b'')
+    write(tmp_path, 'empty2', b'')
+    groups = find(tmp_path)[1]
+    assert [g.paths for g in groups] == [big, small]
+    assert [g.reclaimable for g in groups] == [25, 20]
+    assert groups[1].without(small[0]).paths == small[1:]
+    assert find(tmp_path, min_size=20)[1][0].paths == big
+
+
+def test_cancel(tmp_path):
+    for i in range(4):
+        write(tmp_path, f'f{i}', b'c' * 100)
+    cancel = threading.Event()
+    cancel.set()
+    finder = DuplicateFinder()
+    walk_entries(str(tmp_path), finder.add)
+    with pytest.raises(ScanCancelled):
+        finder.find(cancel)
@@ -0,0 +1,141 @@
+import os
+import threading
+
+import pytest
+
+from lib import filelist
+from lib.cache import SizeCache
+from lib.index import ScanIndex
+from lib.scanner import scan_tree
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / 'root'
+    (root / 'a' / 'b').mkdir(parents=True)
+    (root / 'top.txt').write_bytes(b'x' * 100)
+    (root / 'a' / 'mid.txt').write_bytes(b'x' * 200)
+    (root / 'a' / 'b' / 'deep.txt').write_bytes(b'x' * 300)
+    return str(root)
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = ScanIndex(str(tmp_path / 'index.sqlite3'))
+    yield index
+    index.close()
+
+
+def warm_cache(tree, index):
+    """Scan the tree into the index, then return a new session's cache over it."""
+    SizeCache(index=index).get(tree)
+    return SizeCache(index=index)
+
+
+def test_load_leaves_file_listings_in_the_index(tree, index, monkeypatch):
+    SizeCache(index=index).get(tree)
+    decoded = []
+    from_items = filelist.FileList.from_items
+    monkeypatch.setattr(filelist.FileList, 'from_items',
+                        classmethod(lambda cls, items: decoded.append(items) or from_items(items)))
+    records = index.load(tree)
+    assert set(records) == {tree, os.path.join(tree, 'a'), os.path.join(tree, 'a', 'b')}
+    assert records[os.path.join(tree, 'a')].subdirs == ['b']
+    assert not decoded
+
+
+def test_restored_tree_reads_listings_when_opened(tree, index):
+    cache = warm_cache(tree, index)
+    root = cache.get(tree)
+    assert (root.size, root.file_count, root.dir_count) == (600, 3, 2)
+    assert cache.last_stats.dirs_reused == 3 and cache.last_stats.dirs_read == 0
+    assert list(root.files.names) == ['top.txt']
+    deep = cache.lookup(os.path.join(tree, 'a', 'b'))
+    assert deep.files is None  # Not opened yet
+
+    assert cache.is_loaded(os.path.join(tree, 'a', 'b'))
+    node = cache.get(os.path.join(tree, 'a', 'b'))
+    assert node is deep
+    assert list(node.iter_items()) == [('deep.txt', 300, False, False)]
+
+
+def test_largest_reads_unopened_listings_from_the_index(tree, index, monkeypatch):
+    cache = warm_cache(tree, index)
+    cache.get(tree)
+    from lib import cache as cache_module
+    monkeypatch.setattr(cache_module, 'read_level', None)  # Never listed from disk
+    files, dirs, total = cache.largest(tree, 10)
+    assert total == 600
+    assert [size for size, _, _ in files] == [300, 200, 100]
+    assert cache.lookup(os.path.join(tree, 'a', 'b')).files is None  # Not kept
+
+
+def test_out_of_date_listing_is_not_used(tree, index):
+    SizeCache(index=index).get(tree)
+    b = os.path.join(tree, 'a', 'b')
+    st = os.stat(b)
+    assert index.files(b, st.st_mtime, st.st_ino) is not None
+    assert index.files(b, st.st_mtime + 1, st.st_ino) is None
+    assert index.files(os.path.join(tree, 'missing'), st.st_mtime, st.st_ino) is None
+
+    with open(os.path.join(b, 'new.txt'), 'wb') as f:
+        f.write(b'z' * 50)
+    cache = SizeCache(index=index)
+    root = cache.get(tree)
+    assert root.size == 650
+    assert sorted(cache.get(b).files.names) == ['deep.txt', 'new.txt']
+
+
+def test_forget_in_restored_directory(tree, index):
+    cache = warm_cache(tree, index)
+    root = cache.get(tree)
+    mid = os.path.join(tree, 'a', 'mid.txt')
+    os.remove(mid)
+    assert cache.forget(mid)
+    assert root.size == 400
+    assert list(cache.get(os.path.join(tree, 'a')).files.names) == []
+
+
+def test_save_drops_rows_of_vanished_directories_despite_other_loads(tree, index, tmp_path):
+    other = tmp_path / 'other'
+    (other / 'x').mkdir(parents=True)
+    SizeCache(index=index).get(tree)
+    SizeCache(index=index).get(str(other))
+    b = os.path.join(tree, 'a', 'b')
+    assert b in index.load(tree)
+
+    known = index.load(tree)
+    os.remove(os.path.join(b, 'deep.txt'))
+    os.rmdir(b)
+    index.load(str(other))  # Another thread's scan in between
+    index.save(scan_tree(tree, known=known), known)
+    assert set(index.load(tree)) == {tree, os.path.join(tree, 'a')}
+    assert set(index.load(str(other))) == {str(other), str(other / 'x')}
+
+
+def test_index_is_written_without_holding_the_cache_lock(tree, index, monkeypatch):
+    cache = SizeCache(index=index)
+    held = []
+    write = index.write
+
+    def checked_write(collected):
+        def probe():
+            free = cache.lock.acquire(blocking=False)
+            if free:
+                cache.lock.release()
+            held.append(not free)
+        thread = threading.Thread(target=probe)
+        thread.start()
+        thread.join()
+        write(collected)
+
+    monkeypatch.setattr(index, 'write', checked_write)
+    cache.get(tree)
+    with open(os.path.join(tree, 'a', 'new.txt'), 'wb') as f:
+        f.write(b'n' * 10)
+    cache.revalidate(os.path.join(tree, 'a'))
+    cache.refresh(tree)
+    assert held == [False, False, False]
+    a = os.path.join(tree, 'a')
+    st = os.stat(a)
+    assert sorted(index.files(a, st.st_mtime, st.st_ino).names) == ['mid.txt', 'new.txt']
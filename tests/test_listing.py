@@ -0,0 +1,98 @@
+import random
+
+import pytest
+
+from lib.ages import file_ages, file_stale, stale_bytes
+from lib.filelist import FileList
+from lib.listing import Listing, SORT_KEYS, _FULL_SORT_SHARE, _MIN_RANKED
+from lib.scanner import DirNode
+
+
+def make_node(files=1000, dirs=60, seed=3):
+    """A directory with many ties: sizes, times and ages come from small sets."""
+    rng = random.Random(seed)
+    node = DirNode('root')
+    for i in range(dirs):
+        child = DirNode(f'Dir{i:03d}', node)
+        child.size = rng.choice((0, 10, 500, 4096))
+        child.file_count = rng.randint(0, 4)
+        child.mtime = float(rng.randint(0, 5))
+        child.ages = file_ages(child.size, rng.randint(0, 15))
+        node.children[child.name] = child
+    node.files = FileList.from_items(
+        (f'file{i:04d}', rng.choice((0, 10, 500, 4096)), False, i % 7 == 0, rng.randint(0, 15),
+         float(rng.randint(0, 5)))
+        for i in range(files))
+    node.size = sum(c.size for c in node.children.values()) + sum(node.files.sizes)
+    return node
+
+
+def orderings():
+    yield 'size', None
+    yield 'name', None
+    yield 'count', None
+    yield 'mtime', None
+    for days in (30, 90, 365):
+        for clock in ('mtime', 'atime'):
+            yield 'stale', (days, clock)
+
+
+@pytest.mark.parametrize('key, age', list(orderings()))
+def test_any_page_matches_a_full_sort(key, age):
+    node = make_node()
+    full = list(Listing(node, key, age))
+    assert sorted(full) == sorted(list(node.files) + [(c.name, c.size, True, c.is_hidden)
+                                                      for c in node.children.values()])
+    total = len(full)
+    # Small pages are selected with the heap, pages past a quarter with a full sort
+    assert _MIN_RANKED < total * _FULL_SORT_SHARE
+    for start in (0, 20, 95, 100, 180, 240, 260, 500, total - 20):
+        assert Listing(node, key, age)[start:start + 20] == full[start:start + 20]
+    paged = Listing(node, key, age)
+    for start in range(0, total, 20):
+        assert paged[start:start + 20] == full[start:start + 20]
+    assert paged[total - 1] == full[-1] and paged[-1] == full[-1]
+
+
+@pytest.mark.parametrize('key, age', list(orderings()))
+def test_order_follows_the_key(key, age):
+    node = make_node()
+    listing = Listing(node, key, age)
+    children = node.children
+    records = {record[0]: record for record in node.files.iter_records()}
+
+    def value(item):
+        name = item[0]
+        if key == 'size':
+            return item[1]
+        if key == 'name':
+            return name.casefold()
+        if key == 'count':
+            return (children[name].file_count if name in children else 1, item[1])
+        if key == 'mtime':
+            return children[name].mtime if name in children else records[name][5]
+        if name in children:
+            return stale_bytes(children[name].ages, *age), item[1]
+        return file_stale(item[1], records[name][4], *age), item[1]
+
+    values = [value(item) for item in listing]
+    assert values == sorted(values, reverse=key != 'name')
+    if key == 'stale':
+        assert [listing.stale(i, *age) for i in range(len(listing))] == [v[0] for v in values]
+
+
+def test_names_sort_without_case():
+    node = DirNode('root')
+    node.files = FileList.from_items([('b', 1, False, False), ('A', 2, False, False),
+                                      ('a', 3, False, False), ('C', 4, False, False)])
+    # Equal names keep the order of the listing
+    assert [name for name, _, _, _ in Listing(node, 'name')] == ['A', 'a', 'b', 'C']
+
+
+def test_bad_keys():
+    node = make_node(files=3, dirs=1)
+    with pytest.raises(ValueError):
+        Listing(node, 'colour')
+    with pytest.raises(ValueError):
+        Listing(node, 'stale')
+    assert set(SORT_KEYS) == {key for key, _ in orderings()}
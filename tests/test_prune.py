@@ -0,0 +1,90 @@
+import io
+import json
+import os
+import pickle
+
+import pytest
+
+from lib.batch import run_scan, EXIT_OK
+from lib.prune import ScanFilter
+from lib.scanner import scan_tree, ScanStats
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / 'root'
+    files = {'keep.txt': 1, 'skip.tmp': 2, 'node_modules/pkg/index.js': 4, 'src/main.py': 8,
+             'src/node_modules/x.js': 16, 'src/build/out.o': 32, 'a/b/c/d/deep.txt': 64}
+    for name, size in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'x' * size)
+    return str(root)
+
+
+def scan(tree, prune, workers=1):
+    stats = ScanStats()
+    root = scan_tree(tree, stats=stats, prune=prune, workers=workers)
+    return root, stats
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_exclude_names_and_paths(tree, workers):
+    prune = ScanFilter(exclude=['*.tmp', 'node_modules', os.path.join(tree, 'src', 'build')])
+    root, stats = scan(tree, prune, workers)
+    assert root.size == 1 + 8 + 64
+    assert set(root.children) == {'src', 'a'}
+    assert set(root.children['src'].children) == set()
+    assert stats.pruned_files == 1
+    assert sorted(stats.pruned_dirs) == sorted([os.path.join(tree, 'node_modules'),
+                                                os.path.join(tree, 'src', 'node_modules'),
+                                                os.path.join(tree, 'src', 'build')])
+
+
+def test_path_patterns_allow_a_trailing_separator(tree):
+    prune = ScanFilter(exclude=[os.path.join(tree, 'src', 'build') + os.sep])
+    root, stats = scan(tree, prune)
+    assert set(root.children['src'].children) == {'node_modules'}
+    assert stats.pruned_dirs == [os.path.join(tree, 'src', 'build')]
+
+
+def test_one_filesystem(tree):
+    st = os.stat(tree)
+    same = ScanFilter(one_filesystem=True)
+    root, stats = scan(tree, same)
+    assert root.size == 127 and stats.pruned_dirs == []
+
+    other = ScanFilter(one_filesystem=True).bind(tree, st)
+    other.device = st.st_dev + 1  # As if every sub-directory were a mount point
+    root, stats = scan(tree, other)
+    assert root.size == 3 and root.children == {}
+    assert len(stats.pruned_dirs) == 3
+    assert not ScanFilter().bind(tree, st).crosses_device(os.stat('/'))
+
+
+def test_max_depth_keeps_totals_but_drops_listings(tree):
+    root, stats = scan(tree, ScanFilter(max_depth=2))
+    assert root.size == 127 and root.dir_count == 9
+    b = root.children['a'].children['b']
+    assert b.size == 64 and b.children is None and b.files is None
+    assert root.children['a'].files is not None
+    assert stats.pruned_dirs == []
+    assert ScanFilter(max_depth=0).max_depth == 1
+
+
+def test_bound_filter_survives_pickling(tree):
+    prune = ScanFilter(True, ['*.tmp'], 3).bind(tree, os.stat(tree))
+    copy = pickle.loads(pickle.dumps(prune))
+    assert (copy.device, copy.base_depth, copy.max_depth) == (prune.device, prune.base_depth, 3)
+    assert copy.excluded('a.tmp', '/x/a.tmp') and not copy.excluded('a.txt', '/x/a.txt')
+    assert copy.describe() == "one filesystem; excluding *.tmp; detail to depth 3"
+
+
+def test_batch_reports_what_was_pruned(tree, capsys):
+    out = io.StringIO()
+    prune = ScanFilter(exclude=['node_modules', '*.tmp'])
+    assert run_scan(tree, as_json=True, out=out, prune=prune) == EXIT_OK
+    summary = json.loads(out.getvalue().splitlines()[-1])
+    assert summary['pruned_dirs'] == 2 and summary['pruned_files'] == 1
+    assert run_scan(tree, out=io.StringIO(), prune=prune) == EXIT_OK
+    assert 'pruned 2 directories and 1 files' in capsys.readouterr().err
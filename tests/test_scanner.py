@@ -0,0 +1,60 @@
+import os
+import random
+
+import pytest
+
+from lib.scanner import scan_tree, ScanStats
+from lib.process_scan import scan_tree_processes
+
+
+@pytest.fixture(scope='module')
+def generated(tmp_path_factory):
+    """A random but reproducible tree, wide and deep enough for work stealing."""
+    root = str(tmp_path_factory.mktemp('generated'))
+    rng = random.Random(5)
+    dirs = [root]
+    for i in range(300):
+        parent = rng.choice(dirs)
+        path = os.path.join(parent, f'd{i}')
+        os.mkdir(path)
+        dirs.append(path)
+    for i in range(1500):
+        with open(os.path.join(rng.choice(dirs), f'f{i}.bin'), 'wb') as f:
+            f.write(b'x' * rng.randint(0, 4000))
+    os.symlink('f0.bin', os.path.join(dirs[7], 'link'))
+    os.symlink(dirs[3], os.path.join(dirs[9], 'dirlink'))
+    return root
+
+
+def shape(node, with_files=True):
+    """Everything a scan measured, nested by name."""
+    return (node.size, node.file_count, node.dir_count,
+            sorted(node.files) if with_files and node.files is not None else None,
+            {name: shape(child, with_files) for name, child in (node.children or {}).items()})
+
+
+def test_serial_scan_counts(generated):
+    root = scan_tree(generated)
+    assert root.dir_count == 300
+    assert root.file_count == 1500  # Symbolic links never count as files
+    assert root.size == sum(os.path.getsize(os.path.join(d, name))
+                            for d, _, names in os.walk(generated) for name in names
+                            if not os.path.islink(os.path.join(d, name)))
+
+
+@pytest.mark.parametrize('workers', [2, 4, 8])
+def test_threads_match_serial_scan(generated, workers):
+    serial_stats = ScanStats()
+    parallel_stats = ScanStats()
+    serial = scan_tree(generated, stats=serial_stats)
+    parallel = scan_tree(generated, workers=workers, stats=parallel_stats)
+    assert shape(parallel) == shape(serial)
+    assert parallel.ages == serial.ages
+    assert parallel_stats.dirs_read == serial_stats.dirs_read == 301
+
+
+def test_processes_match_serial_scan(generated):
+    serial = scan_tree(generated)
+    processes = scan_tree_processes(generated, 3)
+    assert sorted(processes.files) == sorted(serial.files)
+    assert shape(processes, with_files=False) == shape(serial, with_files=False)
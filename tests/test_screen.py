@@ -0,0 +1,98 @@
+import os
+import sys
+import threading
+
+import pytest
+
+from lib import screen
+
+
+@pytest.fixture
+def terminal(monkeypatch, capsys):
+    """A fake terminal of 100x45; returns what was written since the last call."""
+    monkeypatch.setattr(screen, '_is_terminal', lambda: True)
+    monkeypatch.setattr(screen.shutil, 'get_terminal_size', lambda: os.terminal_size((100, 45)))
+    monkeypatch.setattr(screen, '_previous', None)
+    return lambda: capsys.readouterr().out
+
+
+def draw(rows, commands=17, width=60, clip=True):
+    with screen.frame(clip=clip):
+        for row in rows:
+            print(row)
+        for i in range(commands):
+            print(f"\033[33mcommand {i}\033[0m: " + 'x' * width)
+
+
+def test_tall_frame_is_cut_and_redrawn_line_by_line(terminal):
+    rows = [f"entry {i}" for i in range(30)]
+    draw(rows)
+    first = terminal()
+    assert first.startswith(screen.CLEAR)
+    assert '11 more lines; enlarge the window' in first
+    assert 'command 5' in first and 'command 6' not in first
+
+    rows[3] = 'entry 3 changed'
+    draw(rows)
+    second = terminal()
+    assert screen.CLEAR not in second
+    assert 'entry 3 changed' in second and 'entry 4' not in second
+
+
+def test_taller_than_the_window_cuts_the_end_of_the_body(terminal):
+    rows = [f"entry {i}" for i in range(50)]
+    draw(rows)
+    first = terminal()
+    assert 'entry 35' in first and 'entry 36' not in first
+    draw(rows)
+    assert screen.CLEAR not in terminal()
+
+
+def test_wide_lines_are_cut_to_the_window(terminal):
+    draw(['entry ' + 'y' * 150], commands=2, width=200)
+    text = terminal()
+    lines = text[len(screen.CLEAR):].split('\n')
+    assert all(screen._width(line) < 100 for line in lines)
+    assert '…' in text
+    draw(['entry changed'], commands=2, width=200)
+    assert screen.CLEAR not in terminal()
+
+
+def test_frame_without_clip_is_repainted_when_too_tall(terminal):
+    rows = [f"entry {i}" for i in range(44)]
+    draw(rows, clip=False)
+    first = terminal()
+    assert first.startswith(screen.CLEAR) and 'command 16' in first
+    draw(rows, clip=False)
+    assert terminal().startswith(screen.CLEAR)  # Scrolled: rows can't be addressed
+
+
+def test_clip_keeps_colour_codes():
+    line = "\033[31mabcdef\033[0mghij"
+    assert screen._clip(line, 20) == line
+    clipped = screen._clip(line, 8)
+    assert screen._width(clipped) == 8
+    assert clipped == "\033[31mabcdef\033[0mg…"
+
+
+def test_other_threads_print_outside_the_frame(terminal):
+    opened = threading.Event()
+    printed = threading.Event()
+
+    def spinner():
+        opened.wait()
+        sys.stdout.write('spinning')
+        sys.stdout.flush()
+        printed.set()
+
+    thread = threading.Thread(target=spinner)
+    thread.start()
+    with screen.frame():
+        print('entry 0')
+        opened.set()
+        printed.wait(5)
+        assert 'spinning' in terminal()
+        print('entry 1')
+    thread.join()
+    text = terminal()
+    assert 'entry 0\nentry 1' in text and 'spinning' not in text
@@ -0,0 +1,99 @@
+import gzip
+import os
+import shutil
+
+import pytest
+
+from lib.snapshot import (save_snapshot, read_header, diff_snapshots, diff_directory,
+                          SnapshotError, NEW, REMOVED, GROWN, SHRUNK)
+
+
+def write(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+
+
+@pytest.fixture
+def snapshots(tmp_path):
+    root = str(tmp_path / 'root')
+    write(os.path.join(root, 'top.txt'), 100)
+    write(os.path.join(root, 'a', 'grows.txt'), 200)
+    write(os.path.join(root, 'a', 'shrinks.txt'), 300)
+    write(os.path.join(root, 'a', 'same.txt'), 10)
+    write(os.path.join(root, 'gone', 'old.txt'), 400)
+    old = str(tmp_path / 'old.snapshot.gz')
+    save_snapshot(root, old)
+
+    write(os.path.join(root, 'a', 'grows.txt'), 1200)
+    write(os.path.join(root, 'a', 'shrinks.txt'), 50)
+    write(os.path.join(root, 'a', 'b', 'new.txt'), 70)
+    shutil.rmtree(os.path.join(root, 'gone'))
+    new = str(tmp_path / 'new.snapshot.gz')
+    save_snapshot(root, new)
+    return root, old, new
+
+
+def summary(changes):
+    return [(change.path, change.status, change.delta) for change in changes]
+
+
+def test_header_records_the_root(snapshots):
+    root, old, _ = snapshots
+    header = read_header(old)
+    assert header['root'] == root
+    assert header['rules'] == ''
+
+
+def test_diff_root_lists_direct_entries_most_grown_first(snapshots):
+    _, old, new = snapshots
+    changes, old_total, new_total = diff_directory(old, new)
+    assert (old_total, new_total) == (1010, 1430)
+    assert summary(changes) == [('a', GROWN, 820), ('gone', REMOVED, -400)]
+    assert changes[1].is_dir and changes[1].new_size is None
+
+
+def test_diff_subdirectory(snapshots):
+    _, old, new = snapshots
+    changes, old_total, new_total = diff_directory(old, new, 'a')
+    assert (old_total, new_total) == (510, 1330)
+    assert summary(changes) == [('a/grows.txt', GROWN, 1000), ('a/b', NEW, 70),
+                                ('a/shrinks.txt', SHRUNK, -250)]
+    assert [change.name for change in changes] == ['grows.txt', 'b', 'shrinks.txt']
+
+
+def test_diff_directory_missing_from_old_snapshot(snapshots):
+    _, old, new = snapshots
+    changes, old_total, new_total = diff_directory(old, new, 'a/b')
+    assert (old_total, new_total) == (None, 70)
+    assert summary(changes) == [('a/b/new.txt', NEW, 70)]
+
+
+def test_diff_snapshots_yields_every_change_in_order(snapshots):
+    _, old, new = snapshots
+    assert summary(diff_snapshots(old, new)) == [
+        ('a/b/new.txt', NEW, 70), ('a/b', NEW, 70),
+        ('a/grows.txt', GROWN, 1000), ('a/shrinks.txt', SHRUNK, -250), ('a', GROWN, 820),
+        ('gone/old.txt', REMOVED, -400), ('gone', REMOVED, -400), ('', GROWN, 420)]
+    assert list(diff_snapshots(old, old)) == []
+
+
+def test_not_a_snapshot(tmp_path):
+    path = str(tmp_path / 'plain.gz')
+    with gzip.open(path, 'wt') as f:
+        f.write('hello\n')
+    with pytest.raises(SnapshotError):
+        read_header(path)
+
+
+def test_damaged_and_unordered_snapshots(snapshots, tmp_path):
+    _, old, _ = snapshots
+    with gzip.open(old, 'rt') as f:
+        lines = f.readlines()
+    for name, body in (('damaged', lines[:2] + ['["f", 1\n']),
+                       ('unordered', [lines[0], lines[2], lines[1]])):
+        path = str(tmp_path / f'{name}.snapshot.gz')
+        with gzip.open(path, 'wt') as f:
+            f.writelines(body)
+        with pytest.raises(SnapshotError, match=name if name == 'damaged' else 'out of order'):
+            diff_directory(path, old)